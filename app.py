@@ -9,6 +9,7 @@ from routes import init_app
 from core.config import APP_CONFIG, SECRET_KEY, SESSION_CONFIG
 from core.auth import auth_bp
 from apps.dataset.yumai_analysis import yumai_analysis_bp
+from apps.dataset.report_template import preload_templates
 from core.database import init_db
 from datetime import timedelta
 
@@ -43,5 +44,8 @@ init_db()
 # 初始化路由
 init_app(app)
 
+# 预加载报表模板
+preload_templates()
+
 if __name__ == "__main__":
     app.run(host=APP_CONFIG["host"], port=APP_CONFIG["port"], debug=APP_CONFIG["debug"])
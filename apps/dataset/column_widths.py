@@ -0,0 +1,87 @@
+"""
+列宽估算模块
+在写入 Excel 之前直接根据 DataFrame 估算每列的显示宽度（中文字符按2个字符计算），
+按列做向量化的字符串长度与中文字符计数，且只计算每列去重后的取值，
+不再逐个单元格、逐个字符循环。
+"""
+
+import numpy as np
+import pandas as pd
+
+# 中日韩统一表意文字，显示宽度按2个字符计算
+CJK_PATTERN = "[\u4e00-\u9fff]"
+
+# 超过该数值的浮点数不转为整数显示，避免溢出
+MAX_INTEGRAL_FLOAT = 1e15
+
+
+def _display_text(value):
+    """单元格的显示文本，整数值的浮点数按整数显示"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def column_display_text(series, sample_rows=None):
+    """一列去重后的非空显示文本，超过 sample_rows 行时先随机抽样"""
+    values = series.dropna()
+    if sample_rows and len(values) > sample_rows:
+        values = values.sample(sample_rows, random_state=0)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(values.cat.categories.dtype)
+    values = pd.Series(values.unique())
+
+    if pd.api.types.is_float_dtype(values.dtype):
+        numbers = values.to_numpy(dtype=float)
+        integral = (numbers == np.floor(numbers)) & (
+            np.abs(numbers) < MAX_INTEGRAL_FLOAT
+        )
+        text = numbers.astype(str).astype(object)
+        text[integral] = numbers[integral].astype(np.int64).astype(str)
+        return pd.Series(text, dtype=object)
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return values.astype(str)
+    return values.map(_display_text)
+
+
+def text_width(text):
+    """一组文本的最大显示宽度，中文字符按2个字符计算"""
+    if not len(text):
+        return 0
+    widths = text.str.len()
+    # 整列都是 ASCII（多数数值、日期、编号列）时无需统计中文字符
+    if not "".join(text).isascii():
+        widths = widths + text.str.count(CJK_PATTERN)
+    return int(widths.max())
+
+
+def estimate_column_widths(
+    df, padding=2, min_width=None, max_width=None, sample_rows=None, header=True
+):
+    """
+    估算 DataFrame 各列的列宽
+
+    参数:
+        df: 要写入的 DataFrame
+        padding: 在最长内容基础上增加的宽度
+        min_width: 最小列宽
+        max_width: 最大列宽
+        sample_rows: 行数超过该数量时随机抽样估算，适用于超长的明细列
+        header: 是否把表头计入列宽
+
+    返回:
+        list: 与 df.columns 顺序一致的列宽
+    """
+    widths = []
+    for position in range(len(df.columns)):
+        text = column_display_text(df.iloc[:, position], sample_rows)
+        width = text_width(text)
+        if header:
+            width = max(width, text_width(pd.Series([str(df.columns[position])])))
+        width += padding
+        if min_width is not None:
+            width = max(width, min_width)
+        if max_width is not None:
+            width = min(width, max_width)
+        widths.append(width)
+    return widths
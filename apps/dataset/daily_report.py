@@ -11,11 +11,16 @@ import os
 import io
 import datetime
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import Alignment
-from openpyxl.utils.dataframe import dataframe_to_rows
 import shutil
 from core.log_service import LogService
+from apps.dataset.daily_store import save_daily_results
+from apps.dataset.report_template import get_template_layout, write_template_report
+from apps.dataset.text_reports import (
+    FBA_INVENTORY_REPORT,
+    ORDERS_REPORT,
+    read_text_report,
+)
+from apps.dataset.xlsx_reader import read_xlsx_columns
 
 daily_report_bp = Blueprint("daily_report", __name__)
 
@@ -120,47 +125,91 @@ def save_file(file, folder, filename):
     return filepath
 
 
-def process_daily_report_from_paths(
-    project_name, report_date, sales_report_path, ad_report_path, fba_report_path
-):
-    """从文件路径处理日报"""
+# 日报写出格式：所有单元格水平、垂直居中
+DAILY_CELL_FORMAT = {"align": "center", "valign": "vcenter"}
+
+DAILY_OVERVIEW_COLUMNS = [
+    "日期(US)",
+    "SKU",
+    "ASIN",
+    "订单量",
+    "销售额",
+    "曝光量",
+    "点击量",
+    "单次点击花费",
+    "广告花费",
+    "广告订单",
+    "可售库存",
+]
+
+# 计入日报的订单状态
+DAILY_ORDER_STATUSES = ["Pending", "Shipped", "Unshipped"]
+
+# 日报需要的FBA库存报告列
+DAILY_FBA_COLUMNS = ["sku", "available"]
+
+# 日报需要的广告报告列，读取时只解析这几列
+DAILY_AD_COLUMNS = [
+    "广告SKU",
+    "广告ASIN",
+    "展示量",
+    "点击量",
+    "花费",
+    "7天总销售量(#)",
+]
+
+# 源文件类型 -> 归档文件扩展名
+DAILY_SOURCE_EXTENSIONS = {
+    "sales_report": "txt",
+    "ad_report": "xlsx",
+    "fba_report": "txt",
+}
+
+
+def archive_daily_sources(project_name, report_date, sources):
+    """
+    把日报源文件归档到项目 tmp 目录
+
+    参数:
+        sources: 文件类型 -> 已上传文件的路径或上传的文件对象
+
+    返回:
+        dict: 文件类型 -> 归档后的文件路径
+    """
     current_time = datetime.datetime.now().strftime("%H-%M-%S")
-    source_folder = os.getcwd()
-    os.chdir(source_folder)
-
-    project_folder_path = os.path.join(source_folder, "project", project_name, "日报")
-    os.makedirs(project_folder_path, exist_ok=True)
-
-    tmp_folder_path = os.path.join(source_folder, "project", project_name, "tmp")
+    tmp_folder_path = os.path.join(os.getcwd(), "project", project_name, "tmp")
     os.makedirs(tmp_folder_path, exist_ok=True)
 
-    # 复制已上传的文件到临时文件夹
-    files_to_copy = [
-        (
-            sales_report_path,
-            f"{tmp_folder_path}/{project_name}_sales_report_{report_date}_{current_time}.txt",
-        ),
-        (
-            ad_report_path,
-            f"{tmp_folder_path}/{project_name}_ad_report_{report_date}_{current_time}.xlsx",
-        ),
-        (
-            fba_report_path,
-            f"{tmp_folder_path}/{project_name}_fba_report_{report_date}_{current_time}.txt",
-        ),
-    ]
+    archived = {}
+    for file_type, source in sources.items():
+        extension = DAILY_SOURCE_EXTENSIONS[file_type]
+        path = os.path.join(
+            tmp_folder_path,
+            f"{project_name}_{file_type}_{report_date}_{current_time}.{extension}",
+        )
+        if isinstance(source, (str, os.PathLike)):
+            shutil.copy(source, path)
+        else:
+            with open(path, "wb") as f:
+                f.write(source.read())
+        archived[file_type] = path
+    return archived
+
 
-    for src, dst in files_to_copy:
-        shutil.copy(src, dst)
+def build_daily_overview(daily_sales, daily_ad_report, fba, report_date):
+    """
+    汇总销售、广告与库存数据，生成日报总览
 
-    # 读取文件进行数据处理
-    daily_sales = pd.read_csv(sales_report_path, sep="\t", encoding="utf-8")
-    daily_ad_report = pd.read_excel(ad_report_path, engine="openpyxl")
-    fba = pd.read_csv(fba_report_path, sep="\t", encoding="utf-8")
+    参数:
+        daily_sales: 订单报告
+        daily_ad_report: 广告报告
+        fba: FBA库存报告
 
-    # 数据处理逻辑（与原函数相同）
+    返回:
+        pd.DataFrame: 按 DAILY_OVERVIEW_COLUMNS 排列、按SKU排序的日报数据
+    """
     daily_sales = daily_sales.loc[
-        daily_sales["order-status"].isin(["Pending", "Shipped", "Unshipped"])
+        daily_sales["order-status"].isin(DAILY_ORDER_STATUSES)
     ]
     daily_sales = (
         daily_sales.groupby(["sku"])[["quantity", "item-price"]].sum().reset_index()
@@ -169,15 +218,7 @@ def process_daily_report_from_paths(
         columns={"sku": "SKU", "quantity": "订单量", "item-price": "销售额"}
     )
 
-    ad_columns_keep = [
-        "广告SKU",
-        "广告ASIN",
-        "展示量",
-        "点击量",
-        "花费",
-        "7天总销售量(#)",
-    ]
-    daily_ad_report = daily_ad_report[ad_columns_keep]
+    daily_ad_report = daily_ad_report[DAILY_AD_COLUMNS]
     daily_ad_report = daily_ad_report.rename(
         columns={
             "广告SKU": "SKU",
@@ -206,29 +247,16 @@ def process_daily_report_from_paths(
         else 0
     )
 
-    fba_columns_keep = ["sku", "available"]
-    fba = fba[fba_columns_keep]
+    fba = fba[DAILY_FBA_COLUMNS]
     fba = fba.rename(columns={"sku": "SKU", "available": "可售库存"})
 
     merged_data = pd.merge(daily_sales, daily_ad_report, on="SKU", how="outer")
     merged_data = pd.merge(merged_data, fba, on="SKU", how="outer")
     merged_data = merged_data.fillna(0)
+    # 按SKU列排序
     merged_data = merged_data.sort_values("SKU")
 
-    overview_data = {
-        "日期(US)": [],
-        "SKU": [],
-        "ASIN": [],
-        "订单量": [],
-        "销售额": [],
-        "曝光量": [],
-        "点击量": [],
-        "单次点击花费": [],
-        "广告花费": [],
-        "广告订单": [],
-        "可售库存": [],
-    }
-    df_overview = pd.DataFrame(overview_data)
+    df_overview = pd.DataFrame({column: [] for column in DAILY_OVERVIEW_COLUMNS})
     df_overview = pd.concat([df_overview, merged_data], ignore_index=True)
     df_overview = df_overview.fillna(0)
     df_overview["日期(US)"] = report_date
@@ -237,197 +265,66 @@ def process_daily_report_from_paths(
         df_overview[column] = df_overview[column].astype(int)
     for column in ["单次点击花费", "广告花费"]:
         df_overview[column] = df_overview[column].round(2)
-
-    # 模板文件路径
-    template_file = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
-        "apps",
-        "model_file",
-        "daily_template.xlsx",
-    )
-    # 日报文件路径
-    project_daily_file_path = os.path.join(
-        project_folder_path, f"{project_name}_{report_date}_日报.xlsx"
-    )
-    # 加载模板文件
-    workbook = load_workbook(template_file)
-    ws = workbook.active
-
-    for r_idx, row in enumerate(
-        dataframe_to_rows(df_overview, index=False, header=True), 1
-    ):
-        for c_idx, value in enumerate(row, 1):
-            ws.cell(row=r_idx, column=c_idx, value=value)
-            ws.cell(row=r_idx, column=c_idx).alignment = Alignment(
-                horizontal="center", vertical="center"
-            )
-
-    workbook.save(project_daily_file_path)
-
-    with open(project_daily_file_path, "rb") as f:
-        file_content = f.read()
-
-    return file_content, f"{project_name}_{report_date}_日报.xlsx"
+    return df_overview
 
 
 def process_daily_report(
     project_name, report_date, sales_report, ad_report, fba_report
 ):
-    current_time = datetime.datetime.now().strftime("%H-%M-%S")
-    source_folder = os.getcwd()
-    os.chdir(source_folder)
-
-    project_folder_path = os.path.join(source_folder, "project", project_name, "日报")
-    os.makedirs(project_folder_path, exist_ok=True)
-
-    tmp_folder_path = os.path.join(source_folder, "project", project_name, "tmp")
-    os.makedirs(tmp_folder_path, exist_ok=True)
+    """
+    生成日报
 
-    sales_report_path = f"{project_name}_sales_report_{report_date}.txt"
-    ad_report_path = f"{project_name}_ad_report_{report_date}.xlsx"
-    fba_report_path = f"{project_name}_fba_report_{report_date}.txt"
+    源文件先归档到项目 tmp 目录再读取；当天按SKU合并的数据保存到项目的
+    每日结果目录供周报汇总，日报按 daily_template.xlsx 的版式整行写出，
+    保存到项目日报目录。
 
-    with open(sales_report_path, "wb") as f:
-        f.write(sales_report.read())
+    参数:
+        sales_report, ad_report, fba_report: 已上传文件的路径或上传的文件对象
 
-    with open(ad_report_path, "wb") as f:
-        f.write(ad_report.read())
-
-    with open(fba_report_path, "wb") as f:
-        f.write(fba_report.read())
-
-    daily_sales = pd.read_csv(sales_report_path, sep="\t", encoding="utf-8")
-    daily_ad_report = pd.read_excel(ad_report_path, engine="openpyxl")
-    fba = pd.read_csv(fba_report_path, sep="\t", encoding="utf-8")
+    返回:
+        tuple: (工作簿内容, 下载文件名)
+    """
+    project_folder_path = os.path.join(os.getcwd(), "project", project_name, "日报")
+    os.makedirs(project_folder_path, exist_ok=True)
 
-    files_to_copy = [
-        (
-            sales_report_path,
-            f"{tmp_folder_path}/{project_name}_sales_report_{report_date}_{current_time}.txt",
-        ),
-        (
-            ad_report_path,
-            f"{tmp_folder_path}/{project_name}_ad_report_{report_date}_{current_time}.xlsx",
+    sources = archive_daily_sources(
+        project_name,
+        report_date,
+        {
+            "sales_report": sales_report,
+            "ad_report": ad_report,
+            "fba_report": fba_report,
+        },
+    )
+    df_overview = build_daily_overview(
+        # 订单报告分块读取，只保留计入日报的订单
+        read_text_report(
+            sources["sales_report"],
+            ORDERS_REPORT,
+            row_filter=lambda df: df["order-status"].isin(DAILY_ORDER_STATUSES),
         ),
-        (
-            fba_report_path,
-            f"{tmp_folder_path}/{project_name}_fba_report_{report_date}_{current_time}.txt",
+        read_xlsx_columns(sources["ad_report"], DAILY_AD_COLUMNS),
+        read_text_report(
+            sources["fba_report"], FBA_INVENTORY_REPORT, DAILY_FBA_COLUMNS
         ),
-    ]
-
-    for src, dst in files_to_copy:
-        shutil.copy(src, dst)
-        os.remove(src)
-
-    daily_sales = daily_sales.loc[
-        daily_sales["order-status"].isin(["Pending", "Shipped", "Unshipped"])
-    ]
-    daily_sales = (
-        daily_sales.groupby(["sku"])[["quantity", "item-price"]].sum().reset_index()
+        report_date,
     )
-    daily_sales = daily_sales.rename(
-        columns={"sku": "SKU", "quantity": "订单量", "item-price": "销售额"}
+    save_daily_results(project_name, report_date, df_overview)
+
+    output = io.BytesIO()
+    write_template_report(
+        df_overview,
+        get_template_layout("daily"),
+        output,
+        DAILY_CELL_FORMAT,
     )
+    file_content = output.getvalue()
 
-    ad_columns_keep = [
-        "广告SKU",
-        "广告ASIN",
-        "展示量",
-        "点击量",
-        "花费",
-        "7天总销售量(#)",
-    ]
-    daily_ad_report = daily_ad_report[ad_columns_keep]
-    daily_ad_report = daily_ad_report.rename(
-        columns={
-            "广告SKU": "SKU",
-            "广告ASIN": "ASIN",
-            "花费": "广告花费",
-            "展示量": "曝光量",
-            "7天总销售量(#)": "广告订单",
-        }
-    )
-    daily_ad_report = (
-        daily_ad_report.groupby(["SKU"])
-        .agg(
-            {
-                "曝光量": "sum",
-                "点击量": "sum",
-                "广告花费": "sum",
-                "广告订单": "sum",
-                "ASIN": "first",
-            }
-        )
-        .reset_index()
-    )
-    daily_ad_report["单次点击花费"] = (
-        daily_ad_report["广告花费"] / daily_ad_report["点击量"]
-        if daily_ad_report["点击量"].sum() > 0
-        else 0
-    )
+    filename = f"{project_name}_{report_date}_日报.xlsx"
+    with open(os.path.join(project_folder_path, filename), "wb") as f:
+        f.write(file_content)
 
-    fba_columns_keep = ["sku", "available"]
-    fba = fba[fba_columns_keep]
-    fba = fba.rename(columns={"sku": "SKU", "available": "可售库存"})
-
-    merged_data = pd.merge(daily_sales, daily_ad_report, on="SKU", how="outer")
-    merged_data = pd.merge(merged_data, fba, on="SKU", how="outer")
-    merged_data = merged_data.fillna(0)
-    # 按SKU列排序
-    merged_data = merged_data.sort_values("SKU")
-
-    overview_data = {
-        "日期(US)": [],
-        "SKU": [],
-        "ASIN": [],
-        "订单量": [],
-        "销售额": [],
-        "曝光量": [],
-        "点击量": [],
-        "单次点击花费": [],
-        "广告花费": [],
-        "广告订单": [],
-        "可售库存": [],
-    }
-    df_overview = pd.DataFrame(overview_data)
-    df_overview = pd.concat([df_overview, merged_data], ignore_index=True)
-    df_overview = df_overview.fillna(0)
-    df_overview["日期(US)"] = report_date
-
-    for column in ["订单量", "曝光量", "点击量", "广告订单", "可售库存"]:
-        df_overview[column] = df_overview[column].astype(int)
-    for column in ["单次点击花费", "广告花费"]:
-        df_overview[column] = df_overview[column].round(2)
-    # 模板文件路径
-    template_file = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
-        "apps",
-        "model_file",
-        "daily_template.xlsx",
-    )
-    # 日报文件路径
-    project_daily_file_path = os.path.join(
-        project_folder_path, f"{project_name}_{report_date}_日报.xlsx"
-    )
-    # 加载模板文件
-    workbook = load_workbook(template_file)
-    ws = workbook.active
-
-    for r_idx, row in enumerate(
-        dataframe_to_rows(df_overview, index=False, header=True), 1
-    ):
-        for c_idx, value in enumerate(row, 1):
-            ws.cell(row=r_idx, column=c_idx, value=value)
-            ws.cell(row=r_idx, column=c_idx).alignment = Alignment(
-                horizontal="center", vertical="center"
-            )
-
-    workbook.save(project_daily_file_path)
-
-    with open(project_daily_file_path, "rb") as f:
-        file_content = f.read()
-
-    return file_content, f"{project_name}_{report_date}_日报.xlsx"
+    return file_content, filename
 
 
 @daily_report_bp.route("/daily-report", methods=["GET", "POST"])
@@ -480,21 +377,12 @@ def daily_report():
                     flash("文件不存在，请重新上传")
                     return redirect(url_for("dataset.daily_report_page"))
 
-                file_content, filename = process_daily_report_from_paths(
-                    project_name,
-                    report_date,
-                    sales_report_path,
-                    ad_report_path,
-                    fba_report_path,
-                )
+                sources = (sales_report_path, ad_report_path, fba_report_path)
             else:
-                file_content, filename = process_daily_report(
-                    project_name,
-                    report_date,
-                    sales_report_file,
-                    ad_report_file,
-                    fba_report_file,
-                )
+                sources = (sales_report_file, ad_report_file, fba_report_file)
+            file_content, filename = process_daily_report(
+                project_name, report_date, *sources
+            )
 
             # 记录生成日报成功日志
             LogService.log(
@@ -0,0 +1,77 @@
+"""
+每日结果存储模块
+每次生成日报后，把当天按SKU合并的订单量、销售额、广告与库存数据保存到
+project/<项目名>/daily_results/<日期> 下。周报直接合并已保存的日期，
+不再重新上传和解析每天的原始报告。
+"""
+
+import datetime
+import os
+import re
+
+from core.config import PATH_CONFIG
+from apps.dataset.report_cache import CACHE_EXTENSIONS, write_frame, read_frame
+
+DAILY_RESULTS_FOLDER_NAME = "daily_results"
+DAILY_RESULT_NAME = "overview"
+
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def get_daily_folder(project_name):
+    """项目的每日结果目录"""
+    return os.path.join(
+        os.getcwd(),
+        PATH_CONFIG["project_data"],
+        project_name,
+        DAILY_RESULTS_FOLDER_NAME,
+    )
+
+
+def save_daily_results(project_name, report_date, df):
+    """保存某一天按SKU合并的日报数据，同一天重新生成时覆盖"""
+    folder = os.path.join(get_daily_folder(project_name), report_date)
+    os.makedirs(folder, exist_ok=True)
+    write_frame(df.reset_index(drop=True), os.path.join(folder, DAILY_RESULT_NAME))
+
+
+def load_daily_results(project_name, report_date):
+    """读取某一天的日报数据，该日期未生成过日报时为 None"""
+    return read_frame(
+        os.path.join(get_daily_folder(project_name), report_date, DAILY_RESULT_NAME)
+    )
+
+
+def stored_days(project_name):
+    """项目已保存日报数据的日期列表"""
+    folder = get_daily_folder(project_name)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(
+        name
+        for name in os.listdir(folder)
+        if DATE_PATTERN.match(name)
+        and any(
+            os.path.isfile(
+                os.path.join(folder, name, f"{DAILY_RESULT_NAME}{extension}")
+            )
+            for extension in CACHE_EXTENSIONS
+        )
+    )
+
+
+def week_dates(start_date, days=7):
+    """
+    从开始日期起连续的日期
+
+    参数:
+        start_date: 开始日期，如 "2025-11-03"
+
+    返回:
+        list: 如 ["2025-11-03", ..., "2025-11-09"]
+    """
+    try:
+        start = datetime.datetime.strptime(str(start_date).strip(), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"日期格式错误: {start_date}，应为 2025-11-03")
+    return [(start + datetime.timedelta(days=i)).isoformat() for i in range(days)]
@@ -0,0 +1,89 @@
+"""
+项目费用叠加模块
+部分项目有按SKU计算、付款报告里没有的费用（如宝勒的FBM费用），生成产品分析时
+需要按实际销售量叠加到总销售额中。
+
+费用表放在 apps/model_file 下，按 "<项目名称关键字>_<费用类型>.csv" 命名，
+包含 SKU 列和与费用类型同名的单价列，如 宝勒_FBM.csv 对 宝勒1店、宝勒2店 生效。
+任何项目放入对应的费用表即可叠加费用。费用表只在首次使用或文件修改后读取一次，
+以 SKU 为索引缓存，叠加时整列按 SKU 取单价计算。
+"""
+
+import os
+import threading
+
+import pandas as pd
+
+FEE_OVERLAY_FOLDER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "model_file"
+)
+
+# 费用类型 -> 叠加到的列及计算费用的数量列
+FEE_OVERLAY_TYPES = {
+    "FBM": {"target": "总销售额", "quantity": "实际销售量"},
+}
+
+# 费用表路径 -> {"mtime", "fees"}
+_fee_tables = {}
+_fee_tables_lock = threading.Lock()
+
+
+def find_fee_overlays(project_name, folder=None):
+    """
+    项目适用的费用表
+
+    返回:
+        list: (费用类型, 费用表路径)，按文件名排序
+    """
+    folder = folder or FEE_OVERLAY_FOLDER
+    if not os.path.isdir(folder):
+        return []
+    overlays = []
+    for filename in sorted(os.listdir(folder)):
+        name, extension = os.path.splitext(filename)
+        keyword, _, fee_type = name.rpartition("_")
+        if (
+            extension.lower() == ".csv"
+            and fee_type in FEE_OVERLAY_TYPES
+            and keyword
+            and keyword in project_name
+        ):
+            overlays.append((fee_type, os.path.join(folder, filename)))
+    return overlays
+
+
+def load_fee_table(path, fee_type):
+    """
+    读取费用表，首次使用或文件修改时间变化时重新读取
+
+    返回:
+        pd.Series: 以 SKU 为索引的单价，同一SKU出现多次时取最后一行
+    """
+    mtime = os.stat(path).st_mtime_ns
+    with _fee_tables_lock:
+        cached = _fee_tables.get(path)
+        if cached is None or cached["mtime"] != mtime:
+            df = pd.read_csv(path, encoding="utf-8", usecols=["SKU", fee_type])
+            df = df.drop_duplicates("SKU", keep="last")
+            fees = pd.to_numeric(df[fee_type], errors="coerce").fillna(0)
+            cached = {"mtime": mtime, "fees": pd.Series(fees.values, index=df["SKU"])}
+            _fee_tables[path] = cached
+    return cached["fees"]
+
+
+def apply_fee_overlays(df, project_name, folder=None):
+    """
+    按项目适用的费用表叠加费用：目标列 += 数量列 × SKU 单价，费用表中没有的SKU不变
+
+    费用表格式不正确时打印警告并跳过，不影响报表生成。
+    """
+    for fee_type, path in find_fee_overlays(project_name, folder):
+        spec = FEE_OVERLAY_TYPES[fee_type]
+        try:
+            fees = load_fee_table(path, fee_type)
+        except Exception as e:
+            print(f"警告: 读取{fee_type}费用文件 {path} 时发生错误，跳过: {e}")
+            continue
+        unit_fees = df["SKU"].map(fees).fillna(0)
+        df[spec["target"]] = df[spec["target"]] + df[spec["quantity"]] * unit_fees
+    return df
@@ -0,0 +1,110 @@
+"""
+库存库龄模块
+产品分析和优麦云分析都附带"库存详情"sheet：FBA库存报告中各SKU的可售库存、
+各库龄段库存与库存建议，按SKU合并本周销量，末尾加汇总行。两处统一使用这里的实现。
+
+库存报告按 text_reports 中的列与类型只读取用到的列；同一份库存报告常在同一天
+用于两种分析，传入项目名称时按文件内容的 SHA-256 缓存解析结果。
+"""
+
+import pandas as pd
+
+from apps.dataset.report_cache import load_cached_report
+from apps.dataset.text_reports import FBA_INVENTORY_REPORT, read_text_report
+
+INVENTORY_DETAIL_SHEET = "库存详情"
+
+# 库存报告列 -> 库存详情列
+INVENTORY_COLUMNS = {
+    "sku": "SKU",
+    "asin": "ASIN",
+    "available": "可售库存",
+    "inv-age-0-to-90-days": "0-90天",
+    "inv-age-91-to-180-days": "91-180天",
+    "inv-age-181-to-270-days": "181-270天",
+    "inv-age-271-to-365-days": "271-365天",
+    "inv-age-365-plus-days": "365+天",
+    "recommended-action": "库存建议",
+}
+
+# 库存详情的列顺序，库存报告中没有的列不输出
+INVENTORY_DETAIL_COLUMNS = [
+    "SKU",
+    "ASIN",
+    "本周销量",
+    "可售库存",
+    "0-90天",
+    "91-180天",
+    "181-270天",
+    "271-365天",
+    "365+天",
+    "库存建议",
+]
+
+# 汇总行求和的列，其余列留空
+INVENTORY_SUM_COLUMNS = [
+    "本周销量",
+    "可售库存",
+    "0-90天",
+    "91-180天",
+    "181-270天",
+    "271-365天",
+    "365+天",
+]
+
+INVENTORY_SUMMARY_SKU = "汇总行"
+
+
+def read_inventory(source):
+    """读取库存报告中库存详情用到的列，并改为库存详情的列名"""
+    return read_text_report(source, FBA_INVENTORY_REPORT).rename(
+        columns=INVENTORY_COLUMNS
+    )
+
+
+def load_inventory(fba_report_path, project_name=None):
+    """
+    读取库存报告，传入项目名称时按文件内容缓存解析结果
+
+    返回:
+        pd.DataFrame: 库存详情列名的库存数据
+    """
+    if not project_name:
+        return read_inventory(fba_report_path)
+    return load_cached_report(
+        project_name, fba_report_path, read_inventory, kind="inventory_aging"
+    )
+
+
+def build_inventory_detail(inventory, sales, quantity_column):
+    """
+    库存详情sheet的数据
+
+    参数:
+        inventory: load_inventory 得到的库存数据
+        sales: 含 SKU 列的销量数据（不含汇总行）
+        quantity_column: sales 中作为本周销量的列
+
+    返回:
+        pd.DataFrame: 各SKU的本周销量、可售库存、库龄与库存建议，末尾为汇总行
+    """
+    weekly_sales = pd.DataFrame(
+        {
+            "SKU": sales["SKU"].to_numpy(),
+            "本周销量": pd.to_numeric(sales[quantity_column], errors="coerce")
+            .fillna(0)
+            .to_numpy(),
+        }
+    )
+    detail = pd.merge(inventory, weekly_sales, on="SKU", how="left")
+    detail["本周销量"] = detail["本周销量"].fillna(0)
+    detail = detail[[col for col in INVENTORY_DETAIL_COLUMNS if col in detail.columns]]
+
+    summary = {col: "" for col in detail.columns}
+    summary.update(
+        detail[[col for col in INVENTORY_SUM_COLUMNS if col in detail.columns]]
+        .sum()
+        .to_dict()
+    )
+    summary["SKU"] = INVENTORY_SUMMARY_SKU
+    return pd.concat([detail, pd.DataFrame([summary])], ignore_index=True)
@@ -0,0 +1,135 @@
+"""
+站点模块
+登记各亚马逊站点的中文名称与结算币种，并按 marketplace 列把一份付款报告的
+交易划分到各站点。统一交易报告中 marketplace 为空或不是已登记站点的交易
+（如 Transfer、Debt 及站外渠道）按账户级交易处理，归入交易行数最多的主站点。
+"""
+
+import pandas as pd
+
+# marketplace -> 站点名称与币种
+MARKETPLACES = {
+    "amazon.com": {"site": "美国站", "currency": "USD"},
+    "amazon.ca": {"site": "加拿大站", "currency": "CAD"},
+    "amazon.com.mx": {"site": "墨西哥站", "currency": "MXN"},
+    "amazon.com.br": {"site": "巴西站", "currency": "BRL"},
+    "amazon.co.uk": {"site": "英国站", "currency": "GBP"},
+    "amazon.de": {"site": "德国站", "currency": "EUR"},
+    "amazon.fr": {"site": "法国站", "currency": "EUR"},
+    "amazon.it": {"site": "意大利站", "currency": "EUR"},
+    "amazon.es": {"site": "西班牙站", "currency": "EUR"},
+    "amazon.nl": {"site": "荷兰站", "currency": "EUR"},
+    "amazon.com.be": {"site": "比利时站", "currency": "EUR"},
+    "amazon.se": {"site": "瑞典站", "currency": "SEK"},
+    "amazon.pl": {"site": "波兰站", "currency": "PLN"},
+    "amazon.com.tr": {"site": "土耳其站", "currency": "TRY"},
+    "amazon.co.jp": {"site": "日本站", "currency": "JPY"},
+    "amazon.com.au": {"site": "澳洲站", "currency": "AUD"},
+    "amazon.sg": {"site": "新加坡站", "currency": "SGD"},
+    "amazon.ae": {"site": "阿联酋站", "currency": "AED"},
+    "amazon.sa": {"site": "沙特站", "currency": "SAR"},
+}
+
+# 报告中没有已登记站点时使用的站点
+DEFAULT_MARKETPLACE = "amazon.com"
+
+# 多站点工作簿的站点汇总sheet
+MARKETPLACE_SUMMARY_SHEET = "站点汇总"
+
+MARKETPLACE_SUMMARY_COLUMNS = [
+    "站点",
+    "marketplace",
+    "币种",
+    "交易行数",
+    "收入合计",
+    "支出合计",
+    "亚马逊回款金额",
+]
+
+
+def marketplace_info(marketplace):
+    """站点名称与币种，未登记的站点按默认站点处理"""
+    return MARKETPLACES.get(marketplace, MARKETPLACES[DEFAULT_MARKETPLACE])
+
+
+def detect_marketplaces(values):
+    """
+    报告中出现的已登记站点
+
+    参数:
+        values: marketplace 列，报告中没有该列时为 None
+
+    返回:
+        list: 按交易行数从多到少排列的站点，第一个为主站点
+    """
+    if values is None:
+        return [DEFAULT_MARKETPLACE]
+    counts = values.value_counts(sort=False)
+    counts = counts[[value in MARKETPLACES for value in counts.index]]
+    counts = counts[counts > 0]
+    if counts.empty:
+        return [DEFAULT_MARKETPLACE]
+    # 行数相同时按登记顺序排列，保证结果稳定
+    order = list(MARKETPLACES)
+    return sorted(counts.index, key=lambda value: (-counts[value], order.index(value)))
+
+
+def assign_marketplaces(df, marketplaces):
+    """
+    为每条交易确定所属站点
+
+    参数:
+        df: 付款报告 DataFrame
+        marketplaces: detect_marketplaces 得到的站点列表
+
+    返回:
+        pd.Series: 与 df 同索引、类别为 marketplaces 的分类列
+    """
+    if "marketplace" not in df.columns:
+        codes = [0] * len(df)
+    else:
+        values = df["marketplace"].astype(object)
+        codes = (
+            values.map({value: code for code, value in enumerate(marketplaces)})
+            .fillna(0)
+            .astype(int)
+        )
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=marketplaces),
+        index=df.index,
+        name="marketplace",
+    )
+
+
+def build_marketplace_summary(results):
+    """
+    生成站点汇总sheet：各站点一行，多个站点使用同一币种时追加该币种的合计行
+
+    参数:
+        results: 站点 -> (交易行数, 收入合计, 支出合计, 亚马逊回款金额)
+
+    返回:
+        pd.DataFrame
+    """
+    rows = []
+    currency_totals = {}
+    for marketplace, (row_count, income, expense, pay_back) in results.items():
+        info = marketplace_info(marketplace)
+        amounts = [round(income, 2), round(expense, 2), round(pay_back, 2)]
+        rows.append([info["site"], marketplace, info["currency"], row_count, *amounts])
+        currency_totals.setdefault(info["currency"], []).append([row_count, *amounts])
+
+    for currency, parts in currency_totals.items():
+        if len(parts) < 2:
+            continue
+        sums = [sum(part[i] for part in parts) for i in range(4)]
+        rows.append(
+            [
+                f"{currency} 合计",
+                "",
+                currency,
+                sums[0],
+                *[round(value, 2) for value in sums[1:]],
+            ]
+        )
+    return pd.DataFrame(rows, columns=MARKETPLACE_SUMMARY_COLUMNS)
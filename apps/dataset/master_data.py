@@ -0,0 +1,51 @@
+"""
+产品基础信息模块
+apps/model_file/BLF_Basic_Info.csv 记录各项目的 SKU、ASIN、头程单价与 FOB单价，
+很少修改。这里只在首次使用或文件修改后读取一次，按项目拆分后以项目名称为键缓存，
+各功能直接取该项目的基础信息，不需要每次读取整张表再过滤。
+"""
+
+import os
+import threading
+
+import pandas as pd
+
+BASIC_INFO_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "model_file",
+    "BLF_Basic_Info.csv",
+)
+
+# 基础信息表路径 -> {"mtime", "columns", "projects": {项目名称: DataFrame}}
+_basic_info = {}
+_basic_info_lock = threading.Lock()
+
+
+def _load_basic_info(path):
+    """取基础信息表的缓存，首次使用或文件修改时间变化时重新读取"""
+    mtime = os.stat(path).st_mtime_ns
+    with _basic_info_lock:
+        cached = _basic_info.get(path)
+        if cached is None or cached["mtime"] != mtime:
+            df = pd.read_csv(path, encoding="utf-8")
+            projects = {
+                name: group.reset_index(drop=True)
+                for name, group in df.groupby("project_name", sort=False)
+            }
+            cached = {"mtime": mtime, "columns": list(df.columns), "projects": projects}
+            _basic_info[path] = cached
+    return cached
+
+
+def get_project_products(project_name, path=None):
+    """
+    项目的基础信息（副本），没有该项目时为空表
+
+    返回:
+        pd.DataFrame: 与基础信息表相同的列
+    """
+    cached = _load_basic_info(path or BASIC_INFO_PATH)
+    products = cached["projects"].get(project_name)
+    if products is None:
+        return pd.DataFrame(columns=cached["columns"])
+    return products.copy()
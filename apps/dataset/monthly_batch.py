@@ -0,0 +1,264 @@
+"""
+月报批量生成模块
+月底为多个项目生成月报时，把每个 (项目, 月份, 付款报告) 作为一个任务，
+用进程池并行调用 process_monthly_report，默认进程数等于 CPU 核数。
+所有工作簿与记录每个任务状态、耗时的清单一起打包为 zip。
+
+命令行用法:
+    python -m apps.dataset.monthly_batch --job 铨富 2025-11 a.csv --job 玥涵 2025-11 b.csv
+    python -m apps.dataset.monthly_batch --jobs-file jobs.csv --output 月报_2025-11.zip
+"""
+
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from flask import Blueprint, request, send_file
+
+from core.log_service import LogService
+from apps.dataset.monthly_report import (
+    REPORT_MODE_FULL,
+    REPORT_MODES,
+    process_monthly_report,
+    streaming_chunksize,
+)
+
+monthly_batch_bp = Blueprint("monthly_batch", __name__)
+
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_COLUMNS = [
+    "序号",
+    "项目名称",
+    "报表日期",
+    "模式",
+    "状态",
+    "耗时（秒）",
+    "文件",
+    "错误",
+]
+JOB_FIELDS = ["project_name", "report_date", "payment_report_path"]
+
+
+def normalize_jobs(jobs):
+    """校验任务列表，补全默认生成模式"""
+    if not jobs:
+        raise ValueError("没有需要生成的月报任务")
+
+    normalized = []
+    for index, job in enumerate(jobs, start=1):
+        missing = [field for field in JOB_FIELDS if not job.get(field)]
+        if missing:
+            raise ValueError(f"第{index}个任务缺少字段: {', '.join(missing)}")
+        if not os.path.exists(job["payment_report_path"]):
+            raise ValueError(
+                f"第{index}个任务的付款报告不存在: {job['payment_report_path']}"
+            )
+        mode = job.get("mode") or REPORT_MODE_FULL
+        if mode not in REPORT_MODES:
+            raise ValueError(f"第{index}个任务的生成模式不支持: {mode}")
+        normalized.append({**{field: job[field] for field in JOB_FIELDS}, "mode": mode})
+    return normalized
+
+
+def run_monthly_job(job, output_folder):
+    """
+    在工作进程中生成单个月报，异常不向外抛出，记录在结果中
+
+    返回:
+        dict: 任务状态、耗时和工作簿文件名
+    """
+    start = time.perf_counter()
+    result = {"status": "success", "filename": None, "error": ""}
+    try:
+        payment_report_path = job["payment_report_path"]
+        with open(payment_report_path, "rb") as payment_range_report:
+            file_content, filename = process_monthly_report(
+                job["project_name"],
+                job["report_date"],
+                payment_range_report,
+                streaming_chunksize(payment_report_path),
+                job["mode"],
+            )
+        # 同一项目同一月份的多个任务下载文件名相同，加序号区分
+        filename = f"{job['index']:03d}_{filename}"
+        output_path = os.path.join(output_folder, filename)
+        if isinstance(file_content, bytes):
+            with open(output_path, "wb") as f:
+                f.write(file_content)
+        else:
+            # 流式模式返回已归档的工作簿文件，直接复制，不读入内存
+            shutil.copyfile(file_content, output_path)
+        result["filename"] = filename
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def run_monthly_batch(jobs, output_folder, max_workers=None):
+    """
+    并行生成一批月报
+
+    参数:
+        jobs: 任务列表，每个任务包含 project_name、report_date、payment_report_path，
+            可选 mode
+        output_folder: 工作簿输出目录
+        max_workers: 进程数，默认等于 CPU 核数（不超过任务数）
+
+    返回:
+        pd.DataFrame: 按任务顺序排列的清单
+    """
+    jobs = normalize_jobs(jobs)
+    for index, job in enumerate(jobs, start=1):
+        job["index"] = index
+    os.makedirs(output_folder, exist_ok=True)
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(run_monthly_job, job, output_folder): job["index"]
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    rows = []
+    for job in jobs:
+        result = results[job["index"]]
+        rows.append(
+            [
+                job["index"],
+                job["project_name"],
+                job["report_date"],
+                job["mode"],
+                result["status"],
+                result["seconds"],
+                result["filename"] or "",
+                result["error"],
+            ]
+        )
+    return pd.DataFrame(rows, columns=MANIFEST_COLUMNS)
+
+
+def write_batch_archive(manifest, output_folder, archive):
+    """把工作簿和清单写入 zip，xlsx 本身已压缩，直接存储"""
+    with zipfile.ZipFile(archive, "w") as zf:
+        for filename in manifest["文件"]:
+            if filename:
+                zf.write(os.path.join(output_folder, filename), filename)
+        zf.writestr(
+            MANIFEST_NAME,
+            manifest.to_csv(index=False).encode("utf-8-sig"),
+            compress_type=zipfile.ZIP_DEFLATED,
+        )
+
+
+@monthly_batch_bp.route("/batch", methods=["POST"])
+def monthly_report_batch():
+    """
+    批量生成月报，返回包含所有工作簿和清单的 zip
+
+    请求体(JSON):
+        {"jobs": [{"project_name", "report_date", "payment_report_path", "mode"}],
+         "max_workers": 可选}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        jobs = normalize_jobs(data.get("jobs"))
+    except ValueError as e:
+        return {"success": False, "error": str(e)}, 400
+
+    output_folder = tempfile.mkdtemp(prefix="monthly_batch_")
+    try:
+        manifest = run_monthly_batch(jobs, output_folder, data.get("max_workers"))
+        archive = io.BytesIO()
+        write_batch_archive(manifest, output_folder, archive)
+        archive.seek(0)
+    except Exception as e:
+        LogService.log(
+            action="批量生成月报失败",
+            resource="月报功能",
+            details=f"任务数: {len(jobs)}, 错误: {str(e)}",
+            log_type="user",
+            level="error",
+        )
+        return {"success": False, "error": str(e)}, 500
+    finally:
+        shutil.rmtree(output_folder, ignore_errors=True)
+
+    failed = int((manifest["状态"] != "success").sum())
+    LogService.log(
+        action="批量生成月报",
+        resource="月报功能",
+        details=f"任务数: {len(jobs)}, 失败: {failed}, 总耗时: {manifest['耗时（秒）'].sum():.2f}秒",
+        log_type="user",
+        level="info" if not failed else "warning",
+    )
+
+    return send_file(
+        archive,
+        as_attachment=True,
+        download_name="月度财务报表_批量.zip",
+        mimetype="application/zip",
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量生成月报")
+    parser.add_argument(
+        "--job",
+        nargs=3,
+        action="append",
+        default=[],
+        metavar=("项目名称", "报表日期", "付款报告"),
+        help="单个任务，可重复指定",
+    )
+    parser.add_argument(
+        "--jobs-file",
+        help="任务清单 CSV，列为 project_name, report_date, payment_report_path[, mode]",
+    )
+    parser.add_argument("--mode", default=REPORT_MODE_FULL, choices=REPORT_MODES)
+    parser.add_argument(
+        "--workers", type=int, default=None, help="进程数，默认 CPU 核数"
+    )
+    parser.add_argument(
+        "--output", default="月度财务报表_批量.zip", help="输出 zip 路径"
+    )
+    args = parser.parse_args(argv)
+
+    jobs = [dict(zip(JOB_FIELDS, values), mode=args.mode) for values in args.job]
+    if args.jobs_file:
+        jobs_df = pd.read_csv(args.jobs_file, dtype=str).fillna("")
+        for job in jobs_df.to_dict("records"):
+            job["mode"] = job.get("mode") or args.mode
+            jobs.append(job)
+
+    start = time.perf_counter()
+    output_folder = tempfile.mkdtemp(prefix="monthly_batch_")
+    try:
+        manifest = run_monthly_batch(jobs, output_folder, args.workers)
+        write_batch_archive(manifest, output_folder, args.output)
+    except ValueError as e:
+        print(f"错误: {e}")
+        return 2
+    finally:
+        shutil.rmtree(output_folder, ignore_errors=True)
+
+    print(manifest.to_string(index=False))
+    print(
+        f"共 {len(manifest)} 个任务，耗时 {time.perf_counter() - start:.2f} 秒，输出: {args.output}"
+    )
+    return 0 if (manifest["状态"] == "success").all() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
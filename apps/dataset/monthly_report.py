@@ -10,87 +10,149 @@ from flask import (
 import os
 import io
 import datetime
-import pandas as pd
-from openpyxl.utils.dataframe import dataframe_to_rows
 import shutil
-from openpyxl import load_workbook
-from openpyxl.styles import Font, NamedStyle
-from openpyxl.styles import Border, Side, Alignment
-from openpyxl.utils import get_column_letter
+import threading
+import numpy as np
+import pandas as pd
+import xlsxwriter
 from core.log_service import LogService
+from apps.dataset.payment_classifier import (
+    ORDER_BUCKETS,
+    REFUND_BUCKETS,
+    classify_transactions,
+    bucket_totals,
+    bucket_positions,
+    select_buckets,
+)
+from apps.dataset.column_widths import estimate_column_widths
+from apps.dataset.marketplaces import (
+    DEFAULT_MARKETPLACE,
+    MARKETPLACE_SUMMARY_SHEET,
+    assign_marketplaces,
+    build_marketplace_summary,
+    detect_marketplaces,
+    marketplace_info,
+)
+from apps.dataset.report_cache import load_cached_report
+from apps.dataset.monthly_store import save_month_aggregates
+from apps.dataset.payment_schema import read_payment_report, fill_missing
+from apps.dataset.reconciliation import (
+    evaluate_rules,
+    build_report_sheet,
+    build_overview_sheet,
+    get_rule_set,
+)
 
 monthly_report_bp = Blueprint("monthly_report", __name__)
 
 
-def reset_style(filename):
-    wb = load_workbook(filename)
-    line_t = Side(style="thin", color="000000")
-
-    sty1 = NamedStyle(name="sty1")
-    sty1.font = Font(name="等线", size=12, b=True)
-    sty1.alignment = Alignment(horizontal="left", vertical="center")
-    sty1.border = Border(top=line_t, bottom=line_t, left=line_t, right=line_t)
-
-    sty2 = NamedStyle(name="sty2")
-    sty2.font = Font(name="等线", size=12)
-    sty2.alignment = Alignment(horizontal="left", vertical="center")
-    sty2.border = Border(top=line_t, bottom=line_t, left=line_t, right=line_t)
-
-    sty3 = NamedStyle(name="sty3")
-    sty3.font = Font(name="等线", size=12)
-    sty3.alignment = Alignment(horizontal="center", vertical="center")
-    sty3.border = Border(top=line_t, bottom=line_t, left=line_t, right=line_t)
-
-    for ws1 in wb:
-        nrows = ws1.max_row
-        ncols = ws1.max_column
-        height = 15
-
-        # 判断是否为"报表核算"sheet，如果是则使用自适应列宽
-        is_report_sheet = ws1.title == "报表核算"
-
-        for r in range(1, nrows + 1):
-            for c in range(1, ncols + 1):
-                if r == 1:
-                    ws1.cell(r, c).style = sty1
-                    ws1.row_dimensions[r].height = height
-                else:
-                    ws1.cell(r, c).style = sty2
-
-        # 根据sheet类型设置列宽
-        if is_report_sheet:
-            # 报表核算sheet使用自适应列宽
-            for col in range(1, ncols + 1):
-                col_letter = get_column_letter(col)
-                max_length = 0
-                # 遍历该列所有单元格，找到最大内容长度
-                for row in range(1, nrows + 1):
-                    cell = ws1.cell(row, col)
-                    if cell.value:
-                        # 获取单元格值的长度，考虑中文字符
-                        cell_value = str(cell.value)
-                        # 中文字符按2个字符计算，英文按1个字符计算
-                        length = 0
-                        for char in cell_value:
-                            if "\u4e00" <= char <= "\u9fff":
-                                length += 2
-                            else:
-                                length += 1
-                        max_length = max(max_length, length)
-
-                # 设置列宽，最小为8，最大为50，并添加一些padding
-                adjusted_width = min(max(max_length + 2, 8), 50)
-                ws1.column_dimensions[col_letter].width = adjusted_width
-        else:
-            # 其他sheet使用固定列宽
-            width = 12
-            for c in range(1, ncols + 1):
-                ws1.column_dimensions[get_column_letter(c)].width = width
+# 月报样式：等线 12 号、左对齐、垂直居中、细边框，首行加粗
+REPORT_CELL_FORMAT = {
+    "font_name": "等线",
+    "font_size": 12,
+    "align": "left",
+    "valign": "vcenter",
+}
+HEADER_ROW_HEIGHT = 15
+DEFAULT_COLUMN_WIDTH = 12
+
+# 明细sheet及其对应的交易分桶
+DETAIL_SHEETS = [
+    ("所有订单", ORDER_BUCKETS),
+    ("所有退款", REFUND_BUCKETS),
+    ("FBM 订单", ["order_fbm"]),
+    ("FBM 退款", ["refund_fbm"]),
+    ("FBA 订单", ["order_fba"]),
+    ("FBA 退款", ["refund_fba"]),
+    # Income赔偿：不是FBA Inventory Reimbursement - General Adjustment 的其他赔偿
+    ("FBA库存赔偿", ["adjustment_income"]),
+    # Expense赔偿
+    ("其他赔偿", ["adjustment_expense"]),
+    ("清算费用", ["liquidation"]),
+    ("拒付退款", ["chargeback_refund"]),
+    ("FBA仓储及入库服务费", ["fba_inventory_fee"]),
+    # AmazonFees 优惠券 + 一般服务费（不含广告）
+    ("服务费（不含广告）", ["service_agl", "service_other", "amazon_fees"]),
+    ("广告费", ["service_advertising"]),
+    ("广告退款", ["service_refund_for_advertiser"]),
+]
+
+# 生成模式：完整报表、仅汇总sheet、仅明细sheet
+REPORT_MODE_FULL = "full"
+REPORT_MODE_SUMMARY = "summary"
+REPORT_MODE_DETAILS = "details"
+REPORT_MODES = (REPORT_MODE_FULL, REPORT_MODE_SUMMARY, REPORT_MODE_DETAILS)
+
+# 汇总sheet与明细sheet（含交易一览）
+SUMMARY_SHEETS = ["总览草稿", "报表核算", "销售SKU明细", "退款SKU明细"]
+RAW_SHEETS = ["交易一览"] + [sheet_name for sheet_name, _ in DETAIL_SHEETS]
+
+# 使用自适应列宽的sheet，其他sheet使用固定列宽
+AUTO_WIDTH_SHEETS = {"报表核算", MARKETPLACE_SUMMARY_SHEET}
+
+# 多站点报告的站点名称
+MULTI_MARKETPLACE_SITE = "多站点"
+
+# 流式模式：付款报告超过阈值时按块读取，每块的行数
+STREAMING_THRESHOLD_BYTES = 200 * 1024 * 1024
+STREAMING_CHUNK_ROWS = 100000
+
+# Excel 单个sheet的最大行数（含表头）
+EXCEL_MAX_ROWS = 1048576
+
+
+def add_report_formats(workbook):
+    """在 xlsxwriter 工作簿中注册月报使用的格式"""
+    return {
+        "header": workbook.add_format(
+            {**REPORT_CELL_FORMAT, "bold": True, "border": 1}
+        ),
+        "body": workbook.add_format(REPORT_CELL_FORMAT),
+        "border": workbook.add_format({"border": 1}),
+    }
+
+
+def report_column_widths(df):
+    """按内容计算列宽（中文字符按2个字符计算），最小为8，最大为50"""
+    return estimate_column_widths(df, min_width=8, max_width=50)
+
+
+def write_report_header(ws, columns, formats, widths=None):
+    """写入表头并设置列格式、列宽与冻结首行，需在写入数据行之前调用"""
+    ws.set_row(0, HEADER_ROW_HEIGHT)
+    ws.write_row(0, 0, [str(column) for column in columns], formats["header"])
+    if widths is None:
+        widths = [DEFAULT_COLUMN_WIDTH] * len(columns)
+    for col, width in enumerate(widths):
+        ws.set_column(col, col, width, formats["body"])
+    # 冻结首行
+    ws.freeze_panes(1, 0)
+
+
+def add_report_borders(ws, nrows, ncols, formats):
+    """通过覆盖数据区域的条件格式添加边框"""
+    if nrows and ncols:
+        ws.conditional_format(
+            1,
+            0,
+            nrows,
+            ncols - 1,
+            {"type": "formula", "criteria": "=TRUE", "format": formats["border"]},
+        )
 
-        # 冻结首行
-        ws1.freeze_panes = ws1["A2"]
 
-    return wb.save(filename)
+def write_report_sheet(writer, sheet_name, df, formats, widths=None):
+    """
+    写入一个sheet并在同一次写入中完成样式设置
+
+    表头逐列写入表头格式；字体和对齐通过列格式设置，边框通过覆盖数据区域的
+    条件格式设置，不需要逐个单元格处理，也不需要写完后再用 openpyxl 重新加载。
+    """
+    df.to_excel(writer, sheet_name=sheet_name, index=False, header=False, startrow=1)
+    ws = writer.sheets[sheet_name]
+    write_report_header(ws, df.columns, formats, widths)
+    add_report_borders(ws, len(df), len(df.columns), formats)
+    return ws
 
 
 def allowed_file(filename):
@@ -181,677 +243,530 @@ def save_file(file, folder, filename):
     return filepath
 
 
-def process_monthly_report(project_name, report_date, payment_range_report):
-    current_time = datetime.datetime.now().strftime("%H-%M-%S")
-    source_folder = os.getcwd()
-    os.chdir(source_folder)
-
-    report_name = f"{project_name}_美国站_{report_date}"
-
-    project_folder_path = os.path.join(source_folder, "project", project_name, "月报")
-    os.makedirs(project_folder_path, exist_ok=True)
-
-    tmp_folder_path = os.path.join(source_folder, "project", project_name, "tmp")
-    os.makedirs(tmp_folder_path, exist_ok=True)
-
-    payment_range_report_path = f"{project_name}_payment_range_report_{report_date}.csv"
-
-    with open(payment_range_report_path, "wb") as f:
-        f.write(payment_range_report.read())
-
-    payment_range_report = pd.read_csv(
-        payment_range_report_path, thousands=",", skiprows=7, encoding="utf-8"
+def prepare_transactions(PRR):
+    """空值填0并将数量转为整数"""
+    PRR = fill_missing(PRR)
+    PRR["quantity"] = PRR["quantity"].astype(int)
+    return PRR
+
+
+def sku_quantities(df):
+    """按SKU汇总数量，SKU列转回普通文本以便跨分块合并"""
+    skus = df.groupby(["sku"], as_index=False, observed=True).agg({"quantity": "sum"})
+    return skus.astype({"sku": object})
+
+
+def report_sheet_order(mode=REPORT_MODE_FULL):
+    """按生成模式返回工作簿中的sheet顺序"""
+    if mode == REPORT_MODE_SUMMARY:
+        return list(SUMMARY_SHEETS)
+    if mode == REPORT_MODE_DETAILS:
+        return list(RAW_SHEETS)
+    if mode != REPORT_MODE_FULL:
+        raise ValueError(f"不支持的生成模式: {mode}")
+    return SUMMARY_SHEETS[:2] + RAW_SHEETS[:1] + SUMMARY_SHEETS[2:] + RAW_SHEETS[1:]
+
+
+def build_summary_sheets(
+    totals, order_skus, refund_skus, marketplace=DEFAULT_MARKETPLACE
+):
+    """根据分桶合计和SKU汇总，按站点规则集与币种生成总览草稿、报表核算及SKU明细sheet"""
+    rule_set = get_rule_set(marketplace)
+    # 按规则表计算报表核算各行项目
+    values = evaluate_rules(totals, rule_set)
+    pt1 = order_skus.sort_values(by="quantity", ascending=False, inplace=False)
+    pt2 = refund_skus.sort_values(by="quantity", ascending=False, inplace=False)
+    pt3 = build_report_sheet(
+        values, rule_set, marketplace_info(marketplace)["currency"]
     )
-
-    files_to_copy = [
-        (
-            payment_range_report_path,
-            f"{tmp_folder_path}/{project_name}_payment_range_report_{report_date}_{current_time}.csv",
+    # 按照行横向顺序写入Excel
+    pt4, _ = build_overview_sheet(values, rule_set)
+    return {"总览草稿": pt4, "报表核算": pt3, "销售SKU明细": pt1, "退款SKU明细": pt2}
+
+
+def marketplace_column(df):
+    """付款报告的 marketplace 列，报告中没有该列时为 None"""
+    return df["marketplace"] if "marketplace" in df.columns else None
+
+
+def scan_marketplaces(csv_path):
+    """只读取 marketplace 列确定报告中的站点，文件对象读取后回到原位置"""
+    position = csv_path.tell() if hasattr(csv_path, "tell") else None
+    df = read_payment_report(csv_path, usecols=["marketplace"])
+    if position is not None:
+        csv_path.seek(position)
+    return detect_marketplaces(marketplace_column(df))
+
+
+def split_marketplaces(df, bucket, marketplaces):
+    """
+    按站点拆分交易及其分桶标签，只有一个站点时不复制数据
+
+    返回:
+        dict: 站点 -> (交易, 分桶)
+    """
+    if len(marketplaces) == 1:
+        return {marketplaces[0]: (df, bucket)}
+    codes = assign_marketplaces(df, marketplaces).cat.codes.to_numpy()
+    parts = {}
+    for code, marketplace in enumerate(marketplaces):
+        rows = np.flatnonzero(codes == code)
+        parts[marketplace] = (df.take(rows), bucket.take(rows))
+    return parts
+
+
+def aggregate_transactions(df, bucket):
+    """
+    一个站点（或一个分块）的分桶合计、分桶行位置及销售 / 退款SKU汇总
+
+    返回:
+        tuple: (分桶合计矩阵, 分桶行位置, 销售SKU汇总, 退款SKU汇总)
+    """
+    totals = bucket_totals(df, bucket)
+    positions = bucket_positions(bucket)
+    order_skus = sku_quantities(select_buckets(df, positions, ORDER_BUCKETS))
+    refund_skus = sku_quantities(select_buckets(df, positions, REFUND_BUCKETS))
+    return totals, positions, order_skus, refund_skus
+
+
+def site_sheet_name(marketplace, sheet_name, marketplaces):
+    """多站点工作簿中各站点的sheet以站点名称为前缀，单站点时保持原名"""
+    if len(marketplaces) == 1:
+        return sheet_name
+    return f"{marketplace_info(marketplace)['site']}-{sheet_name}"
+
+
+def workbook_sheet_order(mode, marketplaces):
+    """
+    工作簿中的sheet顺序及每个sheet对应的原始sheet名称
+
+    单站点与原来的月报一致；多站点时先写站点汇总，再按站点依次写出各站点的一组sheet。
+
+    返回:
+        dict: sheet名称 -> (站点, 原始sheet名称)，站点汇总的站点为 None
+    """
+    order = {}
+    if len(marketplaces) > 1 and mode != REPORT_MODE_DETAILS:
+        order[MARKETPLACE_SUMMARY_SHEET] = (None, MARKETPLACE_SUMMARY_SHEET)
+    for marketplace in marketplaces:
+        for sheet_name in report_sheet_order(mode):
+            name = site_sheet_name(marketplace, sheet_name, marketplaces)
+            order[name] = (marketplace, sheet_name)
+    return order
+
+
+def marketplace_summary_row(row_count, summary):
+    """站点汇总中一个站点的交易行数、收入、支出与回款"""
+    pt4 = summary["总览草稿"].iloc[0]
+    return row_count, pt4["收入合计"], pt4["支出合计"], pt4["亚马逊回款金额"]
+
+
+def write_monthly_workbook(PRR, workbook_path, mode=REPORT_MODE_FULL):
+    """
+    在内存中完成月报计算并写出工作簿
+
+    合计与SKU汇总只依赖分桶结果，计算开销很小；耗时主要在写出大量原始行的
+    明细sheet，仅汇总模式跳过这些sheet，需要时再以仅明细模式单独生成。
+
+    一次读取、一次分桶的交易按 marketplace 拆分到各站点分别核算（各站点使用
+    自己的规则集与币种），多个站点时写出站点汇总及每个站点一组sheet。
+
+    返回:
+        dict: 站点 -> (分桶合计矩阵, 销售SKU汇总, 退款SKU汇总)
+    """
+    # 一次扫描为每条交易打上核算分桶，所有合计与明细都基于分桶结果
+    bucket = classify_transactions(PRR)
+    marketplaces = detect_marketplaces(marketplace_column(PRR))
+    sheet_order = workbook_sheet_order(mode, marketplaces)
+
+    aggregates = {}
+    summary_rows = {}
+    sheets_to_write = {}
+    parts = split_marketplaces(PRR, bucket, marketplaces)
+    for marketplace, (df, df_bucket) in parts.items():
+        totals, positions, order_skus, refund_skus = aggregate_transactions(
+            df, df_bucket
         )
-    ]
-
-    for src, dst in files_to_copy:
-        shutil.copy(src, dst)
-        os.remove(src)
-    PRR = payment_range_report
-    PRR.fillna(0, inplace=True)
-    PRR["quantity"] = PRR["quantity"].astype(int)
+        aggregates[marketplace] = (totals, order_skus, refund_skus)
+
+        site_sheets = {}
+        if mode != REPORT_MODE_DETAILS:
+            summary = build_summary_sheets(totals, order_skus, refund_skus, marketplace)
+            site_sheets.update(summary)
+            summary_rows[marketplace] = marketplace_summary_row(len(df), summary)
+        if mode != REPORT_MODE_SUMMARY:
+            site_sheets["交易一览"] = df
+            for sheet_name, buckets in DETAIL_SHEETS:
+                site_sheets[sheet_name] = select_buckets(df, positions, buckets)
+        for sheet_name, sheet in site_sheets.items():
+            sheets_to_write[site_sheet_name(marketplace, sheet_name, marketplaces)] = (
+                sheet
+            )
 
-    # DataFrame - Type 一级分类
-    Order = PRR.loc[PRR["type"].isin(["Order"])]
-    Refund = PRR.loc[PRR["type"].isin(["Refund"])]
-    # 空白 Type 分类
-    Blank = PRR.loc[PRR["type"] == 0]
-    # 服装类目的特殊退货收费，计算入仓储费
-    FBA_Customer_Return_Fee = PRR.loc[PRR["type"].isin(["FBA Customer Return Fee"])]
-    # 服务费增加新环节
-    Amazon_Fees_Reversal = PRR.loc[PRR["type"].isin(["Amazon Fees - Reversal"])]
-
-    Chargeback_Refund = PRR.loc[PRR["type"].isin(["Chargeback Refund"])]
-    Liquidation = PRR.loc[PRR["type"].isin(["Liquidations"])]
-    Adjustment = PRR.loc[PRR["type"].isin(["Adjustment"])]
-    Service_Fee = PRR.loc[PRR["type"].isin(["Service Fee"])]
-    FBA_Inventory_Reimbursement = PRR.loc[
-        PRR["type"].isin(["FBA Inventory Reimbursement"])
-    ]
-    FBA_Inventory_Fee = PRR.loc[PRR["type"].isin(["FBA Inventory Fee"])]
-    Amazon_Fees = PRR.loc[PRR["type"].isin(["Amazon Fees"])]
-    # Fee Adjustment 亚马逊 返还 的派送费(产品发货尺寸, 重新测量的费用)
-    Fee_Adjustment = PRR.loc[PRR["type"].isin(["Fee Adjustment"])]
-    LD = PRR.loc[PRR["type"].isin(["Deal Fee"])]
-    Debt = PRR.loc[PRR["type"].isin(["Debt"])]
-    FBA_Transaction_fees = PRR.loc[PRR["type"].isin(["FBA Transaction fees"])]
-
-    # DataFrame - fulfillment / Description 二级分类
-    FBA_Order = Order.loc[Order["fulfillment"].isin(["Amazon"])]
-    FBM_Order = Order.loc[Order["fulfillment"].isin(["Seller"])]
-
-    FBA_Refund = Refund.loc[Refund["fulfillment"].isin(["Amazon"])]
-    FBM_Refund = Refund.loc[Refund["fulfillment"].isin(["Seller"])]
-
-    # Income赔偿
-    # 不是FBA Inventory Reimbursement - General Adjustment 的其他赔偿
-    Adjustment_Income = Adjustment.loc[
-        ~Adjustment["description"].isin(
-            [
-                "FBA Inventory Reimbursement - General Adjustment",
-                "Non-subscription Fee Adjustment",
-            ]
+    if MARKETPLACE_SUMMARY_SHEET in sheet_order:
+        sheets_to_write[MARKETPLACE_SUMMARY_SHEET] = build_marketplace_summary(
+            summary_rows
         )
-    ]
-    # Expense赔偿
-    Adjustment_Expense = Adjustment.loc[
-        Adjustment["description"].isin(
-            [
-                "FBA Inventory Reimbursement - General Adjustment",
-                "Non-subscription Fee Adjustment",
-            ]
-        )
-    ]
-
-    Advertising = Service_Fee.loc[
-        Service_Fee["description"].isin(["Cost of Advertising"])
-    ]
-    Subscription = Service_Fee.loc[Service_Fee["description"].isin(["Subscription"])]
-    FBA_Inbound = Service_Fee.loc[
-        Service_Fee["description"].isin(["FBA Inbound Placement Service Fee"])
-    ]
-    AGL_Selection = Service_Fee.loc[
-        Service_Fee["description"].isin(
-            [
-                "FBA International Freight Shipping Charge",
-                "FBA International Freight Duties and Taxes Charge",
-            ]
-        )
-    ]
-    # AmazonFees 优惠券 + 一般服务费（不含广告）
-    Amazon_Fees_and_Service_Fee_without_AD = PRR.loc[
-        (PRR["type"].isin(["Amazon Fees", "Service Fee"]))
-        & (PRR["description"] != "Cost of Advertising")
-        & (PRR["description"] != "Refund for Advertiser")
-    ]
-
-    Service_Refund_for_Advertiser = Service_Fee.loc[
-        Service_Fee["description"].isin(["Refund for Advertiser"])
-    ]
-    # 空白, Description 二级分类包含Price Discount开头的项
-    Price_Discount = Blank.loc[Blank["description"].str.startswith("Price Discount")]
-
-    # 重新测量费的计算口径需要未来确认
-    Product_sales_non_FBA = round(FBM_Order["product sales"].sum(), 2)
-    Product_sale_refunds_non_FBA = round(FBM_Refund["product sales"].sum(), 2)
-    FBA_product_sales = round(FBA_Order["product sales"].sum(), 2)
-    FBA_product_sale_refunds = round(FBA_Refund["product sales"].sum(), 2) + round(
-        FBA_Refund["other"].sum(), 2
-    )  # FBA 退款的其他费用也计入退款
-    Fee_Adjustment_fee = round(
-        Fee_Adjustment.loc[
-            Fee_Adjustment["description"].isin(
-                ["Fee Adjustment - Weight and Dimension Change"]
+
+    # 使用 ExcelWriter 的上下文管理器
+    with pd.ExcelWriter(workbook_path, engine="xlsxwriter") as writer:
+        formats = add_report_formats(writer.book)
+
+        # 使用循环一次性写入所有sheet，样式在写入时完成
+        for sheet_name, (_, base_name) in sheet_order.items():
+            df = sheets_to_write[sheet_name]
+            # 报表核算与站点汇总使用自适应列宽，其他sheet使用固定列宽
+            widths = (
+                report_column_widths(df) if base_name in AUTO_WIDTH_SHEETS else None
             )
-        ]["total"].sum(),
-        2,
-    )
-    FBA_inventory_credit = round(Adjustment_Income["total"].sum(), 2)
-    FBA_liquidation_proceeds = round(Liquidation["product sales"].sum(), 2)
-    Shipping_credits = round(Order["shipping credits"].sum(), 2)
-    Shipping_credit_refunds = round(Refund["shipping credits"].sum(), 2)
-    Gift_wrap_credits = round(Order["gift wrap credits"].sum(), 2)
-    Gift_wrap_credits_refunds = round(Refund["gift wrap credits"].sum(), 2)
-    Promotional_rebates = round(Order["promotional rebates"].sum(), 2)
-    Promotional_rebate_refunds = round(Refund["promotional rebates"].sum(), 2)
-    A_to_z_Guarantee_claims = 0
-    Chargebacks = round(Chargeback_Refund["total"].sum(), 2)
-    SAFE_T_reimbursement = 0
-
-    Income_total = round(
-        Product_sales_non_FBA
-        + Product_sale_refunds_non_FBA
-        + FBA_product_sales
-        + FBA_product_sale_refunds
-        + FBA_inventory_credit
-        + FBA_liquidation_proceeds
-        + Shipping_credits
-        + Shipping_credit_refunds
-        + Gift_wrap_credits
-        + Gift_wrap_credits_refunds
-        + Promotional_rebates
-        + Promotional_rebate_refunds
-        + Chargebacks,
-        2,
+            write_report_sheet(writer, sheet_name, df, formats, widths)
+
+    return aggregates
+
+
+def _merge_sku_quantities(running, chunk_skus):
+    """合并分块的SKU汇总"""
+    if running is None:
+        return chunk_skus
+    return sku_quantities(pd.concat([running, chunk_skus], ignore_index=True))
+
+
+def stream_monthly_workbook(
+    csv_path,
+    workbook_path,
+    chunksize=STREAMING_CHUNK_ROWS,
+    tmpdir=None,
+    mode=REPORT_MODE_FULL,
+):
+    """
+    按块读取付款报告并流式写出月报工作簿（csv_path 与 workbook_path 也可以是文件对象）
+
+    每块数据完成分桶后只累加 分桶 × 数值列 合计和SKU数量汇总，明细行随即写入
+    constant_memory 模式的 xlsxwriter 工作表（按行落盘到临时文件），
+    因此内存占用只与块大小有关，与文件总行数无关。合计结果与内存模式一致。
+    workbook_path 应为文件路径：写入文件对象（如 BytesIO）时完成的工作簿整个保留在
+    内存中，内存占用随输出大小增长。明细超过 Excel 单个sheet的行数上限时报错。
+
+    工作表需要按最终顺序创建，因此先单独读取 marketplace 一列确定报告中的站点，
+    再按块读取全部数据，每块按站点拆分后分别累加。
+
+    返回:
+        dict: 站点 -> (分桶合计矩阵, 销售SKU汇总, 退款SKU汇总)
+    """
+    marketplaces = scan_marketplaces(csv_path)
+    workbook = xlsxwriter.Workbook(
+        workbook_path, {"constant_memory": True, "tmpdir": tmpdir}
     )
+    formats = add_report_formats(workbook)
+
+    # 按最终顺序创建所有sheet，汇总sheet在读完全部数据后再写入
+    sheet_order = workbook_sheet_order(mode, marketplaces)
+    sheets = {name: workbook.add_worksheet(name) for name in sheet_order}
+    row_counts = {name: 0 for name in sheet_order}
+    column_counts = {}
+
+    def append_rows(sheet_name, df):
+        if sheet_name not in sheets:
+            return
+        ws = sheets[sheet_name]
+        start = row_counts[sheet_name] + 1
+        # 超过行数上限时 xlsxwriter 不报错而是丢弃该行，明细会与合计对不上
+        if start + len(df) > EXCEL_MAX_ROWS:
+            raise ValueError(
+                f"{sheet_name} 超过 Excel 单个sheet的行数上限 {EXCEL_MAX_ROWS - 1} 行，"
+                "请改用仅汇总模式生成"
+            )
+        for offset, row in enumerate(df.to_numpy(dtype=object).tolist()):
+            ws.write_row(start + offset, 0, row)
+        row_counts[sheet_name] += len(df)
 
-    """计算 Expense (与PDF完全一致) """
-    Seller_fulfilled_selling_fees = round(FBM_Order["selling fees"].sum(), 2)
-    FBA_selling_fees = round(FBA_Order["selling fees"].sum(), 2)
-    Selling_fee_refunds = round(
-        Refund["selling fees"].sum(), 2
-    )  # 目前不确定是否是全部还是Order和Refund分别计算
-    FBA_transaction_fees = round(FBA_Order["fba fees"].sum(), 2) + round(
-        FBA_Transaction_fees["fba fees"].sum(), 2
-    )
-    FBA_transaction_fee_refunds = (
-        round(FBA_Refund["fba fees"].sum(), 2) + Fee_Adjustment_fee
-    )
-    Other_transaction_fees = 0
-    Other_transaction_fee_refunds = 0
-    FBA_inventory_and_inbound_services_fees = (
-        round(FBA_Inventory_Fee["total"].sum(), 2)
-        + round(FBA_Customer_Return_Fee["total"].sum(), 2)
-        + round(AGL_Selection["total"].sum(), 2)
-    )
-    Shipping_label_purchases = 0
-    Shipping_label_refunds = 0
-    Carrier_shipping_label_adjustments = 0
-    # 服务费 = 优惠券 + 一般服务费（不含广告）+ 闪电促销费 + Price Discount + Coupon Performance Based Fee
-    Coupon_Performance_Base_Fee = round(Amazon_Fees_Reversal["total"].sum(), 2)
-    Coupon_fee = round(Amazon_Fees["total"].sum(), 2)
-    Lightning_Deal_Fee = round(LD["total"].sum(), 2)
-    Service_Price_Discount = round(Price_Discount["total"].sum(), 2)
-    # 服务费去掉广告费用的综合 + 优惠券就是整体的PDF服务费计算
-    Service_fees_without_ADs = round(
-        Service_Fee.loc[
-            ~Service_Fee["description"].isin(
-                [
-                    "Cost of Advertising",
-                    "Refund for Advertiser",
-                    "FBA International Freight Shipping Charge",
-                    "FBA International Freight Duties and Taxes Charge",
+    running = {marketplace: [None, None, None, 0] for marketplace in marketplaces}
+    columns = None
+    try:
+        for chunk in read_payment_report(csv_path, chunksize=chunksize):
+            chunk = prepare_transactions(chunk)
+            if columns is None:
+                columns = list(chunk.columns)
+                for sheet_name, (_, base_name) in sheet_order.items():
+                    if base_name in RAW_SHEETS:
+                        write_report_header(sheets[sheet_name], columns, formats)
+                        column_counts[sheet_name] = len(columns)
+
+            bucket = classify_transactions(chunk)
+            parts = split_marketplaces(chunk, bucket, marketplaces)
+            for marketplace, (df, df_bucket) in parts.items():
+                chunk_totals, positions, chunk_order, chunk_refund = (
+                    aggregate_transactions(df, df_bucket)
+                )
+                totals, order_skus, refund_skus, row_count = running[marketplace]
+                running[marketplace] = [
+                    chunk_totals if totals is None else totals + chunk_totals,
+                    _merge_sku_quantities(order_skus, chunk_order),
+                    _merge_sku_quantities(refund_skus, chunk_refund),
+                    row_count + len(df),
                 ]
+                if mode != REPORT_MODE_SUMMARY:
+                    append_rows(
+                        site_sheet_name(marketplace, "交易一览", marketplaces), df
+                    )
+                    for sheet_name, buckets in DETAIL_SHEETS:
+                        append_rows(
+                            site_sheet_name(marketplace, sheet_name, marketplaces),
+                            select_buckets(df, positions, buckets),
+                        )
+
+        if columns is None:
+            raise ValueError("付款报告中没有交易数据")
+
+        aggregates = {}
+        summary_rows = {}
+        summary_sheets = {}
+        for marketplace, (
+            totals,
+            order_skus,
+            refund_skus,
+            row_count,
+        ) in running.items():
+            aggregates[marketplace] = (totals, order_skus, refund_skus)
+            summary = build_summary_sheets(totals, order_skus, refund_skus, marketplace)
+            summary_rows[marketplace] = marketplace_summary_row(row_count, summary)
+            for sheet_name, df in summary.items():
+                name = site_sheet_name(marketplace, sheet_name, marketplaces)
+                summary_sheets[name] = df
+        if len(marketplaces) > 1:
+            summary_sheets[MARKETPLACE_SUMMARY_SHEET] = build_marketplace_summary(
+                summary_rows
             )
-        ]["total"].sum(),
-        2,
-    )
-    Service_fees = (
-        Coupon_fee
-        + Service_fees_without_ADs
-        + Lightning_Deal_Fee
-        + Service_Price_Discount
-        + Coupon_Performance_Base_Fee
-    )
 
-    # 退款管理费和佣金退款合并计算在PDF中是和佣金退款合并的，所以是0
-    Refund_administration_fees = 0
-    Adjustments = round(Adjustment_Expense["total"].sum(), 2)
-    Cost_of_Advertising = round(Advertising["total"].sum(), 2)
-    Refund_for_Advertiser = round(Service_Refund_for_Advertiser["total"].sum(), 2)
-    # Liquidation 清算费用
-    Liquidations_fees = round(Liquidation["other transaction fees"].sum(), 2)
-    Receivables = 0
-    Deductions = 0
-    Amazon_Shipping_Charge_Adjustments = 0
-
-    Expense_total = round(
-        Seller_fulfilled_selling_fees
-        + FBA_selling_fees
-        + Selling_fee_refunds
-        + FBA_transaction_fees
-        + FBA_transaction_fee_refunds
-        + Other_transaction_fees
-        + Other_transaction_fee_refunds
-        + FBA_inventory_and_inbound_services_fees
-        + Shipping_label_purchases
-        + Shipping_label_refunds
-        + Carrier_shipping_label_adjustments
-        + Service_fees
-        + Refund_administration_fees
-        + Adjustments
-        + Cost_of_Advertising
-        + Refund_for_Advertiser
-        + Liquidations_fees
-        + Receivables
-        + Deductions
-        + Amazon_Shipping_Charge_Adjustments,
-        2,
-    )
+        for sheet_name, df in summary_sheets.items():
+            if sheet_name not in sheets:
+                continue
+            _, base_name = sheet_order[sheet_name]
+            widths = (
+                report_column_widths(df) if base_name in AUTO_WIDTH_SHEETS else None
+            )
+            write_report_header(sheets[sheet_name], df.columns, formats, widths)
+            append_rows(sheet_name, df)
+            column_counts[sheet_name] = len(df.columns)
+
+        for sheet_name in sheet_order:
+            add_report_borders(
+                sheets[sheet_name],
+                row_counts[sheet_name],
+                column_counts[sheet_name],
+                formats,
+            )
+    finally:
+        workbook.close()
 
-    # 销售SKU明细
-    skuGroup = Order.groupby(["sku"], as_index=False).agg({"quantity": "sum"})
-    Order_QTY = int(Order["quantity"].sum())
+    return aggregates
 
-    # 退款SKU明细
-    refund_skuGroup = Refund.groupby(["sku"], as_index=False).agg({"quantity": "sum"})
-    Refund_QTY = int(Refund["quantity"].sum())
 
-    # 平台推广费用
-    spFee = Cost_of_Advertising
-    spCount = format(abs(spFee) / Income_total, ".2%")
+# 各生成模式的文件名后缀（本地文件, 下载文件）
+REPORT_MODE_SUFFIXES = {
+    REPORT_MODE_FULL: ("", ""),
+    REPORT_MODE_SUMMARY: ("_summary", "_汇总"),
+    REPORT_MODE_DETAILS: ("_details", "_明细"),
+}
 
-    # 信用卡扣费
-    AMZ_Card = round(Debt["total"].sum(), 2)
 
-    # 处理子项求和筛选展示
+def archive_monthly_report(workbook_path, file_content):
+    """
+    在后台线程中把生成的月报归档到 project/<项目名>/月报，不占用响应时间
 
-    # PT4核算数据，展示国内的收入和支出明细逻辑（不同于亚马逊PDF核算逻辑）
-    pt4_income_sales = (
-        Product_sales_non_FBA
-        + FBA_product_sales
-        + Shipping_credits
-        + Gift_wrap_credits
-        + Promotional_rebates
-    )
-    pt4_income_refund = (
-        Product_sale_refunds_non_FBA
-        + FBA_product_sale_refunds
-        + Shipping_credit_refunds
-        + Gift_wrap_credits_refunds
-        + Promotional_rebate_refunds
-    )
-    pt4_income_adjustment = FBA_inventory_credit + FBA_liquidation_proceeds
-    pt4_income_chargeback = Chargebacks + A_to_z_Guarantee_claims + SAFE_T_reimbursement
-    pt4_income_total = (
-        pt4_income_sales
-        + pt4_income_refund
-        + pt4_income_adjustment
-        + pt4_income_chargeback
-    )
+    返回:
+        threading.Thread: 归档线程，需要等待归档完成时可 join
+    """
 
-    pt4_expense_selling_fee = (
-        Seller_fulfilled_selling_fees + FBA_selling_fees + Selling_fee_refunds
-    )  # 平台费（平台费 + 退款管理费）
-    pt4_expense_fba_fee = FBA_transaction_fees + FBA_transaction_fee_refunds  # 派送费
-    pt4_expense_inventory_fee = FBA_inventory_and_inbound_services_fees  # 仓储费
-    pt4_service_fee = Service_fees  # 服务费（不含广告)
-    pt4_expense_advertising = Cost_of_Advertising + Refund_for_Advertiser  # 广告费
-    pt4_expense_other_fees = (
-        Adjustments
-        + Liquidations_fees
-        + Other_transaction_fees
-        + Other_transaction_fee_refunds
-        + Receivables
-        + Deductions
-        + Amazon_Shipping_Charge_Adjustments
-        + Shipping_label_purchases
-        + Shipping_label_refunds
-        + Carrier_shipping_label_adjustments
-    )
-    pt4_expense_total = (
-        pt4_expense_selling_fee
-        + pt4_expense_fba_fee
-        + pt4_expense_inventory_fee
-        + pt4_service_fee
-        + pt4_expense_advertising
-        + pt4_expense_other_fees
+    def write_archive():
+        try:
+            os.makedirs(os.path.dirname(workbook_path), exist_ok=True)
+            with open(workbook_path, "wb") as f:
+                f.write(file_content)
+        except Exception as e:
+            print(f"归档月报失败: {workbook_path}, {e}")
+
+    thread = threading.Thread(target=write_archive, name="monthly-report-archive")
+    thread.start()
+    return thread
+
+
+def process_monthly_report(
+    project_name,
+    report_date,
+    payment_range_report,
+    chunksize=None,
+    mode=REPORT_MODE_FULL,
+    archive=True,
+):
+    """
+    生成月报
+
+    内存模式下付款报告直接从上传的文件对象解析，工作簿写入内存，不再经过临时文件和
+    写盘后再读回；归档到项目月报目录在后台线程中完成。
+
+    流式模式下工作簿写入项目 tmp 目录中的文件，完成后移动到月报目录作为归档，
+    返回该文件的路径，由调用方直接发送或复制，工作簿内容不在内存中保留。
+
+    参数:
+        payment_range_report: 付款报告文件对象
+        chunksize: 指定时使用流式模式按块读取付款报告，适用于超大文件
+        mode: 生成模式，仅汇总模式只写总览草稿、报表核算及SKU明细；
+            仅明细模式只写交易一览及各明细sheet。同一份付款报告的解析结果
+            已缓存，先下载汇总再下载明细不会重复解析
+        archive: 是否归档生成的工作簿；流式模式不归档时返回 tmp 目录中的文件，
+            由调用方负责删除
+
+    返回:
+        tuple: (工作簿内容 bytes，流式模式下为工作簿文件路径, 下载文件名)
+    """
+    local_suffix, download_suffix = REPORT_MODE_SUFFIXES[mode]
+    current_time = datetime.datetime.now().strftime("%H-%M-%S")
+    source_folder = os.getcwd()
+    project_folder = os.path.join(source_folder, "project", project_name)
+    archive_path = os.path.join(
+        project_folder,
+        "月报",
+        f"{project_name}_{report_date}_monthly{local_suffix}_{current_time}.xlsx",
     )
 
-    amazon_pay_back = pt4_income_total + pt4_expense_total
-
-    # 准备汇总数据
-    pt1 = skuGroup.sort_values(by="quantity", ascending=False, inplace=False)
-    pt2 = refund_skuGroup.sort_values(by="quantity", ascending=False, inplace=False)
-
-    pt3 = pd.DataFrame(
-        {
-            "Income": [
-                "Product sales (non-FBA)",
-                "Product sale refunds (non-FBA) ",
-                "FBA product sales",
-                "FBA product sale refunds",
-                "FBA inventory credit",
-                "FBA liquidation proceeds",
-                "Shipping credits",
-                "Shipping credit refunds",
-                "Gift wrap credits",
-                "Gift wrap credit refunds",
-                "Promotional rebates",
-                "Promotional rebate refunds",
-                "A-to-z Guarantee claims",
-                "Chargebacks",
-                "SAFE-T reimbursement",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "Total_Income",
-            ],
-            "收入": [
-                "销售额（非FBA）",
-                "销售额退款（非FBA）",
-                "销售额（FBA）",
-                "销售额退款（FBA）",
-                "FBA库存赔偿（FBA）",
-                "FBA清算收入",
-                "运费收入",
-                "运费退款",
-                "礼品包装收入",
-                "礼品包装退款",
-                "促销折扣",
-                "促销折扣退款",
-                "A-to-z保障索赔",
-                "拒付退款",
-                "SAFE-T赔偿",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "合计销售额",
-            ],
-            "In金额（USD）": [
-                Product_sales_non_FBA,
-                Product_sale_refunds_non_FBA,
-                FBA_product_sales,
-                FBA_product_sale_refunds,
-                FBA_inventory_credit,
-                FBA_liquidation_proceeds,
-                Shipping_credits,
-                Shipping_credit_refunds,
-                Gift_wrap_credits,
-                Gift_wrap_credits_refunds,
-                Promotional_rebates,
-                Promotional_rebate_refunds,
-                A_to_z_Guarantee_claims,
-                Chargebacks,
-                SAFE_T_reimbursement,
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                Income_total,
-            ],
-            "In源表": [
-                "FBM 订单-订单金额",
-                "FBM 退款-订单金额",
-                "FBA 订单-订单金额",
-                "FBA 退款-订单金额",
-                "FBA库存赔偿-订单金额+其他金额",
-                "清算费用-订单金额",
-                "所有订单-运费金额",
-                "所有退款-运费金额",
-                "所有订单-礼品包装金额",
-                "所有退款-礼品包装金额",
-                "所有订单-促销折扣金额",
-                "所有退款-促销折扣金额",
-                "",
-                "拒付退款-总计",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-            ],
-            "": [
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-            ],
-            "Expense": [
-                "Seller fulfilled selling fees",
-                "FBA selling fees",
-                "Selling fee refunds",
-                "FBA transaction fees",
-                "FBA transaction fee refunds",
-                "Other transaction fees",
-                "Other transaction fee refunds",
-                "FBA inventory and inbound services fees",
-                "Shipping label purchases",
-                "Shipping label refunds",
-                "Carrier shipping label adjustments",
-                "Service fees",
-                "Refund administration fees",
-                "Adjustments",
-                "Cost of Advertising",
-                "Refund for Advertiser",
-                "Liquidations fees",
-                "Receivables",
-                "Deductions",
-                "Amazon Shipping Charge Adjustments",
-                "",
-                "Total_Expense",
-            ],
-            "支出": [
-                "卖家自配送销售佣金",
-                "FBA销售佣金",
-                "销售佣金退款",
-                "FBA派送费",
-                "FBA派送费退款",
-                "其他交易费用",
-                "其他交易费用退款",
-                "FBA库存和入库服务费",
-                "购买配送标签",
-                "配送标签退款",
-                "承运商配送标签调整",
-                "服务费",
-                "退款管理费",
-                "调整项",
-                "广告成本",
-                "广告商退款",
-                "清算处理费",
-                "应收账款",
-                "扣款",
-                "亚马逊配送运费调整",
-                "",
-                "合计费用",
-            ],
-            "Ex金额（USD）": [
-                Seller_fulfilled_selling_fees,
-                FBA_selling_fees,
-                Selling_fee_refunds,
-                FBA_transaction_fees,
-                FBA_transaction_fee_refunds,
-                Other_transaction_fees,
-                Other_transaction_fee_refunds,
-                FBA_inventory_and_inbound_services_fees,
-                Shipping_label_purchases,
-                Shipping_label_refunds,
-                Carrier_shipping_label_adjustments,
-                Service_fees,
-                Refund_administration_fees,
-                Adjustments,
-                Cost_of_Advertising,
-                Refund_for_Advertiser,
-                Liquidations_fees,
-                Receivables,
-                Deductions,
-                Amazon_Shipping_Charge_Adjustments,
-                "",
-                Expense_total,
-            ],
-            "Ex源表": [
-                "FBM 订单-销售佣金",
-                "FBA 订单-销售佣金",
-                "所有退款-销售佣金 + 退款管理费",
-                "FBA 订单 - 派送费",
-                "FBA 退款 - 派送费 + 测量费",
-                "",
-                "",
-                "FBA仓储及入库服务费 - 总计",
-                "",
-                "",
-                "",
-                "服务费（不含广告）-总计",
-                "合并在销售佣金退款中扣除",
-                "其他赔偿调整-总计",
-                "广告费-总计",
-                "广告退款-总计",
-                "清算费用-其他交易费用",
-                "",
-                "",
-                "",
-                "",
-                "",
-            ],
-        }
-    )
+    if chunksize:
+        # constant_memory 模式按行把工作表写入临时文件，工作簿直接写到磁盘
+        tmp_folder_path = os.path.join(project_folder, "tmp")
+        os.makedirs(tmp_folder_path, exist_ok=True)
+        workbook_path = os.path.join(tmp_folder_path, os.path.basename(archive_path))
+        try:
+            aggregates = stream_monthly_workbook(
+                payment_range_report,
+                workbook_path,
+                chunksize=chunksize,
+                tmpdir=tmp_folder_path,
+                mode=mode,
+            )
+        except Exception:
+            if os.path.exists(workbook_path):
+                os.remove(workbook_path)
+            raise
+    else:
+        # 同一文件重复生成时直接读取缓存的解析结果
+        PRR = load_cached_report(
+            project_name,
+            payment_range_report.read(),
+            read_payment_report,
+            kind="payment_report",
+            version=2,
+        )
+        PRR = prepare_transactions(PRR)
+        output = io.BytesIO()
+        aggregates = write_monthly_workbook(PRR, output, mode)
+
+    # 按站点保存本月的分桶合计与SKU汇总，季度 / 年度汇总直接合并已保存的月份
+    for marketplace, parts in aggregates.items():
+        save_month_aggregates(
+            project_name, report_date, *parts, marketplace=marketplace
+        )
 
-    # 按照行横向顺序写入Excel
-    pt4 = pd.DataFrame(
-        {
-            "1-销售额": [pt4_income_sales],
-            "2-销售额退款": [pt4_income_refund],
-            "3-赔偿": [pt4_income_adjustment],
-            "4-其他收入": [pt4_income_chargeback],
-            "5-平台费": [pt4_expense_selling_fee],
-            "6-派送费": [pt4_expense_fba_fee],
-            "7-仓储费": [pt4_expense_inventory_fee],
-            "8-服务费": [pt4_service_fee],
-            "9-广告费": [pt4_expense_advertising],
-            "10-其他费用": [pt4_expense_other_fees],
-            "收入合计": [pt4_income_total],
-            "支出合计": [pt4_expense_total],
-            "亚马逊回款金额": [amazon_pay_back],
-            "信用卡扣款-支出": [AMZ_Card],
-        },
-        index=[0],
-    )
+    if len(aggregates) == 1:
+        site = marketplace_info(next(iter(aggregates)))["site"]
+    else:
+        site = MULTI_MARKETPLACE_SITE
+    report_name = f"{project_name}_{site}_{report_date}"
 
-    project_monthly_file_path = os.path.join(
-        project_folder_path, f"{project_name}_{report_date}_monthly_{current_time}.xlsx"
-    )
+    if chunksize:
+        file_content = workbook_path
+        if archive:
+            os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+            shutil.move(workbook_path, archive_path)
+            file_content = archive_path
+    else:
+        file_content = output.getvalue()
+        if archive:
+            archive_monthly_report(archive_path, file_content)
 
-    # 使用 ExcelWriter 的上下文管理器
-    with pd.ExcelWriter(project_monthly_file_path, engine="xlsxwriter") as writer:
-        # 创建一个字典来存储所有需要写入的数据帧和对应的sheet名称
-        sheets_to_write = {
-            "总览草稿": pt4,
-            "报表核算": pt3,
-            "交易一览": PRR,
-            "销售SKU明细": pt1,
-            "退款SKU明细": pt2,
-            "所有订单": Order,
-            "所有退款": Refund,
-            "FBM 订单": FBM_Order,
-            "FBM 退款": FBM_Refund,
-            "FBA 订单": FBA_Order,
-            "FBA 退款": FBA_Refund,
-            "FBA库存赔偿": Adjustment_Income,
-            "其他赔偿": Adjustment_Expense,
-            "清算费用": Liquidation,  # Liquidation['product sales']
-            "拒付退款": Chargeback_Refund,
-            "FBA仓储及入库服务费": FBA_Inventory_Fee,
-            "服务费（不含广告）": Amazon_Fees_and_Service_Fee_without_AD,
-            "广告费": Advertising,
-            "广告退款": Service_Refund_for_Advertiser,
-        }
-
-        # 使用循环一次性写入所有sheet
-        for sheet_name, df in sheets_to_write.items():
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-    # 重置样式
-    reset_style(project_monthly_file_path)
-
-    # 使用with语句读取文件内容
-    with open(project_monthly_file_path, "rb") as f:
-        file_content = f.read()
-
-    return file_content, f"月度财务报表_{report_name}.xlsx"
+    return file_content, f"月度财务报表_{report_name}{download_suffix}.xlsx"
 
 
-@monthly_report_bp.route("/monthly-report", methods=["GET", "POST"])
-def monthly_report():
-    if request.method == "POST":
-        project_name = request.form.get("project_name")
-        report_date = request.form.get("report_date")
-        payment_report_path = request.form.get("payment_report_path")
+def streaming_chunksize(payment_report_path):
+    """超大文件使用流式模式，内存占用不随文件大小增长；返回 None 表示内存模式"""
+    if os.path.getsize(payment_report_path) > STREAMING_THRESHOLD_BYTES:
+        return STREAMING_CHUNK_ROWS
+    return None
 
-        if not project_name or not report_date or not payment_report_path:
-            flash("请填写所有必填项并上传文件")
-            return redirect(url_for("dataset.monthly_report"))
 
-        if not os.path.exists(payment_report_path):
-            flash("文件不存在，请重新上传")
-            return redirect(url_for("dataset.monthly_report"))
+def generate_monthly_report(mode):
+    """根据表单生成月报并返回下载响应，出错时重定向回月报页面"""
+    project_name = request.form.get("project_name")
+    report_date = request.form.get("report_date")
+    payment_report_path = request.form.get("payment_report_path")
 
-        try:
-            # 读取已上传的文件内容
-            with open(payment_report_path, "rb") as f:
-                file_bytes = f.read()
+    if not project_name or not report_date or not payment_report_path:
+        flash("请填写所有必填项并上传文件")
+        return redirect(url_for("dataset.monthly_report"))
 
-            # 创建一个临时类来模拟FileStorage对象
-            class MockFileStorage:
-                def __init__(self, filename, content):
-                    self.filename = filename
-                    self.content = content
+    if not os.path.exists(payment_report_path):
+        flash("文件不存在，请重新上传")
+        return redirect(url_for("dataset.monthly_report"))
 
-                def read(self):
-                    return self.content
+    if mode not in REPORT_MODES:
+        flash(f"不支持的生成模式: {mode}")
+        return redirect(url_for("dataset.monthly_report"))
 
-            payment_range_report = MockFileStorage(
-                filename=os.path.basename(payment_report_path), content=file_bytes
-            )
+    try:
+        chunksize = streaming_chunksize(payment_report_path)
+        with open(payment_report_path, "rb") as payment_range_report:
             file_content, filename = process_monthly_report(
-                project_name, report_date, payment_range_report
+                project_name, report_date, payment_range_report, chunksize, mode
             )
 
-            # 记录生成月报成功日志
-            LogService.log(
-                action="生成月报",
-                resource="月报功能",
-                details=f"项目: {project_name}, 日期: {report_date}, 文件: {filename}",
-                log_type="user",
-                level="info",
-            )
+        # 记录生成月报成功日志
+        LogService.log(
+            action="生成月报",
+            resource="月报功能",
+            details=f"项目: {project_name}, 日期: {report_date}, 模式: {mode}, 文件: {filename}",
+            log_type="user",
+            level="info",
+        )
 
-            # 创建响应对象
-            response = send_file(
-                io.BytesIO(file_content),
-                as_attachment=True,
-                download_name=filename,
-                mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
+        # 创建响应对象，流式模式返回的是已归档的工作簿文件，直接发送该文件
+        if isinstance(file_content, bytes):
+            file_content = io.BytesIO(file_content)
+        response = send_file(
+            file_content,
+            as_attachment=True,
+            download_name=filename,
+            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
 
-            # 添加响应头，通知前端重置表单
-            response.headers["X-Form-Reset"] = "true"
+        # 完整月报生成后通知前端重置表单；仅汇总 / 仅明细时保留已上传的付款报告，
+        # 以便用同一份报告继续下载另一部分
+        response.headers["X-Form-Reset"] = (
+            "true" if mode == REPORT_MODE_FULL else "false"
+        )
+
+        return response
+    except Exception as e:
+        # 记录生成月报失败日志
+        LogService.log(
+            action="生成月报失败",
+            resource="月报功能",
+            details=f"项目: {project_name}, 日期: {report_date}, 模式: {mode}, 错误: {str(e)}",
+            log_type="user",
+            level="error",
+        )
+        flash(f"生成月报时发生错误: {str(e)}", "error")
+        return redirect(url_for("dataset.monthly_report"))
 
-            return response
-        except Exception as e:
-            # 记录生成月报失败日志
-            LogService.log(
-                action="生成月报失败",
-                resource="月报功能",
-                details=f"项目: {project_name}, 日期: {report_date}, 错误: {str(e)}",
-                log_type="user",
-                level="error",
-            )
-            flash(f"生成月报时发生错误: {str(e)}", "error")
-            return redirect(url_for("dataset.monthly_report"))
+
+@monthly_report_bp.route("/monthly-report", methods=["GET", "POST"])
+def monthly_report():
+    if request.method == "POST":
+        mode = request.form.get("report_mode") or REPORT_MODE_FULL
+        return generate_monthly_report(mode)
 
     return render_template("data-analysis/monthly_report.html")
+
+
+@monthly_report_bp.route("/monthly-report/details", methods=["POST"])
+def monthly_report_details():
+    """单独下载明细sheet（交易一览、订单、退款及各费用明细）"""
+    return generate_monthly_report(REPORT_MODE_DETAILS)
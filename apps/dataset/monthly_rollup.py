@@ -0,0 +1,158 @@
+"""
+季度 / 年度汇总模块
+合并已保存的月度分桶合计与SKU汇总，生成季度或年度的总览草稿、报表核算、
+各月汇总及SKU明细，不需要重新读取各月的付款报告。
+"""
+
+import io
+
+import pandas as pd
+from flask import Blueprint, request, send_file, redirect, url_for, flash
+
+from core.log_service import LogService
+from apps.dataset.monthly_report import (
+    add_report_formats,
+    build_summary_sheets,
+    report_column_widths,
+    write_report_sheet,
+)
+from apps.dataset.marketplaces import (
+    DEFAULT_MARKETPLACE,
+    MARKETPLACES,
+    marketplace_info,
+)
+from apps.dataset.monthly_store import (
+    combine_month_aggregates,
+    load_month_aggregates,
+    period_months,
+    stored_months,
+)
+from apps.dataset.reconciliation import (
+    evaluate_rules,
+    build_overview_sheet,
+    get_rule_set,
+)
+
+monthly_rollup_bp = Blueprint("monthly_rollup", __name__)
+
+MONTHLY_SUMMARY_COLUMNS = ["月份", "状态", "收入合计", "支出合计", "亚马逊回款金额"]
+
+
+def build_month_summary(months, aggregates, marketplace=DEFAULT_MARKETPLACE):
+    """各月收入、支出与回款，未生成月报的月份标记为未生成"""
+    rule_set = get_rule_set(marketplace)
+    rows = []
+    for month in months:
+        if month not in aggregates:
+            rows.append([month, "未生成", None, None, None])
+            continue
+        values = evaluate_rules(aggregates[month][0], rule_set)
+        _, amazon_pay_back = build_overview_sheet(values, rule_set)
+        rows.append(
+            [
+                month,
+                "已汇总",
+                values["income_total"],
+                values["expense_total"],
+                round(amazon_pay_back, 2),
+            ]
+        )
+    return pd.DataFrame(rows, columns=MONTHLY_SUMMARY_COLUMNS)
+
+
+def build_rollup_sheets(project_name, period, marketplace=DEFAULT_MARKETPLACE):
+    """
+    合并周期内某站点已保存的月份，生成汇总sheet
+
+    返回:
+        dict: sheet名称 -> DataFrame，顺序即工作簿中的顺序
+    """
+    months = period_months(period)
+    aggregates = {}
+    for month in months:
+        stored = load_month_aggregates(project_name, month, marketplace)
+        if stored is not None:
+            aggregates[month] = stored
+    if not aggregates:
+        available = "、".join(stored_months(project_name, marketplace)) or "无"
+        site = marketplace_info(marketplace)["site"]
+        raise ValueError(
+            f"{project_name} {site} 在 {period} 内没有已生成的月报，"
+            f"已生成的月份: {available}"
+        )
+
+    totals, order_skus, refund_skus = combine_month_aggregates(aggregates.values())
+    summary = build_summary_sheets(totals, order_skus, refund_skus, marketplace)
+    return {
+        "总览草稿": summary["总览草稿"],
+        "报表核算": summary["报表核算"],
+        "各月汇总": build_month_summary(months, aggregates, marketplace),
+        "销售SKU明细": summary["销售SKU明细"],
+        "退款SKU明细": summary["退款SKU明细"],
+    }
+
+
+def write_rollup_workbook(
+    project_name, period, workbook_path, marketplace=DEFAULT_MARKETPLACE
+):
+    """写出季度 / 年度汇总工作簿"""
+    sheets = build_rollup_sheets(project_name, period, marketplace)
+    with pd.ExcelWriter(workbook_path, engine="xlsxwriter") as writer:
+        formats = add_report_formats(writer.book)
+        for sheet_name, df in sheets.items():
+            widths = (
+                report_column_widths(df)
+                if sheet_name in ("报表核算", "各月汇总")
+                else None
+            )
+            write_report_sheet(writer, sheet_name, df, formats, widths)
+    return sheets
+
+
+@monthly_rollup_bp.route("/rollup", methods=["POST"])
+def monthly_report_rollup():
+    """根据已生成的月报汇总季度或年度报表"""
+    project_name = request.form.get("project_name")
+    period = (request.form.get("period") or "").strip()
+    marketplace = request.form.get("marketplace") or DEFAULT_MARKETPLACE
+
+    if not project_name or not period:
+        flash("请选择项目并填写汇总周期")
+        return redirect(url_for("dataset.monthly_report"))
+    if marketplace not in MARKETPLACES:
+        flash(f"不支持的站点: {marketplace}")
+        return redirect(url_for("dataset.monthly_report"))
+
+    try:
+        output = io.BytesIO()
+        write_rollup_workbook(project_name, period, output, marketplace)
+        output.seek(0)
+        site = marketplace_info(marketplace)["site"]
+        filename = f"财务汇总报表_{project_name}_{site}_{period}.xlsx"
+
+        LogService.log(
+            action="生成季度年度汇总",
+            resource="月报功能",
+            details=f"项目: {project_name}, 站点: {marketplace}, 周期: {period}, 文件: {filename}",
+            log_type="user",
+            level="info",
+        )
+
+        response = send_file(
+            output,
+            as_attachment=True,
+            download_name=filename,
+            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+        response.headers["X-Form-Reset"] = "true"
+        return response
+    except Exception as e:
+        LogService.log(
+            action="生成季度年度汇总失败",
+            resource="月报功能",
+            details=f"项目: {project_name}, 站点: {marketplace}, 周期: {period}, 错误: {str(e)}",
+            log_type="user",
+            level="error",
+        )
+        flash(f"生成汇总报表时发生错误: {str(e)}", "error")
+        return redirect(url_for("dataset.monthly_report"))
@@ -0,0 +1,147 @@
+"""
+月度汇总存储模块
+每次生成月报后，把该 (项目, 月份) 的 分桶 × 数值列 合计与销售 / 退款SKU数量
+保存到 project/<项目名>/aggregates/<月份> 下，默认站点以外的站点保存在
+<月份>/<marketplace> 子目录。季度、年度汇总直接合并已保存的月份结果，
+不再重新读取原始交易。
+"""
+
+import os
+import re
+
+import pandas as pd
+
+from core.config import PATH_CONFIG
+from apps.dataset.marketplaces import DEFAULT_MARKETPLACE
+from apps.dataset.payment_classifier import BUCKETS
+from apps.dataset.report_cache import CACHE_EXTENSIONS, write_frame, read_frame
+
+AGGREGATES_FOLDER_NAME = "aggregates"
+AGGREGATE_PARTS = ("totals", "order_skus", "refund_skus")
+
+PERIOD_PATTERN = re.compile(r"^(\d{4})(?:-(?:Q([1-4])|(\d{2})))?$")
+
+
+def get_month_folder(project_name, report_date, marketplace=DEFAULT_MARKETPLACE):
+    """项目某月份（某站点）的汇总目录"""
+    folder = os.path.join(
+        os.getcwd(),
+        PATH_CONFIG["project_data"],
+        project_name,
+        AGGREGATES_FOLDER_NAME,
+        report_date,
+    )
+    if marketplace != DEFAULT_MARKETPLACE:
+        folder = os.path.join(folder, marketplace)
+    return folder
+
+
+def save_month_aggregates(
+    project_name,
+    report_date,
+    totals,
+    order_skus,
+    refund_skus,
+    marketplace=DEFAULT_MARKETPLACE,
+):
+    """保存某月份某站点的分桶合计与SKU数量汇总，同一月份重新生成时覆盖"""
+    folder = get_month_folder(project_name, report_date, marketplace)
+    os.makedirs(folder, exist_ok=True)
+    frames = {
+        "totals": totals.reset_index().astype({"bucket": str}),
+        "order_skus": order_skus,
+        "refund_skus": refund_skus,
+    }
+    for part, df in frames.items():
+        write_frame(df, os.path.join(folder, part))
+
+
+def load_month_aggregates(project_name, report_date, marketplace=DEFAULT_MARKETPLACE):
+    """
+    读取某月份某站点的汇总
+
+    返回:
+        tuple 或 None: (分桶合计矩阵, 销售SKU汇总, 退款SKU汇总)，该月份未生成过时为 None
+    """
+    folder = get_month_folder(project_name, report_date, marketplace)
+    frames = [read_frame(os.path.join(folder, part)) for part in AGGREGATE_PARTS]
+    if any(df is None for df in frames):
+        return None
+    totals, order_skus, refund_skus = frames
+    totals = totals.set_index("bucket").reindex(BUCKETS, fill_value=0)
+    totals.index = pd.CategoricalIndex(totals.index, categories=BUCKETS, name="bucket")
+    return totals, order_skus, refund_skus
+
+
+def stored_months(project_name, marketplace=DEFAULT_MARKETPLACE):
+    """项目某站点已保存汇总的月份列表"""
+    folder = os.path.dirname(get_month_folder(project_name, "_"))
+    if not os.path.isdir(folder):
+        return []
+    return sorted(
+        name
+        for name in os.listdir(folder)
+        if PERIOD_PATTERN.match(name)
+        and any(
+            os.path.isfile(
+                os.path.join(
+                    get_month_folder(project_name, name, marketplace),
+                    f"totals{extension}",
+                )
+            )
+            for extension in CACHE_EXTENSIONS
+        )
+    )
+
+
+def period_months(period):
+    """
+    解析汇总周期
+
+    参数:
+        period: "2025" 表示全年，"2025-Q4" 表示季度，"2025-11" 表示单月
+
+    返回:
+        list: 周期内的月份，如 ["2025-10", "2025-11", "2025-12"]
+    """
+    match = PERIOD_PATTERN.match(str(period).strip())
+    if not match:
+        raise ValueError(f"汇总周期格式错误: {period}，应为 2025、2025-Q4 或 2025-11")
+    year, quarter, month = match.groups()
+    if quarter:
+        first = (int(quarter) - 1) * 3 + 1
+        months = range(first, first + 3)
+    elif month:
+        if not 1 <= int(month) <= 12:
+            raise ValueError(f"汇总周期格式错误: {period}")
+        months = [int(month)]
+    else:
+        months = range(1, 13)
+    return [f"{year}-{m:02d}" for m in months]
+
+
+def combine_month_aggregates(aggregates):
+    """
+    合并多个月份的汇总
+
+    分桶合计直接相加；SKU数量按SKU重新汇总。
+
+    返回:
+        tuple: (分桶合计矩阵, 销售SKU汇总, 退款SKU汇总)
+    """
+    totals = None
+    order_parts = []
+    refund_parts = []
+    for month_totals, order_skus, refund_skus in aggregates:
+        totals = month_totals if totals is None else totals + month_totals
+        order_parts.append(order_skus)
+        refund_parts.append(refund_skus)
+
+    def merge_skus(parts):
+        skus = pd.concat(parts, ignore_index=True)
+        # 缺失SKU填充为0，与文本SKU混合无法排序，按首次出现顺序汇总
+        return skus.groupby(["sku"], as_index=False, sort=False).agg(
+            {"quantity": "sum"}
+        )
+
+    return totals, merge_skus(order_parts), merge_skus(refund_parts)
@@ -0,0 +1,174 @@
+"""
+付款报告交易分类模块
+一次向量化扫描为 Custom Unified Transaction 的每条交易打上核算分桶标签，
+月报中的收入/支出合计与各明细 sheet 都基于分桶结果生成
+"""
+
+import numpy as np
+import pandas as pd
+
+# 分桶规则表：(分桶, type, fulfillment, description 集合, description 前缀)
+# 按顺序匹配，第一条命中的规则决定分桶；None 表示该维度不限
+# type 为 0 表示原始报表中 type 为空（读取后 fillna(0)）
+BUCKET_RULES = [
+    ("order_fba", "Order", "Amazon", None, None),
+    ("order_fbm", "Order", "Seller", None, None),
+    ("order_other", "Order", None, None, None),
+    ("refund_fba", "Refund", "Amazon", None, None),
+    ("refund_fbm", "Refund", "Seller", None, None),
+    ("refund_other", "Refund", None, None, None),
+    ("blank_price_discount", 0, None, None, "Price Discount"),
+    ("blank_other", 0, None, None, None),
+    ("fba_customer_return_fee", "FBA Customer Return Fee", None, None, None),
+    ("amazon_fees_reversal", "Amazon Fees - Reversal", None, None, None),
+    ("chargeback_refund", "Chargeback Refund", None, None, None),
+    ("liquidation", "Liquidations", None, None, None),
+    (
+        "adjustment_expense",
+        "Adjustment",
+        None,
+        {
+            "FBA Inventory Reimbursement - General Adjustment",
+            "Non-subscription Fee Adjustment",
+        },
+        None,
+    ),
+    ("adjustment_income", "Adjustment", None, None, None),
+    ("service_advertising", "Service Fee", None, {"Cost of Advertising"}, None),
+    (
+        "service_refund_for_advertiser",
+        "Service Fee",
+        None,
+        {"Refund for Advertiser"},
+        None,
+    ),
+    (
+        "service_agl",
+        "Service Fee",
+        None,
+        {
+            "FBA International Freight Shipping Charge",
+            "FBA International Freight Duties and Taxes Charge",
+        },
+        None,
+    ),
+    ("service_other", "Service Fee", None, None, None),
+    ("fba_inventory_fee", "FBA Inventory Fee", None, None, None),
+    (
+        "amazon_fees_advertising",
+        "Amazon Fees",
+        None,
+        {"Cost of Advertising", "Refund for Advertiser"},
+        None,
+    ),
+    ("amazon_fees", "Amazon Fees", None, None, None),
+    (
+        "fee_adjustment_weight",
+        "Fee Adjustment",
+        None,
+        {"Fee Adjustment - Weight and Dimension Change"},
+        None,
+    ),
+    ("fee_adjustment_other", "Fee Adjustment", None, None, None),
+    ("deal_fee", "Deal Fee", None, None, None),
+    ("debt", "Debt", None, None, None),
+    ("fba_transaction_fees", "FBA Transaction fees", None, None, None),
+]
+
+# 未命中任何规则的交易
+OTHER_BUCKET = "other"
+
+BUCKETS = [rule[0] for rule in BUCKET_RULES] + [OTHER_BUCKET]
+
+# 常用的分桶组合，对应原来按 type 一级分类得到的 DataFrame
+ORDER_BUCKETS = ("order_fba", "order_fbm", "order_other")
+REFUND_BUCKETS = ("refund_fba", "refund_fbm", "refund_other")
+ADJUSTMENT_BUCKETS = ("adjustment_income", "adjustment_expense")
+SERVICE_FEE_BUCKETS = (
+    "service_advertising",
+    "service_refund_for_advertiser",
+    "service_agl",
+    "service_other",
+)
+AMAZON_FEES_BUCKETS = ("amazon_fees", "amazon_fees_advertising")
+FEE_ADJUSTMENT_BUCKETS = ("fee_adjustment_weight", "fee_adjustment_other")
+
+# 参与分桶汇总的数值列
+AMOUNT_COLUMNS = [
+    "quantity",
+    "product sales",
+    "shipping credits",
+    "gift wrap credits",
+    "promotional rebates",
+    "selling fees",
+    "fba fees",
+    "other transaction fees",
+    "other",
+    "total",
+]
+
+
+def _match_bucket(type_value, fulfillment, description):
+    """按规则表顺序为一组 (type, fulfillment, description) 取值确定分桶"""
+    for bucket, rule_type, rule_fulfillment, descriptions, prefix in BUCKET_RULES:
+        if type_value != rule_type:
+            continue
+        if rule_fulfillment is not None and fulfillment != rule_fulfillment:
+            continue
+        if descriptions is not None and description not in descriptions:
+            continue
+        if prefix is not None and not (
+            isinstance(description, str) and description.startswith(prefix)
+        ):
+            continue
+        return bucket
+    return OTHER_BUCKET
+
+
+def classify_transactions(df):
+    """
+    为每条交易打上核算分桶标签
+
+    先对 (type, fulfillment, description) 做一次因子化，只对去重后的取值组合
+    匹配规则表，再通过编码映射回所有行，因此扫描全表只有一次。
+
+    参数:
+        df: 已 fillna(0) 的付款报告 DataFrame
+
+    返回:
+        pd.Series: 与 df 同索引的分类（categorical）分桶列
+    """
+    keys = pd.MultiIndex.from_frame(df[["type", "fulfillment", "description"]])
+    codes, combos = keys.factorize()
+    combo_codes = np.array(
+        [BUCKETS.index(_match_bucket(*combo)) for combo in combos], dtype=np.int16
+    )
+    bucket_codes = combo_codes[codes] if len(codes) else np.array([], dtype=np.int16)
+    return pd.Series(
+        pd.Categorical.from_codes(bucket_codes, categories=BUCKETS),
+        index=df.index,
+        name="bucket",
+    )
+
+
+def bucket_totals(df, bucket, columns=AMOUNT_COLUMNS):
+    """一次 groupby 得到 分桶 × 数值列 的合计矩阵，空分桶合计为 0"""
+    return df.groupby(bucket, observed=False)[columns].sum()
+
+
+def bucket_positions(bucket):
+    """一次 groupby 得到每个分桶对应的行位置"""
+    return bucket.groupby(bucket, observed=True, sort=False).indices
+
+
+def select_buckets(df, positions, buckets):
+    """按原始行顺序取出若干分桶的明细行"""
+    parts = [positions[name] for name in buckets if name in positions]
+    if not parts:
+        return df.iloc[0:0]
+    return df.take(np.sort(np.concatenate(parts)))
+
+
+def sum_buckets(totals, column, buckets):
+    """若干分桶在某一列上的合计，保留两位小数"""
+    return round(totals.loc[list(buckets), column].sum(), 2)
@@ -0,0 +1,155 @@
+"""
+付款报告（Custom Unified Transaction）读取模式
+统一定义各列的数据类型：低基数的文本列读为 category，金额列读为 float64，
+并在解析时处理千分位分隔符。月报与产品分析共用同一套读取方式，
+产品分析只读取需要的列。
+"""
+
+import sys
+
+import pandas as pd
+
+# 报告前7行为说明信息
+PAYMENT_REPORT_SKIPROWS = 7
+
+# 低基数文本列，按 category 存储，每行只占一个整数编码
+PAYMENT_CATEGORY_COLUMNS = [
+    "type",
+    "sku",
+    "description",
+    "marketplace",
+    "account type",
+    "fulfillment",
+    "order city",
+    "order state",
+    "tax collection model",
+]
+
+# 金额列，保持 float64 以保证合计结果与原来逐分相同
+PAYMENT_AMOUNT_COLUMNS = [
+    "product sales",
+    "product sales tax",
+    "shipping credits",
+    "shipping credits tax",
+    "gift wrap credits",
+    "giftwrap credits tax",
+    "Regulatory Fee",
+    "Tax On Regulatory Fee",
+    "promotional rebates",
+    "promotional rebates tax",
+    "marketplace withheld tax",
+    "selling fees",
+    "fba fees",
+    "other transaction fees",
+    "other",
+    "total",
+]
+
+PAYMENT_DTYPES = {
+    **{column: "category" for column in PAYMENT_CATEGORY_COLUMNS},
+    **{column: "float64" for column in PAYMENT_AMOUNT_COLUMNS},
+    "quantity": "float64",
+}
+
+# 产品分析按SKU汇总销售与退款时用到的列
+SKU_ANALYSIS_COLUMNS = [
+    "type",
+    "sku",
+    "quantity",
+    "product sales",
+    "shipping credits",
+    "promotional rebates",
+    "selling fees",
+    "fba fees",
+    "other",
+]
+
+
+def read_payment_report(path, usecols=None, compact=True, **kwargs):
+    """
+    读取付款报告
+
+    参数:
+        path: 报告文件路径或文件对象
+        usecols: 只读取这些列，报告中不存在的列会被忽略
+        compact: 为 False 时使用 pandas 默认类型（用于对比内存占用）
+        **kwargs: 透传给 pd.read_csv，如 chunksize
+
+    返回:
+        pd.DataFrame 或分块迭代器
+    """
+    if usecols is not None:
+        wanted = set(usecols)
+        kwargs["usecols"] = lambda column: column in wanted
+    if compact:
+        kwargs["dtype"] = PAYMENT_DTYPES
+    df = pd.read_csv(
+        path,
+        thousands=",",
+        skiprows=PAYMENT_REPORT_SKIPROWS,
+        encoding="utf-8",
+        **kwargs,
+    )
+    if isinstance(df, pd.DataFrame):
+        df = _drop_empty_categories(df)
+    return df
+
+
+def _drop_empty_categories(df):
+    """整列为空的 category 列改回 float64，与默认类型读取结果一致，也便于 Parquet 缓存"""
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype) and not len(
+            series.cat.categories
+        ):
+            df[column] = series.astype("float64")
+    return df
+
+
+def fill_missing(df):
+    """
+    空值填0
+
+    category 列需要先把 0 加入类别才能填充，填充后与原来 object 列
+    fillna(0) 的取值一致。
+    """
+    other_columns = []
+    for column in df.columns:
+        series = df[column]
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            other_columns.append(column)
+        elif series.hasnans:
+            if 0 not in series.cat.categories:
+                series = series.cat.add_categories([0])
+            df[column] = series.fillna(0)
+    df[other_columns] = df[other_columns].fillna(0)
+    return df
+
+
+def memory_report(path, usecols=None):
+    """
+    对比默认类型与紧凑类型读取同一份报告的内存占用
+
+    返回:
+        pd.DataFrame: 每列的字节数及每行平均字节数
+    """
+    default = read_payment_report(path, usecols=usecols, compact=False)
+    compact = read_payment_report(path, usecols=usecols)
+    report = pd.DataFrame(
+        {
+            "默认类型": default.memory_usage(index=False, deep=True),
+            "紧凑类型": compact.memory_usage(index=False, deep=True),
+        }
+    )
+    report.loc["合计"] = report.sum()
+    rows = max(len(default), 1)
+    report.loc["每行"] = (report.loc["合计"] / rows).round(1)
+    report["压缩比"] = (report["默认类型"] / report["紧凑类型"]).round(2)
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("用法: python -m apps.dataset.payment_schema <付款报告.csv>")
+        sys.exit(1)
+    print(memory_report(sys.argv[1]).to_string())
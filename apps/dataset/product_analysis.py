@@ -12,16 +12,62 @@ import io
 import datetime
 import pandas as pd
 import numpy as np
-from openpyxl.utils.dataframe import dataframe_to_rows
 import shutil
-from openpyxl import load_workbook
-from openpyxl.styles import Font, NamedStyle
-from openpyxl.styles import Border, Side, Alignment
-from openpyxl.utils import get_column_letter
+import xlsxwriter
 from core.log_service import LogService
+from apps.dataset.payment_schema import (
+    SKU_ANALYSIS_COLUMNS,
+    read_payment_report,
+    fill_missing,
+)
+from apps.dataset.report_cache import load_cached_report
+from apps.dataset.column_widths import estimate_column_widths
+from apps.dataset.fee_overlays import apply_fee_overlays
+from apps.dataset.inventory_aging import (
+    INVENTORY_DETAIL_SHEET,
+    build_inventory_detail,
+    load_inventory,
+)
+from apps.dataset.master_data import get_project_products
+from apps.dataset.report_template import get_template_layout, write_template_sheet
+from apps.dataset.xlsx_reader import read_xlsx_columns
 
 product_analysis_bp = Blueprint("product_analysis", __name__)
 
+# 产品分析需要的广告产品报告列，读取时只解析这几列
+AD_REPORT_COLUMNS = [
+    "广告SKU",
+    "广告ASIN",
+    "展示量",
+    "点击量",
+    "花费",
+    "7天总销售额",
+    "7天总销售量(#)",
+]
+
+PRODUCT_ANALYSIS_SHEET = "产品分析"
+
+# 产品分析报表表头与数据单元格共用的对齐与边框
+PRODUCT_ANALYSIS_CELL_FORMAT = {"align": "center", "valign": "vcenter", "border": 1}
+
+# 金额列的数据单元格保留两位小数显示，百分比列沿用模板表头的数字格式
+PRODUCT_ANALYSIS_MONEY_COLUMNS = [
+    "总销售额",
+    "广告花费",
+    "广告销售额",
+    "CPC",
+    "产品FOB",
+    "销售头程",
+    "FBA配送费",
+    "平台佣金",
+    "总成本",
+    "利润",
+    "实际销售额",
+    "实际退款额",
+    "平均售价",
+]
+MONEY_FORMAT = "0.00"
+
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in {
@@ -31,6 +77,74 @@ def allowed_file(filename):
     }
 
 
+def product_report_date(report_start_date, report_end_date):
+    """报告日期：开始日期的完整日期加结束日期的月份和日期，如 '20251201-1207'"""
+    start_date_parts = report_start_date.split("-")
+    end_date_parts = report_end_date.split("-")
+    start_date_part = "".join(start_date_parts[:3])
+    end_date_part = f"{end_date_parts[1]}{end_date_parts[2]}"
+    return f"{start_date_part}-{end_date_part}"
+
+
+def write_product_analysis_sheet(workbook, sheet_name, df, layout, widths=None):
+    """
+    按产品分析模板写入一个sheet：表头沿用模板中同名列的样式，百分比列沿用模板表头的
+    数字格式，金额列保留两位小数，最后一行汇总行加粗
+
+    参数:
+        layout: 产品分析模板的版式
+        widths: 列序号 -> 列宽，默认使用模板的列宽
+    """
+    header_formats = dict(zip(layout["columns"], layout["header_formats"]))
+    number_formats = dict(zip(layout["columns"], layout["number_formats"]))
+    column_formats = {}
+    for col, column in enumerate(df.columns):
+        number_format = number_formats.get(column, "General")
+        if number_format != "General":
+            column_formats[col] = {"num_format": number_format}
+        elif column in PRODUCT_ANALYSIS_MONEY_COLUMNS:
+            column_formats[col] = {"num_format": MONEY_FORMAT}
+
+    return write_template_sheet(
+        workbook,
+        sheet_name,
+        df,
+        layout,
+        PRODUCT_ANALYSIS_CELL_FORMAT,
+        widths=widths,
+        header_formats=[header_formats.get(column, {}) for column in df.columns],
+        column_formats=column_formats,
+        total_row_format={"bold": True},
+    )
+
+
+def write_product_analysis(df_overview, inv_df, output):
+    """
+    用 xlsxwriter 一次写出产品分析报表
+
+    产品分析sheet使用模板的表头样式与列宽，各列数据共用一个格式，最后一行汇总行加粗；
+    有库存数据时追加库存详情sheet，列宽按内容估算。
+    """
+    layout = get_template_layout("product_analysis")
+    workbook = xlsxwriter.Workbook(output)
+    try:
+        write_product_analysis_sheet(
+            workbook, PRODUCT_ANALYSIS_SHEET, df_overview, layout
+        )
+        if inv_df is not None:
+            write_template_sheet(
+                workbook,
+                INVENTORY_DETAIL_SHEET,
+                inv_df,
+                layout,
+                PRODUCT_ANALYSIS_CELL_FORMAT,
+                widths=dict(enumerate(estimate_column_widths(inv_df))),
+                total_row_format={"bold": True},
+            )
+    finally:
+        workbook.close()
+
+
 def process_product_analysis(
     project_name,
     report_start_date,
@@ -65,14 +179,7 @@ def process_product_analysis(
     if fba_report_path:
         print(f"[DEBUG] 库存报告路径: {fba_report_path}")
 
-    # Generate report date from start date and end date (YYYYMMDD-MMDD format)
-    start_date_parts = report_start_date.split("-")
-    end_date_parts = report_end_date.split("-")
-    start_date_part = f"{start_date_parts[0]}{start_date_parts[1]}{start_date_parts[2]}"  # 获取完整日期，如 '20251201'
-    end_date_part = (
-        f"{end_date_parts[1]}{end_date_parts[2]}"  # 获取月份和日期，如 '1207'
-    )
-    report_date = f"{start_date_part}-{end_date_part}"
+    report_date = product_report_date(report_start_date, report_end_date)
     print(f"[DEBUG] 生成报告日期: {report_date}")
 
     project_folder_path = os.path.join(
@@ -92,37 +199,28 @@ def process_product_analysis(
     print(f"[DEBUG] 商业报告数据形状: {business_report.shape}")
 
     print(f"[DEBUG] 读取付款报告文件: {payment_report_path}")
-    payment_report = pd.read_csv(
-        payment_report_path, encoding="utf-8", thousands=",", skiprows=7
+    # 只读取按SKU汇总需要的列，同一文件重复生成时直接读取缓存的解析结果
+    payment_report = load_cached_report(
+        project_name,
+        payment_report_path,
+        lambda path: read_payment_report(path, usecols=SKU_ANALYSIS_COLUMNS),
+        kind="payment_report_sku",
+        version=2,
     )
     print(f"[DEBUG] 付款报告数据形状: {payment_report.shape}")
 
     print(f"[DEBUG] 读取广告产品报告文件: {ad_report_path}")
-    ad_product_report = pd.read_excel(ad_report_path, engine="openpyxl")
+    # 只读取需要的列，缺少必需列时直接报错
+    ad_product_report = read_xlsx_columns(ad_report_path, AD_REPORT_COLUMNS)
     print(f"[DEBUG] 广告产品报告数据形状: {ad_product_report.shape}")
     print(f"[DEBUG] 广告产品报告列名: {list(ad_product_report.columns)}")
     print(f"[DEBUG] 广告产品报告前3行数据:\n{ad_product_report.head(3)}")
 
-    print(f"[DEBUG] 读取基础信息表文件: apps/model_file/BLF_Basic_Info.csv")
-    basic_report = pd.read_csv(
-        os.path.join(
-            os.path.dirname(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            ),
-            "apps",
-            "model_file",
-            "BLF_Basic_Info.csv",
-        ),
-        encoding="utf-8",
-    )
-    print(f"[DEBUG] 基础信息表数据形状: {basic_report.shape}")
-
-    # 根据当前项目名称过滤基础信息数据
-    print(f"[DEBUG] 过滤基础信息表，项目名称: {project_name}")
-    before_filter = basic_report.shape
-    basic_report = basic_report[basic_report["project_name"] == project_name]
+    # 基础信息表按项目缓存，只在文件修改后重新读取
+    print(f"[DEBUG] 读取项目基础信息，项目名称: {project_name}")
+    basic_report = get_project_products(project_name)
     after_filter = basic_report.shape
-    print(f"[DEBUG] 基础信息表过滤前形状: {before_filter}, 过滤后形状: {after_filter}")
+    print(f"[DEBUG] 项目基础信息形状: {after_filter}")
     if after_filter[0] == 0:
         print(f"[ERROR] 没有找到项目名称为 '{project_name}' 的数据！")
 
@@ -153,16 +251,7 @@ def process_product_analysis(
 
     # 广告数据读取
     print(f"[DEBUG] 开始处理广告数据...")
-    
-    # 检查必需的列是否存在
-    required_columns = ["广告SKU", "广告ASIN", "展示量", "点击量", "花费", "7天总销售额", "7天总销售量(#)"]
-    missing_columns = [col for col in required_columns if col not in ad_product_report.columns]
-    if missing_columns:
-        print(f"[ERROR] 广告报表缺少必需的列: {missing_columns}")
-        print(f"[ERROR] 实际列名: {list(ad_product_report.columns)}")
-    else:
-        print(f"[DEBUG] 广告报表列名检查通过")
-    
+
     df_ad_sku_asin = ad_product_report[["广告SKU", "广告ASIN"]].copy()
     df_ad_sku_asin.rename(columns={"广告SKU": "SKU", "广告ASIN": "ASIN"}, inplace=True)
     df_ad_sku_asin = df_ad_sku_asin.drop_duplicates()
@@ -199,7 +288,7 @@ def process_product_analysis(
 
     # 读取Payment数据表，此时数据表中的sku都是小写格式
     df_payment = payment_report.copy()
-    df_payment.fillna(0, inplace=True)
+    df_payment = fill_missing(df_payment)
 
     # 筛选出类型为'Order'和'Refund'的记录
     df_order_and_refund = df_payment.loc[df_payment["type"].isin(["Order", "Refund"])]
@@ -208,7 +297,9 @@ def process_product_analysis(
     df_refund = df_payment.loc[df_payment["type"].isin(["Refund"])]
 
     # 计算每个sku的销售和退款的平台费用与FBA配送费
-    sale_refund_amz_fee = df_order_and_refund.groupby("sku", as_index=False).agg(
+    sale_refund_amz_fee = df_order_and_refund.groupby(
+        "sku", as_index=False, observed=True
+    ).agg(
         {
             "selling fees": lambda x: round(x.mul(-1).sum(), 2),
             "fba fees": lambda x: round(x.mul(-1).sum(), 2),
@@ -216,7 +307,7 @@ def process_product_analysis(
     )
 
     # 计算每个sku的销售总额，包括产品销售、运费和促销折扣
-    sale_group = df_orders.groupby("sku", as_index=False).agg(
+    sale_group = df_orders.groupby("sku", as_index=False, observed=True).agg(
         {
             "quantity": "sum",
             "product sales": lambda x: round(x.sum(), 2),
@@ -226,7 +317,7 @@ def process_product_analysis(
     )
 
     # 计算每个sku的退款总额，包括产品销售、运费、促销折扣和其他费用
-    df_refund_group = df_refund.groupby("sku", as_index=False).agg(
+    df_refund_group = df_refund.groupby("sku", as_index=False, observed=True).agg(
         {
             "quantity": "sum",
             "product sales": lambda x: round(x.sum(), 2),
@@ -532,42 +623,8 @@ def process_product_analysis(
         df_overview["实际退款额"] / df_overview["实际销售额"],
     )
 
-    # FBM费用计算 - 仅对包含"宝勒"的项目生效
-    if "宝勒" in project_name:
-        try:
-            # 读取FBM费用CSV文件
-            fbm_file_path = os.path.join(
-                os.path.dirname(
-                    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                ),
-                "apps",
-                "model_file",
-                "宝勒_FBM.csv",
-            )
-            df_fbm = pd.read_csv(fbm_file_path, encoding="utf-8")
-
-            # 构建SKU到FBM费用的映射
-            fbm_mapping = dict(zip(df_fbm["SKU"], df_fbm["FBM"]))
-
-            # 计算每个SKU的FBM费用并加到总销售额中
-            for index, row in df_overview.iterrows():
-                sku = row["SKU"]
-                actual_sales_quantity = row["实际销售量"]
-
-                # 获取SKU对应的FBM费用
-                fbm_fee = fbm_mapping.get(sku, 0)  # 如果SKU不存在，返回0
-
-                # 计算FBM费用（实际销售量 * 单个SKU的FBM费用）
-                total_fbm_fee = actual_sales_quantity * fbm_fee
-
-                # 将FBM费用加到总销售额中
-                df_overview.at[index, "总销售额"] = row["总销售额"] + total_fbm_fee
-        except FileNotFoundError:
-            # 如果CSV文件不存在，打印警告但不中断程序
-            print(f"警告: FBM费用文件 {fbm_file_path} 未找到，跳过FBM费用计算")
-        except Exception as e:
-            # 处理其他可能的异常
-            print(f"警告: 处理FBM费用时发生错误: {e}")
+    # 叠加项目费用表中的费用（如宝勒的FBM费用）
+    df_overview = apply_fee_overlays(df_overview, project_name)
 
     overview_drop_cols = ["头程单价", "FOB单价"]
     df_overview = df_overview.drop(columns=overview_drop_cols)
@@ -707,176 +764,22 @@ def process_product_analysis(
     summary_df["ASIN"] = "汇总"
     df_overview = pd.concat([df_overview, summary_df], ignore_index=True)
 
-    # 指定项目概览模板文件的路径，为了加载模板以便填充数据或进行其他操作
-    template_file_path = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
-        "apps",
-        "model_file",
-        "product_analysis_template.xlsx",
-    )
-    # 加载Excel工作簿，以便可以编辑或操作数据
-    wb = load_workbook(template_file_path)
-    # 获取当前活动的工作表，准备对其进行操作
-    ws = wb.active
-    # 设置第一个sheet的名称为"产品分析"
-    ws.title = "产品分析"
-
-    # 定义边框样式
-    center_alignment = Alignment(horizontal="center", vertical="center")
-    thin_border = Border(
-        left=Side(border_style="thin", color="FF000000"),
-        right=Side(border_style="thin", color="FF000000"),
-        top=Side(border_style="thin", color="FF000000"),
-        bottom=Side(border_style="thin", color="FF000000"),
-    )
-
-    # 遍历数据框架中的每一行每一列，并设置单元格格式
-    for r_idx, row in enumerate(
-        dataframe_to_rows(df_overview, index=False, header=True), 1
-    ):
-        for c_idx, value in enumerate(row, 1):
-            cell = ws.cell(row=r_idx, column=c_idx, value=value)
-            cell.alignment = center_alignment  # 设置单元格内容居中
-            cell.border = thin_border  # 设置单元格边框为细边框
-            # 如果标题行的单元格格式为百分比，则对该单元格也应用相同的百分比格式
-            if ws.cell(row=1, column=c_idx).number_format == "0.00%":
-                cell.number_format = "0.00%"
-
-            # 将汇总行（最后一行）的文字加粗
-            if r_idx == len(df_overview) + 1:  # +1 因为包含标题行
-                cell.font = Font(bold=True)
-
-    print(f"[DEBUG] 保存产品分析报告到路径: {product_analysis_file_path}")
-    # 保存项目概览工作簿到指定路径
-    wb.save(product_analysis_file_path)
-
-    # 如果有库存文件，添加库存详情sheet
+    # 如果有库存文件，按内存中的产品分析数据生成库存详情
+    inv_df = None
     if fba_report_path and os.path.exists(fba_report_path):
-        wb = load_workbook(product_analysis_file_path)
-        ws_inv = wb.create_sheet("库存详情")
-
-        # 读取库存CSV
-        inv_df = pd.read_csv(fba_report_path, sep="\t", encoding="utf-8")
-
-        # 保留指定列
-        keep_cols = [
-            "sku",
-            "asin",
-            "available",
-            "inv-age-0-to-90-days",
-            "inv-age-91-to-180-days",
-            "inv-age-181-to-270-days",
-            "inv-age-271-to-365-days",
-            "inv-age-365-plus-days",
-            "recommended-action",
-        ]
-        inv_df = inv_df[[col for col in keep_cols if col in inv_df.columns]].copy()
-
-        # 重命名列
-        rename_dict = {
-            "sku": "SKU",
-            "asin": "ASIN",
-            "available": "可售库存",
-            "inv-age-0-to-90-days": "0-90天",
-            "inv-age-91-to-180-days": "91-180天",
-            "inv-age-181-to-270-days": "181-270天",
-            "inv-age-271-to-365-days": "271-365天",
-            "inv-age-365-plus-days": "365+天",
-            "recommended-action": "库存建议",
-        }
-        inv_df.rename(columns=rename_dict, inplace=True)
-
-        # 从概览sheet合并本周销量（总销量）
-        ws_overview = wb.active
-        df_overview_from_excel = pd.read_excel(
-            product_analysis_file_path, sheet_name=0, engine="openpyxl"
+        inv_df = build_inventory_detail(
+            load_inventory(fba_report_path, project_name),
+            df_overview[df_overview["SKU"] != "汇总"],
+            "总销量",
         )
-        sales_df = df_overview_from_excel[df_overview_from_excel["SKU"] != "汇总"][
-            ["SKU", "总销量"]
-        ].copy()
-        sales_df.rename(columns={"总销量": "本周销量"}, inplace=True)
-        sales_df["本周销量"] = pd.to_numeric(
-            sales_df["本周销量"], errors="coerce"
-        ).fillna(0)
-
-        # 合并到库存df
-        inv_df = pd.merge(inv_df, sales_df, on="SKU", how="left")
-        inv_df["本周销量"] = inv_df["本周销量"].fillna(0)
-
-        # 调整列顺序
-        new_column_order = [
-            "SKU",
-            "ASIN",
-            "本周销量",
-            "可售库存",
-            "0-90天",
-            "91-180天",
-            "181-270天",
-            "271-365天",
-            "365+天",
-            "库存建议",
-        ]
-        # 过滤掉不存在于inv_df中的列
-        new_column_order = [col for col in new_column_order if col in inv_df.columns]
-        inv_df = inv_df[new_column_order]
-
-        # 添加汇总行
-        summary_data = {
-            "SKU": "汇总行",
-            "ASIN": "",
-            "本周销量": inv_df["本周销量"].sum(),
-            "可售库存": inv_df["可售库存"].sum(),
-            "0-90天": inv_df["0-90天"].sum(),
-            "91-180天": inv_df["91-180天"].sum(),
-            "181-270天": inv_df["181-270天"].sum(),
-            "271-365天": inv_df["271-365天"].sum(),
-            "365+天": inv_df["365+天"].sum(),
-            "库存建议": "",
-        }
-        summary_df = pd.DataFrame([summary_data])
-        inv_df = pd.concat([inv_df, summary_df], ignore_index=True)
-
-        # 写入新sheet，应用样式
-        center_alignment = Alignment(horizontal="center", vertical="center")
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
-        bold_font = Font(bold=True)
-
-        for r_idx, row in enumerate(
-            dataframe_to_rows(inv_df, index=False, header=True), 1
-        ):
-            for c_idx, value in enumerate(row, 1):
-                cell = ws_inv.cell(row=r_idx, column=c_idx, value=value)
-                cell.alignment = center_alignment
-                cell.border = thin_border
-                # 加粗标题行
-                if r_idx == 1:
-                    cell.font = bold_font
-                # 加粗最后一行（汇总行）
-                if r_idx == len(inv_df) + 1:
-                    cell.font = bold_font
-
-        # 自动调整列宽
-        for col in ws_inv.columns:
-            max_length = 0
-            column = col[0].column_letter  # 获取列字母
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = max_length + 2
-            ws_inv.column_dimensions[column].width = adjusted_width
-
-        wb.save(product_analysis_file_path)
-
-    with open(product_analysis_file_path, "rb") as f:
-        file_content = f.read()
+
+    print(f"[DEBUG] 保存产品分析报告到路径: {product_analysis_file_path}")
+    # 两个sheet在内存中一次写出，保存的文件与返回的内容相同
+    output = io.BytesIO()
+    write_product_analysis(df_overview, inv_df, output)
+    file_content = output.getvalue()
+    with open(product_analysis_file_path, "wb") as f:
+        f.write(file_content)
 
     return file_content, f"{project_name}_product_analysis_{report_date}.xlsx"
 
@@ -0,0 +1,452 @@
+"""
+产品分析批量生成模块
+每周产品复盘需要为所有店铺生成产品分析。批量模式接收一个目录或 zip，按上传文件的
+命名约定（<项目名称>_Business_Report_*、<项目名称>_Payment_Report_*、
+<项目名称>_AD_Product_*，可选 <项目名称>_Inventory_Report_*）把文件按项目配对，
+每个项目作为一个任务，用进程池并行调用 process_product_analysis。
+所有工作簿、跨项目汇总表与记录每个任务状态、耗时的清单一起打包为 zip。
+
+报告目录只应包含本次要分析的报告。服务器的 project/ 目录中，月报上传的付款报告
+与产品分析的临时副本也使用相同的命名，无法区分日期范围，因此不能作为报告目录。
+
+命令行用法:
+    python -m apps.dataset.product_batch reports.zip --start 2025-12-01 --end 2025-12-07
+    python -m apps.dataset.product_batch reports/20251201-1207/ --start 2025-12-01 --end 2025-12-07 --workers 4
+"""
+
+import argparse
+import datetime
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import xlsxwriter
+from flask import Blueprint, request, send_file
+
+from core.log_service import LogService
+from apps.dataset.column_widths import estimate_column_widths
+from apps.dataset.product_analysis import (
+    PRODUCT_ANALYSIS_SHEET,
+    allowed_file,
+    process_product_analysis,
+    product_report_date,
+    write_product_analysis_sheet,
+)
+from apps.dataset.report_template import get_template_layout
+from apps.dataset.xlsx_reader import read_xlsx_columns
+
+product_batch_bp = Blueprint("product_batch", __name__)
+
+# 任务字段 -> 文件名中的报告类型标记与报告名称
+PRODUCT_REPORT_TYPES = {
+    "business_report_path": ("_Business_Report_", "业务报告"),
+    "payment_report_path": ("_Payment_Report_", "付款报告"),
+    "ad_report_path": ("_AD_Product_", "广告产品报告"),
+    "fba_report_path": ("_Inventory_Report_", "库存报告"),
+}
+REQUIRED_REPORTS = ["business_report_path", "payment_report_path", "ad_report_path"]
+
+# 项目目录下的产品分析临时副本和输出目录，其中的文件与上传的报告同名，不参与配对
+SKIPPED_FOLDERS = {"tmp", "产品数据分析"}
+
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_COLUMNS = ["序号", "项目名称", "状态", "耗时（秒）", "文件", "错误"]
+
+SUMMARY_SHEET = "项目汇总"
+SUMMARY_TOTAL_NAME = "合计"
+
+# 跨项目汇总表的指标，取各项目产品分析的汇总行
+SUMMARY_COLUMNS = [
+    "总销量",
+    "总销售额",
+    "页面浏览量",
+    "总访客",
+    "总转化",
+    "广告花费",
+    "广告销售额",
+    "ACOS",
+    "SP占比",
+    "实际销售额",
+    "实际销售量",
+    "实际退款额",
+    "总成本",
+    "利润",
+    "利润率",
+]
+
+# 比率指标 -> (分子, 分母)，合计行按合计值重新计算，分母为0时为0
+SUMMARY_RATIOS = {
+    "总转化": ("总销量", "页面浏览量"),
+    "ACOS": ("广告花费", "广告销售额"),
+    "SP占比": ("广告花费", "总销售额"),
+    "利润率": ("利润", "实际销售额"),
+}
+
+
+def _zip_member_name(info):
+    """zip 成员的文件名，未标记 UTF-8 的中文文件名按 GBK 解码"""
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode("cp437").decode("gbk")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+def extract_report_archive(archive, folder):
+    """解压报告 zip，跳过目录和指向解压目录之外的成员"""
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            name = _zip_member_name(info)
+            parts = [part for part in name.replace("\\", "/").split("/") if part]
+            if info.is_dir() or not parts or ".." in parts or ":" in parts[0]:
+                continue
+            path = os.path.join(folder, *parts)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with zf.open(info) as source, open(path, "wb") as target:
+                shutil.copyfileobj(source, target)
+
+
+def find_report_sets(folder):
+    """
+    按文件名把目录（含子目录）中的报告按项目配对
+
+    同一项目同一类型有多份文件时取文件名排序最后的一份（文件名中的时间戳最新）。
+
+    返回:
+        dict: 项目名称 -> {任务字段: 文件路径}，按项目名称排序
+    """
+    found = {}
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = [
+            name
+            for name in dirs
+            if not name.startswith((".", "__MACOSX")) and name not in SKIPPED_FOLDERS
+        ]
+        for filename in files:
+            if filename.startswith(".") or not allowed_file(filename):
+                continue
+            for field, (marker, _) in PRODUCT_REPORT_TYPES.items():
+                project_name, found_marker, _ = filename.partition(marker)
+                if found_marker and project_name:
+                    reports = found.setdefault(project_name, {})
+                    reports.setdefault(field, []).append(
+                        (filename, os.path.join(root, filename))
+                    )
+                    break
+
+    return {
+        project_name: {field: max(paths)[1] for field, paths in reports.items()}
+        for project_name, reports in sorted(found.items())
+    }
+
+
+def check_source_folder(folder):
+    """报告目录必须是单独存放本次报告的目录，不能是服务器的 project/ 目录或其子目录"""
+    project_folder = os.path.realpath(os.path.join(os.getcwd(), "project"))
+    path = os.path.realpath(folder)
+    if path == project_folder or path.startswith(project_folder + os.sep):
+        raise ValueError(
+            "报告目录不能是服务器的 project 目录，请把本次要分析的报告放在单独的目录中"
+        )
+
+
+def build_jobs(report_sets):
+    """由配对结果生成任务列表，没有任何项目时报错"""
+    if not report_sets:
+        raise ValueError("没有找到按命名约定命名的产品分析报告")
+    return [
+        {"project_name": project_name, **reports}
+        for project_name, reports in report_sets.items()
+    ]
+
+
+def read_project_summary(file_content):
+    """产品分析工作簿中汇总行的跨项目汇总指标"""
+    overview = read_xlsx_columns(
+        io.BytesIO(file_content), SUMMARY_COLUMNS, sheet_name=PRODUCT_ANALYSIS_SHEET
+    )
+    return overview.iloc[-1].fillna(0).to_dict()
+
+
+def run_product_job(job, report_start_date, report_end_date, output_folder):
+    """
+    在工作进程中生成单个项目的产品分析，异常不向外抛出，记录在结果中
+
+    返回:
+        dict: 任务状态、耗时、工作簿文件名及汇总指标
+    """
+    start = time.perf_counter()
+    result = {"status": "success", "filename": None, "error": "", "summary": None}
+    try:
+        missing = [
+            PRODUCT_REPORT_TYPES[field][1]
+            for field in REQUIRED_REPORTS
+            if not job.get(field)
+        ]
+        if missing:
+            raise ValueError(f"缺少{'、'.join(missing)}")
+
+        file_content, filename = process_product_analysis(
+            job["project_name"],
+            report_start_date,
+            report_end_date,
+            job["business_report_path"],
+            job["payment_report_path"],
+            job["ad_report_path"],
+            job.get("fba_report_path"),
+        )
+        with open(os.path.join(output_folder, filename), "wb") as f:
+            f.write(file_content)
+        result["filename"] = filename
+        result["summary"] = read_project_summary(file_content)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def build_project_summary(jobs, results):
+    """
+    跨项目汇总表：每个成功项目一行，末尾为合计行
+
+    返回:
+        pd.DataFrame: 项目名称与 SUMMARY_COLUMNS 中的指标
+    """
+    rows = [
+        {"项目名称": job["project_name"], **results[job["index"]]["summary"]}
+        for job in jobs
+        if results[job["index"]]["summary"] is not None
+    ]
+    summary = pd.DataFrame(rows, columns=["项目名称"] + SUMMARY_COLUMNS)
+
+    total = summary[SUMMARY_COLUMNS].sum().to_dict()
+    for column, (numerator, denominator) in SUMMARY_RATIOS.items():
+        total[column] = (
+            total[numerator] / total[denominator] if total[denominator] != 0 else 0
+        )
+    total["项目名称"] = SUMMARY_TOTAL_NAME
+    return pd.concat([summary, pd.DataFrame([total])], ignore_index=True)
+
+
+def run_product_batch(
+    jobs, report_start_date, report_end_date, output_folder, max_workers=None
+):
+    """
+    并行生成一批产品分析
+
+    参数:
+        jobs: build_jobs 得到的任务列表
+        output_folder: 工作簿输出目录
+        max_workers: 进程数，默认等于 CPU 核数（不超过任务数）
+
+    返回:
+        tuple: (按任务顺序排列的清单, 跨项目汇总表)
+    """
+    for index, job in enumerate(jobs, start=1):
+        job["index"] = index
+    os.makedirs(output_folder, exist_ok=True)
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                run_product_job,
+                job,
+                report_start_date,
+                report_end_date,
+                output_folder,
+            ): job["index"]
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    rows = []
+    for job in jobs:
+        result = results[job["index"]]
+        rows.append(
+            [
+                job["index"],
+                job["project_name"],
+                result["status"],
+                result["seconds"],
+                result["filename"] or "",
+                result["error"],
+            ]
+        )
+    manifest = pd.DataFrame(rows, columns=MANIFEST_COLUMNS)
+    return manifest, build_project_summary(jobs, results)
+
+
+def write_batch_archive(manifest, summary, report_date, output_folder, archive):
+    """把工作簿、跨项目汇总表和清单写入 zip，xlsx 本身已压缩，直接存储"""
+    summary_content = io.BytesIO()
+    workbook = xlsxwriter.Workbook(summary_content)
+    try:
+        widths = estimate_column_widths(summary)
+        write_product_analysis_sheet(
+            workbook,
+            SUMMARY_SHEET,
+            summary,
+            get_template_layout("product_analysis"),
+            dict(enumerate(widths)),
+        )
+    finally:
+        workbook.close()
+
+    with zipfile.ZipFile(archive, "w") as zf:
+        for filename in manifest["文件"]:
+            if filename:
+                zf.write(os.path.join(output_folder, filename), filename)
+        zf.writestr(f"产品分析汇总_{report_date}.xlsx", summary_content.getvalue())
+        zf.writestr(
+            MANIFEST_NAME,
+            manifest.to_csv(index=False).encode("utf-8-sig"),
+            compress_type=zipfile.ZIP_DEFLATED,
+        )
+
+
+def generate_product_batch(
+    source, report_start_date, report_end_date, archive, max_workers=None
+):
+    """
+    由报告目录或 zip 批量生成产品分析并打包
+
+    参数:
+        source: 只包含本次报告的目录，或报告 zip 的路径 / 文件对象
+        archive: 输出 zip 的路径或文件对象
+
+    返回:
+        pd.DataFrame: 任务清单
+    """
+    for value in [report_start_date, report_end_date]:
+        try:
+            datetime.date.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"日期格式错误: {value}")
+    report_date = product_report_date(report_start_date, report_end_date)
+    work_folder = tempfile.mkdtemp(prefix="product_batch_")
+    try:
+        folder = source
+        if isinstance(source, str) and os.path.isdir(source):
+            check_source_folder(source)
+        else:
+            folder = os.path.join(work_folder, "reports")
+            extract_report_archive(source, folder)
+        jobs = build_jobs(find_report_sets(folder))
+
+        output_folder = os.path.join(work_folder, "output")
+        manifest, summary = run_product_batch(
+            jobs, report_start_date, report_end_date, output_folder, max_workers
+        )
+        write_batch_archive(manifest, summary, report_date, output_folder, archive)
+    finally:
+        shutil.rmtree(work_folder, ignore_errors=True)
+    return manifest
+
+
+@product_batch_bp.route("/batch", methods=["POST"])
+def product_analysis_batch():
+    """
+    批量生成产品分析，返回包含所有工作簿、跨项目汇总表和清单的 zip
+
+    表单字段:
+        report_start_date, report_end_date: 报告日期范围
+        archive: 报告 zip 文件，或 source_folder: 服务器上只包含本次报告的目录
+        max_workers: 可选，进程数
+    """
+    report_start_date = request.form.get("report_start_date")
+    report_end_date = request.form.get("report_end_date")
+    source_folder = request.form.get("source_folder")
+    upload = request.files.get("archive")
+    max_workers = request.form.get("max_workers", type=int)
+
+    if not report_start_date or not report_end_date:
+        return {"success": False, "error": "请选择报告日期范围"}, 400
+    if upload and upload.filename:
+        source = io.BytesIO(upload.read())
+        if not zipfile.is_zipfile(source):
+            return {"success": False, "error": "上传文件不是有效的 zip 文件"}, 400
+    elif source_folder and os.path.isdir(source_folder):
+        source = source_folder
+    else:
+        return {"success": False, "error": "请上传报告 zip 或指定报告目录"}, 400
+
+    archive = io.BytesIO()
+    try:
+        manifest = generate_product_batch(
+            source, report_start_date, report_end_date, archive, max_workers
+        )
+        archive.seek(0)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}, 400
+    except Exception as e:
+        LogService.log(
+            action="批量生成产品分析失败",
+            resource="产品分析功能",
+            details=f"日期范围: {report_start_date} 至 {report_end_date}, 错误: {str(e)}",
+            log_type="user",
+            level="error",
+        )
+        return {"success": False, "error": str(e)}, 500
+
+    failed = int((manifest["状态"] != "success").sum())
+    LogService.log(
+        action="批量生成产品分析",
+        resource="产品分析功能",
+        details=f"日期范围: {report_start_date} 至 {report_end_date}, 项目数: {len(manifest)}, 失败: {failed}, 总耗时: {manifest['耗时（秒）'].sum():.2f}秒",
+        log_type="user",
+        level="info" if not failed else "warning",
+    )
+
+    report_date = product_report_date(report_start_date, report_end_date)
+    return send_file(
+        archive,
+        as_attachment=True,
+        download_name=f"产品分析_批量_{report_date}.zip",
+        mimetype="application/zip",
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量生成产品分析")
+    parser.add_argument("source", help="只包含本次报告的目录，或报告 zip")
+    parser.add_argument("--start", required=True, help="报告开始日期，如 2025-12-01")
+    parser.add_argument("--end", required=True, help="报告结束日期，如 2025-12-07")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="进程数，默认 CPU 核数"
+    )
+    parser.add_argument("--output", default=None, help="输出 zip 路径")
+    args = parser.parse_args(argv)
+
+    output = args.output
+    if output is None:
+        output = f"产品分析_批量_{product_report_date(args.start, args.end)}.zip"
+
+    start = time.perf_counter()
+    try:
+        manifest = generate_product_batch(
+            args.source, args.start, args.end, output, args.workers
+        )
+    except (ValueError, zipfile.BadZipFile, FileNotFoundError) as e:
+        print(f"错误: {e}")
+        return 2
+
+    print(manifest.to_string(index=False))
+    print(
+        f"共 {len(manifest)} 个项目，耗时 {time.perf_counter() - start:.2f} 秒，输出: {output}"
+    )
+    return 0 if (manifest["状态"] == "success").all() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,474 @@
+"""
+月报核算规则模块
+以规则表声明“报表核算”中每个收入/支出行项目的分桶、源数据列与符号，
+统一基于 分桶 × 数值列 合计矩阵求值，并生成报表核算(pt3)与总览草稿(pt4)
+"""
+
+import pandas as pd
+
+from apps.dataset.payment_classifier import (
+    ORDER_BUCKETS,
+    REFUND_BUCKETS,
+    AMAZON_FEES_BUCKETS,
+    sum_buckets,
+)
+
+# 行项目规则字段说明:
+#   key:    行项目标识
+#   name:   亚马逊 PDF 中的英文名称
+#   label:  中文名称
+#   source: 报表核算中展示的源表说明
+#   terms:  组成项列表 [(数值列, 分桶列表), ...]，每项单独保留两位小数后相加；
+#           为空表示该项目前固定为 0
+#   sign:   符号，默认 1
+
+# 收入（与PDF完全一致）
+INCOME_RULES = [
+    {
+        "key": "product_sales_non_fba",
+        "name": "Product sales (non-FBA)",
+        "label": "销售额（非FBA）",
+        "source": "FBM 订单-订单金额",
+        "terms": [("product sales", ["order_fbm"])],
+    },
+    {
+        "key": "product_sale_refunds_non_fba",
+        "name": "Product sale refunds (non-FBA) ",
+        "label": "销售额退款（非FBA）",
+        "source": "FBM 退款-订单金额",
+        "terms": [("product sales", ["refund_fbm"])],
+    },
+    {
+        "key": "fba_product_sales",
+        "name": "FBA product sales",
+        "label": "销售额（FBA）",
+        "source": "FBA 订单-订单金额",
+        "terms": [("product sales", ["order_fba"])],
+    },
+    {
+        # FBA 退款的其他费用也计入退款
+        "key": "fba_product_sale_refunds",
+        "name": "FBA product sale refunds",
+        "label": "销售额退款（FBA）",
+        "source": "FBA 退款-订单金额",
+        "terms": [("product sales", ["refund_fba"]), ("other", ["refund_fba"])],
+    },
+    {
+        # 不是FBA Inventory Reimbursement - General Adjustment 的其他赔偿
+        "key": "fba_inventory_credit",
+        "name": "FBA inventory credit",
+        "label": "FBA库存赔偿（FBA）",
+        "source": "FBA库存赔偿-订单金额+其他金额",
+        "terms": [("total", ["adjustment_income"])],
+    },
+    {
+        "key": "fba_liquidation_proceeds",
+        "name": "FBA liquidation proceeds",
+        "label": "FBA清算收入",
+        "source": "清算费用-订单金额",
+        "terms": [("product sales", ["liquidation"])],
+    },
+    {
+        "key": "shipping_credits",
+        "name": "Shipping credits",
+        "label": "运费收入",
+        "source": "所有订单-运费金额",
+        "terms": [("shipping credits", ORDER_BUCKETS)],
+    },
+    {
+        "key": "shipping_credit_refunds",
+        "name": "Shipping credit refunds",
+        "label": "运费退款",
+        "source": "所有退款-运费金额",
+        "terms": [("shipping credits", REFUND_BUCKETS)],
+    },
+    {
+        "key": "gift_wrap_credits",
+        "name": "Gift wrap credits",
+        "label": "礼品包装收入",
+        "source": "所有订单-礼品包装金额",
+        "terms": [("gift wrap credits", ORDER_BUCKETS)],
+    },
+    {
+        "key": "gift_wrap_credit_refunds",
+        "name": "Gift wrap credit refunds",
+        "label": "礼品包装退款",
+        "source": "所有退款-礼品包装金额",
+        "terms": [("gift wrap credits", REFUND_BUCKETS)],
+    },
+    {
+        "key": "promotional_rebates",
+        "name": "Promotional rebates",
+        "label": "促销折扣",
+        "source": "所有订单-促销折扣金额",
+        "terms": [("promotional rebates", ORDER_BUCKETS)],
+    },
+    {
+        "key": "promotional_rebate_refunds",
+        "name": "Promotional rebate refunds",
+        "label": "促销折扣退款",
+        "source": "所有退款-促销折扣金额",
+        "terms": [("promotional rebates", REFUND_BUCKETS)],
+    },
+    {
+        "key": "a_to_z_guarantee_claims",
+        "name": "A-to-z Guarantee claims",
+        "label": "A-to-z保障索赔",
+        "source": "",
+        "terms": [],
+    },
+    {
+        "key": "chargebacks",
+        "name": "Chargebacks",
+        "label": "拒付退款",
+        "source": "拒付退款-总计",
+        "terms": [("total", ["chargeback_refund"])],
+    },
+    {
+        "key": "safe_t_reimbursement",
+        "name": "SAFE-T reimbursement",
+        "label": "SAFE-T赔偿",
+        "source": "",
+        "terms": [],
+    },
+]
+
+# 支出（与PDF完全一致）
+EXPENSE_RULES = [
+    {
+        "key": "seller_fulfilled_selling_fees",
+        "name": "Seller fulfilled selling fees",
+        "label": "卖家自配送销售佣金",
+        "source": "FBM 订单-销售佣金",
+        "terms": [("selling fees", ["order_fbm"])],
+    },
+    {
+        "key": "fba_selling_fees",
+        "name": "FBA selling fees",
+        "label": "FBA销售佣金",
+        "source": "FBA 订单-销售佣金",
+        "terms": [("selling fees", ["order_fba"])],
+    },
+    {
+        # 目前不确定是否是全部还是Order和Refund分别计算
+        "key": "selling_fee_refunds",
+        "name": "Selling fee refunds",
+        "label": "销售佣金退款",
+        "source": "所有退款-销售佣金 + 退款管理费",
+        "terms": [("selling fees", REFUND_BUCKETS)],
+    },
+    {
+        "key": "fba_transaction_fees",
+        "name": "FBA transaction fees",
+        "label": "FBA派送费",
+        "source": "FBA 订单 - 派送费",
+        "terms": [
+            ("fba fees", ["order_fba"]),
+            ("fba fees", ["fba_transaction_fees"]),
+        ],
+    },
+    {
+        # 重新测量费的计算口径需要未来确认
+        "key": "fba_transaction_fee_refunds",
+        "name": "FBA transaction fee refunds",
+        "label": "FBA派送费退款",
+        "source": "FBA 退款 - 派送费 + 测量费",
+        "terms": [
+            ("fba fees", ["refund_fba"]),
+            ("total", ["fee_adjustment_weight"]),
+        ],
+    },
+    {
+        "key": "other_transaction_fees",
+        "name": "Other transaction fees",
+        "label": "其他交易费用",
+        "source": "",
+        "terms": [],
+    },
+    {
+        "key": "other_transaction_fee_refunds",
+        "name": "Other transaction fee refunds",
+        "label": "其他交易费用退款",
+        "source": "",
+        "terms": [],
+    },
+    {
+        # 服装类目的特殊退货收费、AGL 国际运费计入仓储费
+        "key": "fba_inventory_and_inbound_services_fees",
+        "name": "FBA inventory and inbound services fees",
+        "label": "FBA库存和入库服务费",
+        "source": "FBA仓储及入库服务费 - 总计",
+        "terms": [
+            ("total", ["fba_inventory_fee"]),
+            ("total", ["fba_customer_return_fee"]),
+            ("total", ["service_agl"]),
+        ],
+    },
+    {
+        "key": "shipping_label_purchases",
+        "name": "Shipping label purchases",
+        "label": "购买配送标签",
+        "source": "",
+        "terms": [],
+    },
+    {
+        "key": "shipping_label_refunds",
+        "name": "Shipping label refunds",
+        "label": "配送标签退款",
+        "source": "",
+        "terms": [],
+    },
+    {
+        "key": "carrier_shipping_label_adjustments",
+        "name": "Carrier shipping label adjustments",
+        "label": "承运商配送标签调整",
+        "source": "",
+        "terms": [],
+    },
+    {
+        # 服务费 = 优惠券 + 一般服务费（不含广告）+ 闪电促销费 + Price Discount + Coupon Performance Based Fee
+        "key": "service_fees",
+        "name": "Service fees",
+        "label": "服务费",
+        "source": "服务费（不含广告）-总计",
+        "terms": [
+            ("total", AMAZON_FEES_BUCKETS),
+            ("total", ["service_other"]),
+            ("total", ["deal_fee"]),
+            ("total", ["blank_price_discount"]),
+            ("total", ["amazon_fees_reversal"]),
+        ],
+    },
+    {
+        # 退款管理费和佣金退款合并计算在PDF中是和佣金退款合并的，所以是0
+        "key": "refund_administration_fees",
+        "name": "Refund administration fees",
+        "label": "退款管理费",
+        "source": "合并在销售佣金退款中扣除",
+        "terms": [],
+    },
+    {
+        "key": "adjustments",
+        "name": "Adjustments",
+        "label": "调整项",
+        "source": "其他赔偿调整-总计",
+        "terms": [("total", ["adjustment_expense"])],
+    },
+    {
+        "key": "cost_of_advertising",
+        "name": "Cost of Advertising",
+        "label": "广告成本",
+        "source": "广告费-总计",
+        "terms": [("total", ["service_advertising"])],
+    },
+    {
+        "key": "refund_for_advertiser",
+        "name": "Refund for Advertiser",
+        "label": "广告商退款",
+        "source": "广告退款-总计",
+        "terms": [("total", ["service_refund_for_advertiser"])],
+    },
+    {
+        "key": "liquidations_fees",
+        "name": "Liquidations fees",
+        "label": "清算处理费",
+        "source": "清算费用-其他交易费用",
+        "terms": [("other transaction fees", ["liquidation"])],
+    },
+    {
+        "key": "receivables",
+        "name": "Receivables",
+        "label": "应收账款",
+        "source": "",
+        "terms": [],
+    },
+    {
+        "key": "deductions",
+        "name": "Deductions",
+        "label": "扣款",
+        "source": "",
+        "terms": [],
+    },
+    {
+        "key": "amazon_shipping_charge_adjustments",
+        "name": "Amazon Shipping Charge Adjustments",
+        "label": "亚马逊配送运费调整",
+        "source": "",
+        "terms": [],
+    },
+]
+
+# 不在报表核算中展示、但总览草稿需要的项目
+EXTRA_RULES = [
+    {
+        # 信用卡扣费
+        "key": "amz_card",
+        "name": "Debt",
+        "label": "信用卡扣款",
+        "source": "",
+        "terms": [("total", ["debt"])],
+    },
+]
+
+# 总览草稿（国内的收入和支出明细逻辑，不同于亚马逊PDF核算逻辑）
+# 每列为若干报表核算行项目之和
+PT4_INCOME_GROUPS = [
+    (
+        "1-销售额",
+        [
+            "product_sales_non_fba",
+            "fba_product_sales",
+            "shipping_credits",
+            "gift_wrap_credits",
+            "promotional_rebates",
+        ],
+    ),
+    (
+        "2-销售额退款",
+        [
+            "product_sale_refunds_non_fba",
+            "fba_product_sale_refunds",
+            "shipping_credit_refunds",
+            "gift_wrap_credit_refunds",
+            "promotional_rebate_refunds",
+        ],
+    ),
+    ("3-赔偿", ["fba_inventory_credit", "fba_liquidation_proceeds"]),
+    (
+        "4-其他收入",
+        ["chargebacks", "a_to_z_guarantee_claims", "safe_t_reimbursement"],
+    ),
+]
+
+PT4_EXPENSE_GROUPS = [
+    # 平台费（平台费 + 退款管理费）
+    (
+        "5-平台费",
+        ["seller_fulfilled_selling_fees", "fba_selling_fees", "selling_fee_refunds"],
+    ),
+    # 派送费
+    ("6-派送费", ["fba_transaction_fees", "fba_transaction_fee_refunds"]),
+    # 仓储费
+    ("7-仓储费", ["fba_inventory_and_inbound_services_fees"]),
+    # 服务费（不含广告)
+    ("8-服务费", ["service_fees"]),
+    # 广告费
+    ("9-广告费", ["cost_of_advertising", "refund_for_advertiser"]),
+    (
+        "10-其他费用",
+        [
+            "adjustments",
+            "liquidations_fees",
+            "other_transaction_fees",
+            "other_transaction_fee_refunds",
+            "receivables",
+            "deductions",
+            "amazon_shipping_charge_adjustments",
+            "shipping_label_purchases",
+            "shipping_label_refunds",
+            "carrier_shipping_label_adjustments",
+        ],
+    ),
+]
+
+DEFAULT_RULE_SET = {
+    "income": INCOME_RULES,
+    "expense": EXPENSE_RULES,
+    "extra": EXTRA_RULES,
+    "pt4_income": PT4_INCOME_GROUPS,
+    "pt4_expense": PT4_EXPENSE_GROUPS,
+}
+
+# 按站点注册规则集，新站点的差异只需在此声明，不增加对交易表的扫描
+RULE_SETS = {
+    "amazon.com": DEFAULT_RULE_SET,
+}
+
+# 报表核算中收入/支出两侧的行数（不含合计行），不足时以空行补齐
+PT3_LINE_COUNT = 21
+
+
+def get_rule_set(marketplace=None):
+    """获取站点对应的规则集，未注册的站点使用默认规则集"""
+    return RULE_SETS.get(marketplace, DEFAULT_RULE_SET)
+
+
+def evaluate_rules(totals, rule_set=DEFAULT_RULE_SET):
+    """
+    基于分桶合计矩阵计算所有行项目
+
+    参数:
+        totals: bucket_totals 得到的 分桶 × 数值列 合计矩阵
+        rule_set: 规则集
+
+    返回:
+        dict: 行项目 key -> 金额
+    """
+    values = {}
+    for rule in rule_set["income"] + rule_set["expense"] + rule_set["extra"]:
+        sign = rule.get("sign", 1)
+        value = 0
+        for column, buckets in rule["terms"]:
+            value += sign * sum_buckets(totals, column, buckets)
+        values[rule["key"]] = value
+
+    values["income_total"] = round(
+        sum(values[rule["key"]] for rule in rule_set["income"]), 2
+    )
+    values["expense_total"] = round(
+        sum(values[rule["key"]] for rule in rule_set["expense"]), 2
+    )
+    return values
+
+
+def _pad(items, filler=""):
+    """补齐到报表核算固定行数"""
+    return list(items) + [filler] * (PT3_LINE_COUNT - len(items))
+
+
+def build_report_sheet(values, rule_set=DEFAULT_RULE_SET, currency="USD"):
+    """生成“报表核算”sheet（pt3），金额列标注站点币种"""
+    income = rule_set["income"]
+    expense = rule_set["expense"]
+    return pd.DataFrame(
+        {
+            "Income": _pad([rule["name"] for rule in income]) + ["Total_Income"],
+            "收入": _pad([rule["label"] for rule in income]) + ["合计销售额"],
+            f"In金额（{currency}）": _pad([values[rule["key"]] for rule in income])
+            + [values["income_total"]],
+            "In源表": _pad([rule["source"] for rule in income]) + [""],
+            "": [""] * (PT3_LINE_COUNT + 1),
+            "Expense": _pad([rule["name"] for rule in expense]) + ["Total_Expense"],
+            "支出": _pad([rule["label"] for rule in expense]) + ["合计费用"],
+            f"Ex金额（{currency}）": _pad([values[rule["key"]] for rule in expense])
+            + [values["expense_total"]],
+            "Ex源表": _pad([rule["source"] for rule in expense]) + [""],
+        }
+    )
+
+
+def build_overview_sheet(values, rule_set=DEFAULT_RULE_SET):
+    """
+    生成“总览草稿”sheet（pt4）
+
+    返回:
+        tuple: (pt4 DataFrame, 亚马逊回款金额)
+    """
+    row = {}
+    income_total = 0
+    for column, keys in rule_set["pt4_income"]:
+        row[column] = sum(values[key] for key in keys)
+        income_total += row[column]
+    expense_total = 0
+    for column, keys in rule_set["pt4_expense"]:
+        row[column] = sum(values[key] for key in keys)
+        expense_total += row[column]
+
+    amazon_pay_back = income_total + expense_total
+    row["收入合计"] = income_total
+    row["支出合计"] = expense_total
+    row["亚马逊回款金额"] = amazon_pay_back
+    row["信用卡扣款-支出"] = values["amz_card"]
+
+    pt4 = pd.DataFrame({column: [value] for column, value in row.items()}, index=[0])
+    return pt4, amazon_pay_back
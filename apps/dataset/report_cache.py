@@ -0,0 +1,160 @@
+"""
+解析结果缓存模块
+以上传文件内容的 SHA-256 为键，将解析后的报表 DataFrame 以列式格式缓存到
+project/<项目名>/cache 下，重复生成同一份报表时直接读取缓存，跳过 CSV 解析
+"""
+
+import hashlib
+import io
+import os
+import uuid
+
+import pandas as pd
+
+from core.config import PATH_CONFIG, REPORT_CACHE_CONFIG
+
+try:
+    import pyarrow
+
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+CACHE_FOLDER_NAME = "cache"
+CACHE_EXTENSIONS = (".parquet", ".pkl")
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    """按块计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_sha256(source):
+    """文件路径或已读入内存的文件内容的 SHA-256"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    return file_sha256(source)
+
+
+def get_cache_folder(project_name):
+    """项目缓存目录"""
+    return os.path.join(
+        os.getcwd(), PATH_CONFIG["project_data"], project_name, CACHE_FOLDER_NAME
+    )
+
+
+def write_frame(df, cache_base):
+    """
+    原子写入 DataFrame（文件名不含扩展名）
+
+    优先使用 Parquet；未安装 pyarrow 或存在无法列式存储的混合类型列时使用 pickle，
+    保证缓存读回的数据与解析结果完全一致。
+    """
+    tmp_path = f"{cache_base}.{uuid.uuid4().hex}.tmp"
+    try:
+        extension = ".pkl"
+        if HAS_PYARROW:
+            try:
+                df.to_parquet(tmp_path, index=False)
+                extension = ".parquet"
+            except (pyarrow.ArrowException, TypeError, ValueError):
+                pass
+        if extension == ".pkl":
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, cache_base + extension)
+        # 覆盖写入时删除另一种格式的旧文件，避免读到过期数据
+        for other in CACHE_EXTENSIONS:
+            if other != extension and os.path.exists(cache_base + other):
+                os.remove(cache_base + other)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_cache(cache_path):
+    if cache_path.endswith(".parquet"):
+        return pd.read_parquet(cache_path)
+    return pd.read_pickle(cache_path)
+
+
+def read_frame(cache_base):
+    """读取 write_frame 写入的 DataFrame，不存在时返回 None"""
+    for extension in CACHE_EXTENSIONS:
+        cache_path = cache_base + extension
+        if os.path.exists(cache_path):
+            return _read_cache(cache_path)
+    return None
+
+
+def evict_cache(cache_folder, max_bytes=None):
+    """按最近使用时间淘汰缓存，直到总大小不超过上限"""
+    if max_bytes is None:
+        max_bytes = REPORT_CACHE_CONFIG["max_bytes"]
+    if not os.path.isdir(cache_folder):
+        return
+
+    entries = []
+    for name in os.listdir(cache_folder):
+        if name.endswith(".tmp"):
+            continue
+        path = os.path.join(cache_folder, name)
+        stat = os.stat(path)
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def load_cached_report(project_name, source, parser, kind, version=1):
+    """
+    读取报表，命中缓存时直接返回缓存的解析结果
+
+    参数:
+        project_name: 项目名称，缓存存放在该项目目录下
+        source: 报表文件路径，或已读入内存的文件内容（bytes）
+        parser: 解析函数，接收文件路径或文件对象返回 DataFrame
+        kind: 报表类型，用于区分同一文件的不同解析方式
+        version: 解析方式变更时递增，使旧缓存失效
+
+    返回:
+        pd.DataFrame: 解析后的报表
+    """
+    cache_folder = get_cache_folder(project_name)
+    os.makedirs(cache_folder, exist_ok=True)
+    cache_base = os.path.join(
+        cache_folder, f"{kind}-v{version}-{content_sha256(source)}"
+    )
+
+    for extension in CACHE_EXTENSIONS:
+        cache_path = cache_base + extension
+        if not os.path.exists(cache_path):
+            continue
+        try:
+            df = _read_cache(cache_path)
+            # 更新修改时间，作为最近使用时间
+            os.utime(cache_path)
+            return df
+        except Exception as e:
+            print(f"读取缓存失败，重新解析: {e}")
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        df = parser(io.BytesIO(source))
+    else:
+        df = parser(source)
+    try:
+        write_frame(df, cache_base)
+        evict_cache(cache_folder)
+    except Exception as e:
+        print(f"写入缓存失败: {e}")
+    return df
@@ -0,0 +1,350 @@
+"""
+报表模板模块
+读取 Excel 模板的版式（sheet名称、表头及其样式、字体、数字格式与列宽），再用 xlsxwriter
+按模板版式写出整张报表：表头和数据行按列共享格式，数据按行写入，
+不需要加载模板后逐个单元格赋值、为每个单元格新建样式对象。
+
+登记的模板只在首次使用（或应用启动预加载）时解析一次，保留一份原始副本，
+每次请求拿到的是副本的拷贝；模板文件修改时间变化后自动重新解析。
+"""
+
+import colorsys
+import copy
+import os
+import threading
+from xml.etree import ElementTree
+
+import numpy as np
+import xlsxwriter
+from openpyxl import load_workbook
+from openpyxl.utils.indexed_list import IndexedList
+
+from apps.dataset.column_widths import estimate_column_widths
+
+# xlsxwriter 保存列宽时会在字符宽度上加 5 像素边距（默认字体每个字符 7 像素），
+# 模板中读到的是已含边距的宽度
+COLUMN_PADDING_WIDTH = 5 / 7
+
+# 单元格颜色的主题序号依次对应的主题颜色，前两对深浅颜色与主题文件中的顺序相反
+THEME_COLOR_NAMES = [
+    "lt1",
+    "dk1",
+    "lt2",
+    "dk2",
+    "accent1",
+    "accent2",
+    "accent3",
+    "accent4",
+    "accent5",
+    "accent6",
+    "hlink",
+    "folHlink",
+]
+
+# openpyxl 边框样式 -> xlsxwriter 边框序号
+BORDER_STYLES = {
+    "thin": 1,
+    "medium": 2,
+    "dashed": 3,
+    "dotted": 4,
+    "thick": 5,
+    "double": 6,
+    "hair": 7,
+}
+
+# openpyxl 垂直对齐 -> xlsxwriter 垂直对齐
+VERTICAL_ALIGNMENTS = {"top": "top", "center": "vcenter", "bottom": "bottom"}
+
+TEMPLATE_FOLDER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "model_file"
+)
+
+
+# 模板名称 -> 模板文件
+REPORT_TEMPLATES = {
+    "daily": "daily_template.xlsx",
+    "weekly": "weekly_template.xlsx",
+    "product_analysis": "product_analysis_template.xlsx",
+}
+
+# 模板名称 -> {"mtime", "workbook", "layout"}
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def template_path(template_name):
+    """模板文件路径，模板统一放在 apps/model_file 下"""
+    return os.path.join(TEMPLATE_FOLDER, template_name)
+
+
+def _theme_colors(workbook):
+    """工作簿主题中各主题序号的颜色（RRGGBB），没有主题时为空列表"""
+    if not workbook.loaded_theme:
+        return []
+    scheme = ElementTree.fromstring(workbook.loaded_theme).find(
+        ".//{http://schemas.openxmlformats.org/drawingml/2006/main}clrScheme"
+    )
+    colors = {}
+    for element in scheme if scheme is not None else []:
+        if len(element):
+            name = element.tag.rsplit("}", 1)[-1]
+            colors[name] = element[0].get("lastClr") or element[0].get("val")
+    return [colors.get(name) for name in THEME_COLOR_NAMES]
+
+
+def _apply_tint(rgb, tint):
+    """按 Excel 的明暗度调整颜色：tint 为正时变浅，为负时变深"""
+    h, lightness, s = colorsys.rgb_to_hls(
+        *(int(rgb[i : i + 2], 16) / 255 for i in (0, 2, 4))
+    )
+    if tint < 0:
+        lightness = lightness * (1 + tint)
+    else:
+        lightness = lightness * (1 - tint) + tint
+    return "".join(
+        f"{round(c * 255):02X}" for c in colorsys.hls_to_rgb(h, lightness, s)
+    )
+
+
+def _xlsxwriter_color(color, theme_colors):
+    """openpyxl 颜色转为 xlsxwriter 颜色（#RRGGBB），无法确定时为 None"""
+    if color is None:
+        return None
+    if color.type == "rgb" and isinstance(color.rgb, str):
+        rgb = color.rgb[-6:]
+    elif color.type == "theme" and color.theme < len(theme_colors):
+        rgb = theme_colors[color.theme]
+    else:
+        return None
+    if not rgb:
+        return None
+    if color.tint:
+        rgb = _apply_tint(rgb, color.tint)
+    return f"#{rgb}"
+
+
+def cell_style(cell, theme_colors=()):
+    """
+    单元格样式转为 xlsxwriter 格式
+
+    返回:
+        dict: 字体、字体颜色、纯色填充、边框、对齐及数字格式
+    """
+    font = cell.font
+    style = {"font_name": font.name, "font_size": font.sz, "bold": bool(font.b)}
+    font_color = _xlsxwriter_color(font.color, theme_colors)
+    if font_color:
+        style["font_color"] = font_color
+    if cell.fill.fill_type == "solid":
+        bg_color = _xlsxwriter_color(cell.fill.fgColor, theme_colors)
+        if bg_color:
+            style["bg_color"] = bg_color
+    for side in ["left", "right", "top", "bottom"]:
+        border = BORDER_STYLES.get(getattr(cell.border, side).style)
+        if border:
+            style[side] = border
+    if cell.alignment.horizontal:
+        style["align"] = cell.alignment.horizontal
+    if cell.alignment.vertical in VERTICAL_ALIGNMENTS:
+        style["valign"] = VERTICAL_ALIGNMENTS[cell.alignment.vertical]
+    if cell.number_format != "General":
+        style["num_format"] = cell.number_format
+    return style
+
+
+def template_layout(workbook):
+    """
+    模板活动sheet的版式
+
+    返回:
+        dict: sheet名称、表头、表头 / 正文字体、表头各列的数字格式与样式
+            及列宽（列序号 -> 宽度）
+    """
+    ws = workbook.active
+    header = list(ws[1])
+    while header and header[-1].value is None:
+        header.pop()
+
+    theme_colors = _theme_colors(workbook)
+    header_font = ws.cell(row=1, column=1).font
+    body_font = ws.cell(row=2, column=1).font
+    widths = {}
+    for dimension in ws.column_dimensions.values():
+        if dimension.width and dimension.min:
+            for col in range(dimension.min, (dimension.max or dimension.min) + 1):
+                widths[col - 1] = dimension.width
+
+    return {
+        "sheet_name": ws.title,
+        "columns": [cell.value for cell in header],
+        "number_formats": [cell.number_format for cell in header],
+        "header_formats": [cell_style(cell, theme_colors) for cell in header],
+        "header_font": {
+            "font_name": header_font.name,
+            "font_size": header_font.sz,
+            "bold": bool(header_font.b),
+        },
+        "body_font": {
+            "font_name": body_font.name,
+            "font_size": body_font.sz,
+            "bold": bool(body_font.b),
+        },
+        "widths": widths,
+    }
+
+
+def _load_template(name):
+    """取登记模板的解析结果，首次使用或文件修改时间变化时重新解析"""
+    path = template_path(REPORT_TEMPLATES[name])
+    mtime = os.stat(path).st_mtime_ns
+    with _templates_lock:
+        cached = _templates.get(name)
+        if cached is None or cached["mtime"] != mtime:
+            workbook = load_workbook(path)
+            cached = {
+                "mtime": mtime,
+                "workbook": workbook,
+                "layout": template_layout(workbook),
+            }
+            _templates[name] = cached
+    return cached
+
+
+def get_template_layout(name):
+    """登记模板的版式（副本）"""
+    return copy.deepcopy(_load_template(name)["layout"])
+
+
+def get_template_workbook(name):
+    """登记模板的 openpyxl 工作簿副本，可直接填充后保存，不影响缓存的原始副本"""
+    workbook = _load_template(name)["workbook"]
+    copied = copy.deepcopy(workbook)
+    # IndexedList 深拷贝后列表为空（元素已在索引字典中，追加时被跳过），
+    # 单元格按序号引用这些样式，需要按原顺序重建
+    for attr, value in vars(workbook).items():
+        if isinstance(value, IndexedList):
+            setattr(copied, attr, IndexedList(copy.deepcopy(list(value))))
+    return copied
+
+
+def preload_templates():
+    """预先解析所有登记的模板，应用启动时调用，避免首个请求承担解析开销"""
+    for name in REPORT_TEMPLATES:
+        _load_template(name)
+
+
+def write_template_sheet(
+    workbook,
+    sheet_name,
+    df,
+    layout,
+    cell_format=None,
+    widths=None,
+    header_formats=None,
+    column_formats=None,
+    total_row_format=None,
+):
+    """
+    在 xlsxwriter 工作簿中按模板版式写入一个sheet
+
+    参数:
+        df: sheet数据，列即表头
+        layout: get_template_layout 得到的版式
+        cell_format: 表头与数据行共用的对齐等格式，如 {"align": "center"}
+        widths: 列序号 -> 列宽，默认使用模板的列宽
+        header_formats: 表头各列的格式，如版式中的 "header_formats"，
+            默认各列使用模板表头字体
+        column_formats: 列序号 -> 该列数据单元格的格式，如 {"num_format": "0.00%"}
+        total_row_format: 最后一行（汇总行）在数据格式上追加的格式，如 {"bold": True}
+    """
+    cell_format = cell_format or {}
+    column_formats = column_formats or {}
+    ws = workbook.add_worksheet(sheet_name)
+
+    widths = layout["widths"] if widths is None else widths
+    for col, width in widths.items():
+        ws.set_column(col, col, max(width - COLUMN_PADDING_WIDTH, 0))
+
+    # 相同样式的单元格共用一个格式对象
+    formats = {}
+
+    def get_format(*styles):
+        style = {}
+        for extra in styles:
+            style.update(extra)
+        key = tuple(sorted(style.items()))
+        if key not in formats:
+            formats[key] = workbook.add_format(style)
+        return formats[key]
+
+    columns = [str(column) for column in df.columns]
+    header_formats = header_formats or []
+    for col, column in enumerate(columns):
+        header_format = header_formats[col] if col < len(header_formats) else {}
+        ws.write(
+            0,
+            col,
+            column,
+            get_format(layout["header_font"], header_format, cell_format),
+        )
+
+    body_formats = [
+        get_format(layout["body_font"], cell_format, column_formats.get(col, {}))
+        for col in range(len(columns))
+    ]
+    total_formats = body_formats
+    if total_row_format:
+        total_formats = [
+            get_format(
+                layout["body_font"],
+                cell_format,
+                column_formats.get(col, {}),
+                total_row_format,
+            )
+            for col in range(len(columns))
+        ]
+
+    # 空值和无穷大（如点击量为0时的单次点击花费）写为空单元格
+    df = df.replace([np.inf, -np.inf], np.nan)
+    rows = df.astype(object).where(df.notna(), None).to_numpy().tolist()
+    for row_index, row in enumerate(rows, 1):
+        row_formats = total_formats if row_index == len(rows) else body_formats
+        for col, value in enumerate(row):
+            ws.write(row_index, col, value, row_formats[col])
+    return ws
+
+
+def write_template_report(df, layout, output, cell_format=None, extra_sheets=None):
+    """
+    按模板版式写出报表
+
+    参数:
+        df: 报表数据，写入与模板同名的sheet
+        layout: get_template_layout 得到的版式
+        output: 输出路径或文件对象
+        cell_format: 表头与数据行共用的对齐等格式，模板sheet的表头沿用模板的边框与填充
+        extra_sheets: sheet名称 -> DataFrame，追加在模板sheet之后，
+            使用模板字体并按内容估算列宽
+    """
+    workbook = xlsxwriter.Workbook(output)
+    try:
+        write_template_sheet(
+            workbook,
+            layout["sheet_name"],
+            df,
+            layout,
+            cell_format,
+            header_formats=layout["header_formats"],
+        )
+        for sheet_name, extra in (extra_sheets or {}).items():
+            widths = estimate_column_widths(extra, min_width=8, max_width=50)
+            write_template_sheet(
+                workbook,
+                sheet_name,
+                extra,
+                layout,
+                cell_format,
+                {col: width + COLUMN_PADDING_WIDTH for col, width in enumerate(widths)},
+            )
+    finally:
+        workbook.close()
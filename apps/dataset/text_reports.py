@@ -0,0 +1,88 @@
+"""
+文本报告读取模式
+订单报告（All Orders）与 FBA 库存报告是制表符分隔的文本文件，列很多，各功能只用到
+其中几列。这里按报告类型统一定义用到的列和数据类型：只解析需要的列，低基数的状态列
+读为 category，金额列读为 float64；订单报告可以分块读取并只保留需要的行，
+90天的订单报告也不需要整份留在内存中。
+"""
+
+import pandas as pd
+
+ORDERS_REPORT = "orders"
+FBA_INVENTORY_REPORT = "fba_inventory"
+
+# 分块过滤行时每块的行数
+TEXT_REPORT_CHUNK_ROWS = 100000
+
+# 报告类型 -> 名称、用到的列、必需列及数据类型，未列出类型的列按 pandas 默认推断
+TEXT_REPORT_SPECS = {
+    ORDERS_REPORT: {
+        "name": "订单报告",
+        "columns": ["order-status", "sku", "quantity", "item-price"],
+        "required": ["order-status", "sku", "quantity", "item-price"],
+        "dtypes": {"order-status": "category", "item-price": "float64"},
+    },
+    FBA_INVENTORY_REPORT: {
+        "name": "FBA库存报告",
+        "columns": [
+            "sku",
+            "asin",
+            "available",
+            "inv-age-0-to-90-days",
+            "inv-age-91-to-180-days",
+            "inv-age-181-to-270-days",
+            "inv-age-271-to-365-days",
+            "inv-age-365-plus-days",
+            "recommended-action",
+        ],
+        "required": ["sku"],
+        "dtypes": {"recommended-action": "category"},
+    },
+}
+
+
+def read_text_report(source, report_type, usecols=None, row_filter=None):
+    """
+    读取订单、FBA库存等制表符分隔的文本报告
+
+    参数:
+        source: 报告文件路径或文件对象
+        report_type: TEXT_REPORT_SPECS 中的报告类型
+        usecols: 只读取这些列且都必须存在；默认读取该类型用到的列中报告里有的列
+        row_filter: 按块过滤行的函数，传入 DataFrame 返回布尔 Series
+
+    返回:
+        pd.DataFrame: 按报告中的顺序排列的列
+    """
+    spec = TEXT_REPORT_SPECS[report_type]
+    if usecols is None:
+        wanted, required = set(spec["columns"]), spec["required"]
+    else:
+        wanted, required = set(usecols), list(usecols)
+    dtypes = {
+        column: dtype for column, dtype in spec["dtypes"].items() if column in wanted
+    }
+
+    kwargs = {
+        "sep": "\t",
+        "encoding": "utf-8",
+        "usecols": lambda column: column in wanted,
+        "dtype": dtypes,
+    }
+    if row_filter is None:
+        df = pd.read_csv(source, **kwargs)
+    else:
+        chunks = [
+            chunk.loc[row_filter(chunk)]
+            for chunk in pd.read_csv(source, chunksize=TEXT_REPORT_CHUNK_ROWS, **kwargs)
+        ]
+        df = pd.concat(chunks, ignore_index=True)
+        # 各块的类别不同，合并后重新转为 category
+        for column, dtype in dtypes.items():
+            if dtype == "category" and column in df.columns:
+                df[column] = df[column].astype("category")
+
+    missing = [column for column in required if column not in df.columns]
+    if missing:
+        raise ValueError(f"{spec['name']}缺少必需列: {', '.join(missing)}")
+    return df
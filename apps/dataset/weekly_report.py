@@ -0,0 +1,173 @@
+"""
+周报模块
+合并已保存的每日SKU数据生成周报：订单、销售与广告数据按周求和，可售库存取
+周内最后一个已生成日报的日期，不需要重新上传和解析每天的原始报告。
+"""
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, request, send_file, redirect, url_for, flash
+
+from core.log_service import LogService
+from apps.dataset.daily_report import DAILY_CELL_FORMAT
+from apps.dataset.daily_store import load_daily_results, stored_days, week_dates
+from apps.dataset.report_template import get_template_layout, write_template_report
+
+weekly_report_bp = Blueprint("weekly_report", __name__)
+
+# 按周求和的列
+WEEKLY_SUM_COLUMNS = ["订单量", "销售额", "曝光量", "点击量", "广告花费", "广告订单"]
+
+DAILY_SUMMARY_SHEET = "每日汇总"
+DAILY_SUMMARY_COLUMNS = ["日期", "状态", "订单量", "销售额", "广告花费", "广告订单"]
+
+
+def load_week_results(project_name, dates):
+    """读取各日期已保存的日报数据，未生成日报的日期不在结果中"""
+    results = {}
+    for date in dates:
+        df = load_daily_results(project_name, date)
+        if df is not None:
+            results[date] = df
+    return results
+
+
+def build_weekly_overview(daily_results, date_range, columns):
+    """
+    合并每日数据生成周报
+
+    参数:
+        daily_results: 日期 -> 当天按SKU合并的日报数据，按日期排列
+        date_range: 写入第一列的日期范围，如 "2025-11-03 ~ 2025-11-09"
+        columns: 周报模板表头
+
+    返回:
+        pd.DataFrame: 按SKU排序的周报数据
+    """
+    days = pd.concat(daily_results.values(), ignore_index=True)
+    grouped = days.groupby("SKU", sort=True)
+    weekly = grouped[WEEKLY_SUM_COLUMNS].sum()
+
+    # 没有广告数据的日期 ASIN 为 0，取周内第一个有效 ASIN
+    asin = days["ASIN"].where(days["ASIN"].astype(str) != "0")
+    weekly["ASIN"] = asin.groupby(days["SKU"]).first().reindex(weekly.index).fillna(0)
+
+    # 可售库存是时点数据，取最后一个已生成日报的日期
+    latest = list(daily_results.values())[-1].groupby("SKU")["可售库存"].last()
+    weekly["可售库存"] = latest.reindex(weekly.index).fillna(0).astype(int)
+
+    weekly["单次点击花费"] = (
+        weekly["广告花费"] / weekly["点击量"].replace(0, np.nan)
+    ).round(2)
+    for column in ["销售额", "广告花费"]:
+        weekly[column] = weekly[column].round(2)
+
+    weekly = weekly.reset_index()
+    weekly[columns[0]] = date_range
+    return weekly[columns]
+
+
+def build_daily_summary(dates, daily_results):
+    """各日期的订单、销售与广告合计，未生成日报的日期标记为未生成"""
+    rows = []
+    for date in dates:
+        if date not in daily_results:
+            rows.append([date, "未生成", None, None, None, None])
+            continue
+        df = daily_results[date]
+        rows.append(
+            [
+                date,
+                "已汇总",
+                int(df["订单量"].sum()),
+                round(float(df["销售额"].sum()), 2),
+                round(float(df["广告花费"].sum()), 2),
+                int(df["广告订单"].sum()),
+            ]
+        )
+    return pd.DataFrame(rows, columns=DAILY_SUMMARY_COLUMNS)
+
+
+def process_weekly_report(project_name, start_date):
+    """
+    生成周报
+
+    从开始日期起的7天中读取已保存的日报数据，按 weekly_template.xlsx 的版式写出，
+    附每日汇总sheet，保存到项目周报目录。
+
+    返回:
+        tuple: (工作簿内容, 下载文件名)
+    """
+    dates = week_dates(start_date)
+    daily_results = load_week_results(project_name, dates)
+    if not daily_results:
+        available = "、".join(stored_days(project_name)) or "无"
+        raise ValueError(
+            f"{project_name} 在 {dates[0]} ~ {dates[-1]} 内没有已生成的日报，"
+            f"已生成的日期: {available}"
+        )
+
+    layout = get_template_layout("weekly")
+    df_weekly = build_weekly_overview(
+        daily_results, f"{dates[0]} ~ {dates[-1]}", layout["columns"]
+    )
+
+    output = io.BytesIO()
+    write_template_report(
+        df_weekly,
+        layout,
+        output,
+        DAILY_CELL_FORMAT,
+        {DAILY_SUMMARY_SHEET: build_daily_summary(dates, daily_results)},
+    )
+    file_content = output.getvalue()
+
+    project_folder_path = os.path.join(os.getcwd(), "project", project_name, "周报")
+    os.makedirs(project_folder_path, exist_ok=True)
+    filename = f"{project_name}_{dates[0]}_{dates[-1]}_周报.xlsx"
+    with open(os.path.join(project_folder_path, filename), "wb") as f:
+        f.write(file_content)
+
+    return file_content, filename
+
+
+@weekly_report_bp.route("/weekly-report", methods=["POST"])
+def weekly_report():
+    """根据已生成的日报汇总周报"""
+    project_name = request.form.get("project_name")
+    start_date = (request.form.get("start_date") or "").strip()
+
+    if not project_name or not start_date:
+        flash("请选择项目并填写周报开始日期")
+        return redirect(url_for("dataset.daily_report_page"))
+
+    try:
+        file_content, filename = process_weekly_report(project_name, start_date)
+
+        LogService.log(
+            action="生成周报",
+            resource="日报功能",
+            details=f"项目: {project_name}, 开始日期: {start_date}, 文件: {filename}",
+            log_type="user",
+            level="info",
+        )
+
+        return send_file(
+            io.BytesIO(file_content),
+            as_attachment=True,
+            download_name=filename,
+            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+    except Exception as e:
+        LogService.log(
+            action="生成周报失败",
+            resource="日报功能",
+            details=f"项目: {project_name}, 开始日期: {start_date}, 错误: {str(e)}",
+            log_type="user",
+            level="error",
+        )
+        flash(f"生成周报时发生错误: {str(e)}", "error")
+        return redirect(url_for("dataset.daily_report_page"))
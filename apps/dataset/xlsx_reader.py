@@ -0,0 +1,360 @@
+"""
+XLSX 流式读取模块
+广告产品报告、优麦云报表等 xlsx 往往有几十列、几十万行，而处理时只需要其中几列。
+pd.read_excel 和 openpyxl.load_workbook 会为每个单元格创建对象，大文件要几十秒。
+
+这里直接解压工作表 XML，按块扫描单元格，只提取需要的列，再按列整体转换为
+int / float / str 数组：数字列用 numpy 一次转换，文本列按共享字符串序号一次取值。
+单元格写法不规范（带命名空间前缀、缺少单元格位置等）的工作表改用 ElementTree
+逐个元素解析，结果相同。
+
+读取的取值与 pd.read_excel 一致：整数值的数字列为 int64，含小数或空值的数字列为
+float64，空单元格、空文本和错误值为空值；日期格式的数字按序列号读出。所需列都为空
+的行不读入。
+"""
+
+import html
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+# 每次解压的工作表 XML 字节数
+CHUNK_SIZE = 16 * 1024 * 1024
+
+RELATIONSHIP_ID = (
+    "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+)
+
+CELL_REF_PATTERN = re.compile(r"([A-Z]+)(\d+)")
+CELL_TYPE_PATTERN = re.compile(rb'\bt="(\w+)"')
+INLINE_TEXT_PATTERN = re.compile(rb"<t\b[^>]*>([^<]*)</t>")
+
+
+# 带命名空间前缀的单元格与行元素，如 <x:c r="A1">、<x:row r="1">
+PREFIXED_CELL_PATTERN = re.compile(rb"<\w+:c[\s/>]")
+ROW_PATTERN = re.compile(rb"<(?:\w+:)?row[\s/>]")
+
+
+def _cell_pattern(letters):
+    """
+    匹配指定列单元格的正则：列字母、行号、其余属性、值、行内字符串
+
+    公式单元格的 <f> 在 <v> 之前，跳过公式取缓存的计算结果。
+    """
+    return re.compile(
+        rb'<c r="('
+        + letters
+        + rb')(\d+)"([^>]*?)/?>'
+        + rb"(?:(?:<f\b[^>]*/>|<f\b[^>]*>[^<]*</f>)?<v>([^<]*)</v>|<is>(.*?)</is>)?",
+        re.S,
+    )
+
+
+def _local_name(tag):
+    """去掉命名空间的标签名"""
+    return tag.rpartition("}")[2]
+
+
+def _column_index(letters):
+    """列字母转为从0开始的列序号，如 A -> 0、AA -> 26"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _column_letters(index):
+    """从0开始的列序号转为列字母"""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _text(element):
+    """共享字符串或行内字符串的文本，富文本各段依次拼接，忽略注音"""
+    parts = []
+    for child in element:
+        name = _local_name(child.tag)
+        if name == "t":
+            parts.append(child.text or "")
+        elif name == "r":
+            parts.extend(t.text or "" for t in child if _local_name(t.tag) == "t")
+    return "".join(parts)
+
+
+def _number(text):
+    """数字单元格的值，整数值按 int 返回"""
+    try:
+        return int(text)
+    except ValueError:
+        value = float(text)
+        return int(value) if value.is_integer() else value
+
+
+def _cell_value(cell_type, raw, shared_strings):
+    """按单元格类型转换原始文本，空文本和错误值为 None"""
+    if cell_type == "s":
+        value = shared_strings[int(raw)]
+    elif cell_type == "n":
+        value = _number(raw)
+    elif cell_type == "b":
+        value = raw == "1"
+    elif cell_type == "e":
+        value = None
+    elif cell_type == "d":
+        value = pd.Timestamp(raw)
+    else:
+        value = raw
+    return None if value == "" else value
+
+
+def _sheet_path(archive, sheet_name=None):
+    """工作表 XML 在压缩包中的路径，默认第一个sheet"""
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    sheets = [
+        element for element in workbook.iter() if _local_name(element.tag) == "sheet"
+    ]
+    if sheet_name is None:
+        sheet = sheets[0]
+    else:
+        matched = [element for element in sheets if element.get("name") == sheet_name]
+        if not matched:
+            raise ValueError(f"工作簿中没有名为 {sheet_name} 的sheet")
+        sheet = matched[0]
+
+    relationships = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    for relationship in relationships:
+        if relationship.get("Id") == sheet.get(RELATIONSHIP_ID):
+            target = relationship.get("Target")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", target))
+    raise ValueError(f"无法定位sheet: {sheet.get('name')}")
+
+
+def _shared_strings(archive):
+    """共享字符串表"""
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, element in ET.iterparse(f):
+            if _local_name(element.tag) == "si":
+                strings.append(_text(element))
+                element.clear()
+    return strings
+
+
+def _iter_chunks(sheet_file):
+    """按块读取工作表 XML，每块在行结束标签处截断，保证单元格不被拆开"""
+    pending = b""
+    while True:
+        block = sheet_file.read(CHUNK_SIZE)
+        if not block:
+            if pending:
+                yield pending
+            return
+        pending += block
+        end = pending.rfind(b"</row>")
+        if end >= 0:
+            end += len(b"</row>")
+            yield pending[:end]
+            pending = pending[end:]
+
+
+def _is_regular(chunk):
+    """
+    单元格均为不带前缀、以位置属性开头的写法时可以直接按正则扫描
+
+    有行却没有 <c r=" 的块（如单元格带命名空间前缀）不能按正则扫描，
+    否则会得到空结果。
+    """
+    if b"<c>" in chunk or PREFIXED_CELL_PATTERN.search(chunk):
+        return False
+    cells = chunk.count(b'<c r="')
+    if not cells and ROW_PATTERN.search(chunk):
+        return False
+    return chunk.count(b"<c ") == cells
+
+
+class _ColumnCells:
+    """一列单元格的行号、类型与原始文本，读完后整列转换"""
+
+    def __init__(self):
+        self.rows = []
+        self.types = []
+        self.raws = []
+
+    def add(self, row, cell_type, raw):
+        self.rows.append(row)
+        self.types.append(cell_type)
+        self.raws.append(raw)
+
+    def to_series(self, shared_strings):
+        """转换为以行号为索引的 Series，空值不保留"""
+        rows = np.asarray(self.rows, dtype=np.int64)
+        types = set(self.types)
+        if types == {"n"}:
+            values = np.asarray(self.raws, dtype=bytes).astype(np.float64)
+            if np.all(values == np.floor(values)) and np.all(np.abs(values) < 2**63):
+                values = values.astype(np.int64)
+            return pd.Series(values, index=rows)
+        if types == {"s"}:
+            strings = np.asarray(shared_strings, dtype=object)
+            values = strings[np.asarray(self.raws, dtype=bytes).astype(np.int64)]
+            keep = values != ""
+            return pd.Series(values[keep], index=rows[keep], dtype=object)
+
+        values = [
+            _cell_value(cell_type, raw, shared_strings)
+            for cell_type, raw in zip(self.types, self.raws)
+        ]
+        series = pd.Series(values, index=rows, dtype=object)
+        return series[series.notna()].infer_objects()
+
+
+def _scan_cells(chunks, header_number, letters, cells):
+    """
+    用正则扫描各块中指定列的单元格
+
+    返回:
+        bool: 遇到不规范写法的块时返回 False，由调用方改用逐元素解析
+    """
+    pattern = _cell_pattern("|".join(dict.fromkeys(letters)).encode())
+    for chunk in chunks:
+        if not _is_regular(chunk):
+            return False
+        for letter, row, attributes, value, inline in pattern.findall(chunk):
+            row = int(row)
+            if row <= header_number:
+                continue
+            if inline:
+                cell_type = "str"
+                raw = "".join(
+                    text.decode() for text in INLINE_TEXT_PATTERN.findall(inline)
+                )
+            elif value:
+                match = CELL_TYPE_PATTERN.search(attributes)
+                cell_type = match.group(1).decode() if match else "n"
+                raw = value if cell_type == "n" else value.decode()
+            else:
+                continue
+            if cell_type == "str":
+                raw = html.unescape(raw)
+            cells[letter.decode()].add(row, cell_type, raw)
+    return True
+
+
+def _iter_rows(sheet_file):
+    """
+    用 ElementTree 逐行产出有值单元格的原始内容
+
+    返回:
+        iterator: (行号, {列序号: (单元格类型, 原始文本)})，行号从1开始
+    """
+    row_number = 0
+    cells = {}
+    column = -1
+    for _, element in ET.iterparse(sheet_file):
+        name = _local_name(element.tag)
+        if name == "c":
+            ref = element.get("r")
+            if ref:
+                column = _column_index(CELL_REF_PATTERN.match(ref).group(1))
+            else:
+                column += 1
+
+            cell_type = element.get("t", "n")
+            for child in element:
+                child_name = _local_name(child.tag)
+                if child_name == "v" and child.text is not None:
+                    cells[column] = (cell_type, child.text)
+                elif child_name == "is":
+                    cells[column] = ("str", _text(child))
+            element.clear()
+        elif name == "row":
+            row_number = int(element.get("r") or row_number + 1)
+            element.clear()
+            yield row_number, cells
+            cells = {}
+            column = -1
+
+
+def _parse_cells(sheet_file, header_number, letters, cells):
+    """逐元素解析指定列的单元格，用于不规范写法的工作表"""
+    indices = {_column_index(letter): letter for letter in letters}
+    for row_number, row in _iter_rows(sheet_file):
+        if row_number <= header_number:
+            continue
+        for index, letter in indices.items():
+            if index in row:
+                cell_type, raw = row[index]
+                if cell_type == "n":
+                    raw = raw.encode()
+                cells[letter].add(row_number, cell_type, raw)
+
+
+def _read_header(archive, path, shared_strings):
+    """表头所在行号及列名 -> 列序号"""
+    with archive.open(path) as sheet_file:
+        header_number, header = next(_iter_rows(sheet_file), (0, {}))
+    positions = {}
+    for index in sorted(header):
+        value = _cell_value(*header[index], shared_strings)
+        if value is not None:
+            positions.setdefault(str(value), index)
+    if not positions:
+        raise ValueError("无法读取文件头部，请确保文件格式正确且至少有一行。")
+    return header_number, positions
+
+
+def read_xlsx_columns(source, columns=None, sheet_name=None):
+    """
+    流式读取 xlsx 中第一行为表头的sheet的指定列
+
+    参数:
+        source: 文件路径或文件对象
+        columns: 需要读取的列名，None 表示读取全部列
+        sheet_name: sheet名称，默认第一个sheet
+
+    返回:
+        pd.DataFrame: 按 columns 顺序排列的数据
+    """
+    with zipfile.ZipFile(source) as archive:
+        shared_strings = _shared_strings(archive)
+        path = _sheet_path(archive, sheet_name)
+        header_number, positions = _read_header(archive, path, shared_strings)
+
+        if columns is None:
+            columns = list(positions)
+        missing = [column for column in columns if column not in positions]
+        if missing:
+            raise ValueError(f"上传文件缺少必需列: {', '.join(missing)}")
+
+        letters = [_column_letters(positions[column]) for column in columns]
+        cells = {letter: _ColumnCells() for letter in letters}
+        with archive.open(path) as sheet_file:
+            regular = _scan_cells(
+                _iter_chunks(sheet_file), header_number, letters, cells
+            )
+        if not regular:
+            cells = {letter: _ColumnCells() for letter in letters}
+            with archive.open(path) as sheet_file:
+                _parse_cells(sheet_file, header_number, letters, cells)
+
+    series = [cells[letter].to_series(shared_strings) for letter in letters]
+    # 所需列都为空的行不保留
+    rows = np.unique(np.concatenate([s.index.to_numpy(np.int64) for s in series]))
+    return pd.DataFrame(
+        {
+            column: s.reindex(rows).reset_index(drop=True)
+            for column, s in zip(columns, series)
+        }
+    )
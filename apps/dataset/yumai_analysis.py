@@ -11,16 +11,46 @@ from flask import (
 import io
 import os
 import csv
-import openpyxl
-from copy import copy
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
 import datetime
 import pandas as pd
+import xlsxwriter
 from core.log_service import LogService
+from apps.dataset.column_widths import estimate_column_widths
+from apps.dataset.inventory_aging import (
+    INVENTORY_DETAIL_SHEET,
+    build_inventory_detail,
+    load_inventory,
+)
+from apps.dataset.report_template import COLUMN_PADDING_WIDTH
+from apps.dataset.xlsx_reader import read_xlsx_columns
 
 yumai_analysis_bp = Blueprint("yumai_analysis", __name__)
 
+YUMAI_SHEET = "优麦云分析"
+
+# 优麦云报表中读取的列
+YUMAI_SOURCE_COLUMNS = [
+    "SKU",
+    "ASIN",
+    "币种",
+    "销量",
+    "销售额",
+    "可售",
+    "广告花费",
+    "广告曝光量",
+    "广告点击量",
+    "ACoAS",
+]
+
+# 输出的表头，最后一列为 ACoAS，汇总行为广告花费占销售额的百分比
+YUMAI_OUTPUT_COLUMNS = YUMAI_SOURCE_COLUMNS[:-1] + ["广告占比"]
+
+# 汇总行求和的列
+YUMAI_SUM_COLUMNS = ["销量", "销售额", "广告花费", "广告曝光量", "广告点击量", "可售"]
+
+# 优麦云分析样式：居中、细边框，表头紫底白字加粗，汇总行加粗
+YUMAI_CELL_FORMAT = {"align": "center", "valign": "vcenter", "border": 1}
+
 
 @yumai_analysis_bp.route("/yumai-analysis", methods=["GET"])
 def yumai_analysis_page():
@@ -59,226 +89,95 @@ def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in {"xlsx", "txt"}
 
 
-def process_yumai_data(yumai_report_path, fba_report_path=None):
-    """处理优麦云数据并可选择性地添加库存详情"""
+def add_yumai_formats(workbook):
+    """在 xlsxwriter 工作簿中注册优麦云分析使用的共享格式"""
+    return {
+        "header": workbook.add_format(
+            {
+                **YUMAI_CELL_FORMAT,
+                "bold": True,
+                "font_color": "#FFFFFF",
+                "bg_color": "#7A6AFF",
+            }
+        ),
+        "body": workbook.add_format(YUMAI_CELL_FORMAT),
+        "summary": workbook.add_format({**YUMAI_CELL_FORMAT, "bold": True}),
+    }
+
+
+def _frame_rows(df):
+    """DataFrame 的各行，空值为 None（写为带格式的空单元格）"""
+    return df.astype(object).where(df.notna(), None).to_numpy().tolist()
+
+
+def process_yumai_data(yumai_report_path, fba_report_path=None, project_name=None):
+    """
+    处理优麦云数据并可选择性地添加库存详情，传入项目名称时缓存库存报告的解析结果
+
+    返回:
+        bytes: 优麦云分析报表内容
+    """
     if not os.path.exists(yumai_report_path):
         raise FileNotFoundError("优麦云报表文件不存在！")
 
-    wb = openpyxl.load_workbook(yumai_report_path)
-    ws = wb.active
+    # 只流式读取需要的列，缺少表头或必需列时报错
+    yumai_df = read_xlsx_columns(yumai_report_path, YUMAI_SOURCE_COLUMNS)
 
-    try:
-        header = {cell.value: cell.column for cell in ws[1]}
-    except IndexError:
-        raise ValueError("无法读取文件头部，请确保文件格式正确且至少有一行。")
-
-    source_columns = [
-        "SKU",
-        "ASIN",
-        "币种",
-        "销量",
-        "销售额",
-        "可售",
-        "广告花费",
-        "广告曝光量",
-        "广告点击量",
-        "ACoAS",
-    ]
-    missing = [col for col in source_columns if col not in header]
-    if missing:
-        raise ValueError(f"上传文件缺少必需列: {', '.join(missing)}")
-
-    ordered_columns = [
-        "SKU",
-        "ASIN",
-        "币种",
-        "销量",
-        "销售额",
-        "可售",
-        "广告花费",
-        "广告曝光量",
-        "广告点击量",
-        "广告占比",
-    ]
-
-    # 创建一个新的临时工作簿来处理主数据，以免损坏原始样式
-    processed_wb = openpyxl.Workbook()
-    new_ws = processed_wb.active
-    new_ws.title = "优麦云分析"
-
-    header_font = Font(bold=True, color="FFFFFF")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    header_fill = PatternFill(fill_type="solid", fgColor="7A6AFF")
-    border = Border(
-        left=Side(style="thin"),
-        right=Side(style="thin"),
-        top=Side(style="thin"),
-        bottom=Side(style="thin"),
+    # 汇总按列求和，非数值的单元格不计入
+    sums = (
+        yumai_df[YUMAI_SUM_COLUMNS].apply(pd.to_numeric, errors="coerce").sum().tolist()
     )
-
-    for i, col_name in enumerate(ordered_columns, 1):
-        cell = new_ws.cell(row=1, column=i, value=col_name)
-        cell.font = copy(header_font)
-        cell.alignment = copy(header_alignment)
-        cell.fill = copy(header_fill)
-        cell.border = border
-
-    source_col_indices = {name: header[name] for name in source_columns}
-    new_col_indices = {name: i + 1 for i, name in enumerate(source_columns)}
-
-    summary = {
-        "销量": 0,
-        "销售额": 0,
-        "广告花费": 0,
-        "广告曝光量": 0,
-        "广告点击量": 0,
-        "可售": 0,
-    }
-    numeric_cols = ["销量", "销售额", "广告花费", "广告曝光量", "广告点击量", "可售"]
-
-    data_rows = []
-    for row_idx in range(2, ws.max_row + 1):
-        row_data = {}
-        for col_name in source_columns:
-            old_col_idx = source_col_indices[col_name]
-            old_cell = ws.cell(row=row_idx, column=old_col_idx)
-            row_data[col_name] = old_cell.value
-        data_rows.append(row_data)
-
-        for col_name in numeric_cols:
-            val = row_data.get(col_name)
-            if isinstance(val, (int, float)):
-                summary[col_name] += val
-
-    for r_idx, row_data in enumerate(data_rows, 2):
-        for col_name in source_columns:
-            new_col_idx = new_col_indices[col_name]
-            new_cell = new_ws.cell(
-                row=r_idx, column=new_col_idx, value=row_data[col_name]
-            )
-            new_cell.alignment = Alignment(horizontal="center", vertical="center")
-            new_cell.border = border
-
-    summary_row_idx = new_ws.max_row + 1
-    summary_row_data = {
-        "SKU": "汇总",
-        "ASIN": "",
-        "币种": "",
-        "销量": summary["销量"],
-        "销售额": summary["销售额"],
-        "可售": summary["可售"],
-        "广告花费": summary["广告花费"],
-        "广告曝光量": summary["广告曝光量"],
-        "广告点击量": summary["广告点击量"],
-        "广告占比": "",
-    }
-    if summary["销售额"] and summary["销售额"] != 0:
-        summary_row_data["广告占比"] = (
+    summary = dict(zip(YUMAI_SUM_COLUMNS, sums))
+    summary_row = {"SKU": "汇总", "ASIN": "", "币种": "", "广告占比": "", **summary}
+    if summary["销售额"]:
+        summary_row["广告占比"] = (
             f"{round(summary['广告花费'] / summary['销售额'] * 100, 2)}%"
         )
 
-    summary_font = Font(bold=True)
-    for i, col_name in enumerate(ordered_columns, 1):
-        cell = new_ws.cell(
-            row=summary_row_idx, column=i, value=summary_row_data.get(col_name)
+    inv_df = None
+    if fba_report_path and os.path.exists(fba_report_path):
+        inv_df = build_inventory_detail(
+            load_inventory(fba_report_path, project_name), yumai_df, "销量"
         )
-        cell.font = copy(summary_font)
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-        cell.border = border
 
-    # 如果有库存文件，添加库存详情sheet
-    if fba_report_path and os.path.exists(fba_report_path):
-        ws_inv = processed_wb.create_sheet("库存详情")
-        inv_df = pd.read_csv(fba_report_path, sep="\t", encoding="utf-8")
-
-        keep_cols = [
-            "sku",
-            "asin",
-            "available",
-            "inv-age-0-to-90-days",
-            "inv-age-91-to-180-days",
-            "inv-age-181-to-270-days",
-            "inv-age-271-to-365-days",
-            "inv-age-365-plus-days",
-            "recommended-action",
-        ]
-        inv_df = inv_df[[col for col in keep_cols if col in inv_df.columns]].copy()
-
-        rename_dict = {
-            "sku": "SKU",
-            "asin": "ASIN",
-            "available": "可售库存",
-            "inv-age-0-to-90-days": "0-90天",
-            "inv-age-91-to-180-days": "91-180天",
-            "inv-age-181-to-270-days": "181-270天",
-            "inv-age-271-to-365-days": "271-365天",
-            "inv-age-365-plus-days": "365+天",
-            "recommended-action": "库存建议",
-        }
-        inv_df.rename(columns=rename_dict, inplace=True)
-
-        sales_df = pd.DataFrame(data_rows)[["SKU", "销量"]].copy()
-        sales_df.rename(columns={"销量": "本周销量"}, inplace=True)
-        sales_df["本周销量"] = pd.to_numeric(
-            sales_df["本周销量"], errors="coerce"
-        ).fillna(0)
-
-        inv_df = pd.merge(inv_df, sales_df, on="SKU", how="left")
-        inv_df["本周销量"] = inv_df["本周销量"].fillna(0)
-
-        new_column_order = [
-            "SKU",
-            "ASIN",
-            "本周销量",
-            "可售库存",
-            "0-90天",
-            "91-180天",
-            "181-270天",
-            "271-365天",
-            "365+天",
-            "库存建议",
-        ]
-        inv_df = inv_df[[col for col in new_column_order if col in inv_df.columns]]
-
-        summary_data = {
-            "SKU": "汇总行",
-            "ASIN": "",
-            "本周销量": inv_df["本周销量"].sum(),
-            "可售库存": inv_df["可售库存"].sum(),
-            "0-90天": inv_df["0-90天"].sum(),
-            "91-180天": inv_df["91-180天"].sum(),
-            "181-270天": inv_df["181-270天"].sum(),
-            "271-365天": inv_df["271-365天"].sum(),
-            "365+天": inv_df["365+天"].sum(),
-            "库存建议": "",
-        }
-        summary_df = pd.DataFrame([summary_data])
-        inv_df = pd.concat([inv_df, summary_df], ignore_index=True)
-
-        for r_idx, row in enumerate(
-            dataframe_to_rows(inv_df, index=False, header=True), 1
-        ):
-            for c_idx, value in enumerate(row, 1):
-                cell = ws_inv.cell(row=r_idx, column=c_idx, value=value)
-                cell.alignment = Alignment(horizontal="center", vertical="center")
-                cell.border = border
-                if r_idx == 1:
-                    cell.font = copy(header_font)
-                    cell.fill = copy(header_fill)
-
-        for col in ws_inv.columns:
-            max_length = 0
-            column = col[0].column_letter
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = max_length + 2
-            ws_inv.column_dimensions[column].width = adjusted_width
-
-    return processed_wb
+    # 常量内存模式按行顺序写出，写完的行立即落盘，所有单元格共用三个格式；
+    # 文本原样写入，不识别为链接或公式
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(
+        output,
+        {
+            "constant_memory": True,
+            "strings_to_urls": False,
+            "strings_to_formulas": False,
+        },
+    )
+    try:
+        formats = add_yumai_formats(workbook)
+
+        ws = workbook.add_worksheet(YUMAI_SHEET)
+        ws.write_row(0, 0, YUMAI_OUTPUT_COLUMNS, formats["header"])
+        # 广告占比列写入源数据的 ACoAS
+        rows = _frame_rows(yumai_df[YUMAI_SOURCE_COLUMNS])
+        for row_index, row in enumerate(rows, 1):
+            ws.write_row(row_index, 0, row, formats["body"])
+        ws.write_row(
+            len(rows) + 1,
+            0,
+            [summary_row[col] for col in YUMAI_OUTPUT_COLUMNS],
+            formats["summary"],
+        )
+
+        # 如果有库存文件，添加库存详情sheet
+        if inv_df is not None:
+            ws_inv = workbook.add_worksheet(INVENTORY_DETAIL_SHEET)
+            for col, width in enumerate(estimate_column_widths(inv_df)):
+                ws_inv.set_column(col, col, max(width - COLUMN_PADDING_WIDTH, 0))
+            ws_inv.write_row(0, 0, list(inv_df.columns), formats["header"])
+            for row_index, row in enumerate(_frame_rows(inv_df), 1):
+                ws_inv.write_row(row_index, 0, row, formats["body"])
+    finally:
+        workbook.close()
+    return output.getvalue()
 
 
 @yumai_analysis_bp.route("/yumai-analysis/upload-file", methods=["POST"])
@@ -374,11 +273,9 @@ def submit_yumai_analysis():
             flash("库存报告文件不存在，将不包含库存分析。")
             fba_report_path = None
 
-        result_wb = process_yumai_data(yumai_report_path, fba_report_path)
-
-        output = io.BytesIO()
-        result_wb.save(output)
-        output.seek(0)
+        output = io.BytesIO(
+            process_yumai_data(yumai_report_path, fba_report_path, project_name)
+        )
 
         start_date_part = report_start_date.replace("-", "")
         end_date_part = report_end_date.replace("-", "")[4:]
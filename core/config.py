@@ -14,6 +14,11 @@ PATH_CONFIG = {
     'project_data': 'project'
 }
 
+# 报表解析缓存配置（每个项目目录下的缓存总大小上限）
+REPORT_CACHE_CONFIG = {
+    'max_bytes': 1024 * 1024 * 1024  # 1GB
+}
+
 # 安全配置
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
 
@@ -1,7 +1,11 @@
 from flask import Blueprint, render_template, request, jsonify
 from apps.dataset.daily_report import daily_report_bp
+from apps.dataset.weekly_report import weekly_report_bp
 from apps.dataset.monthly_report import monthly_report_bp
+from apps.dataset.monthly_batch import monthly_batch_bp
+from apps.dataset.monthly_rollup import monthly_rollup_bp
 from apps.dataset.product_analysis import product_analysis_bp
+from apps.dataset.product_batch import product_batch_bp
 from core.auth import login_required
 from core.log_service import LogService
 import pandas as pd
@@ -97,5 +101,9 @@ def timeline():
 
 # 注册子蓝图
 dataset_bp.register_blueprint(daily_report_bp, url_prefix="/daily-report")
+dataset_bp.register_blueprint(weekly_report_bp, url_prefix="/daily-report")
 dataset_bp.register_blueprint(monthly_report_bp, url_prefix="/monthly-report")
+dataset_bp.register_blueprint(monthly_batch_bp, url_prefix="/monthly-report")
+dataset_bp.register_blueprint(monthly_rollup_bp, url_prefix="/monthly-report")
 dataset_bp.register_blueprint(product_analysis_bp, url_prefix="/product-analysis")
+dataset_bp.register_blueprint(product_batch_bp, url_prefix="/product-analysis")
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+月报性能基准测试脚本
+用模拟付款报告计时月报生成的入口 process_monthly_report（内存模式，或指定
+--chunksize 时的流式模式 stream_monthly_workbook），记录进程内存峰值，并与保存的
+基准结果对比，超过阈值时标记为退化。
+
+分阶段耗时（解析、分类、汇总、写入、样式）来自同一次运行：运行前为入口调用的
+各步骤函数包上计时，不单独拼装流程，因此与线上代码走的是同一条路径。
+
+每个行数在独立子进程和独立的临时工作目录中运行，内存峰值互不影响，也不会读到
+上一次运行缓存的解析结果；模拟数据按行数和随机种子缓存。
+
+用法:
+    python scripts/benchmark/benchmark_monthly_report.py --rows 10000 100000
+    python scripts/benchmark/benchmark_monthly_report.py --rows 1000000 --chunksize 200000
+    python scripts/benchmark/benchmark_monthly_report.py --rows 10000 --save-baseline
+"""
+
+import argparse
+import collections.abc
+import functools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BENCHMARK_DIR))
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from generate_payment_report import generate_payment_report
+
+STAGES = ["parse", "classify", "aggregate", "write", "style"]
+
+# 阶段 -> process_monthly_report 调用的步骤函数（apps.dataset.monthly_report 中的名称）；
+# 未列出的部分（数据行写入、工作簿压缩输出、保存月度汇总）计入 write
+STAGE_FUNCTIONS = {
+    "parse": [
+        "load_cached_report",
+        "read_payment_report",
+        "prepare_transactions",
+        "scan_marketplaces",
+    ],
+    "classify": ["classify_transactions"],
+    "aggregate": [
+        "split_marketplaces",
+        "aggregate_transactions",
+        "select_buckets",
+        "build_summary_sheets",
+        "build_marketplace_summary",
+    ],
+    "style": ["write_report_header", "add_report_borders", "report_column_widths"],
+}
+DEFAULT_ROWS = [10000, 100000]
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+DEFAULT_DATA_DIR = os.path.join(PROJECT_ROOT, "tmp", "benchmark")
+
+# 耗时低于该秒数的阶段波动主要来自计时噪声，不判定退化
+MIN_SECONDS = 0.05
+
+
+def peak_memory_mb():
+    """当前进程的内存峰值（MB），Linux 下 ru_maxrss 单位为 KB，macOS 下为字节"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return round(peak / 1024 / 1024, 1)
+    return round(peak / 1024, 1)
+
+
+def ensure_payment_report(rows, seed, data_dir):
+    """生成（或复用已生成的）模拟付款报告"""
+    path = os.path.join(data_dir, f"payment_{rows}_{seed}.csv")
+    if not os.path.exists(path):
+        generate_payment_report(path, rows, seed)
+    return path
+
+
+def instrument_stages(module, timings, memory):
+    """
+    为模块中各阶段的步骤函数包上计时，嵌套调用只计入最外层的阶段
+
+    流式模式下 read_payment_report 返回分块迭代器，读取每块的耗时计入 parse。
+    """
+    active = []
+
+    def timed(stage, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if active:
+                return func(*args, **kwargs)
+            active.append(stage)
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                active.pop()
+                timings[stage] += time.perf_counter() - started
+                memory[stage] = peak_memory_mb()
+            if isinstance(result, collections.abc.Iterator):
+                return timed_iterator(stage, result)
+            return result
+
+        return wrapper
+
+    def timed_iterator(stage, iterator):
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                timings[stage] += time.perf_counter() - started
+                memory[stage] = peak_memory_mb()
+            yield item
+
+    for stage, names in STAGE_FUNCTIONS.items():
+        for name in names:
+            setattr(module, name, timed(stage, getattr(module, name)))
+
+
+def run_case(csv_path, mode, chunksize=None):
+    """
+    在当前进程中运行一次 process_monthly_report 并记录各阶段耗时
+
+    返回:
+        dict: 总耗时、各阶段耗时（秒）与阶段结束时的内存峰值（MB）
+    """
+    from apps.dataset import monthly_report
+
+    timings = {stage: 0.0 for stage in STAGES}
+    memory = {stage: 0.0 for stage in STAGES}
+    instrument_stages(monthly_report, timings, memory)
+
+    # 每条交易（流式模式下每块）都经过一次分桶，由此统计交易行数
+    classified = []
+    classify_transactions = monthly_report.classify_transactions
+
+    def count_rows(df, *args, **kwargs):
+        classified.append(len(df))
+        return classify_transactions(df, *args, **kwargs)
+
+    monthly_report.classify_transactions = count_rows
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # 缓存与月度汇总写入临时工作目录
+        os.chdir(workdir)
+        try:
+            started = time.perf_counter()
+            with open(csv_path, "rb") as f:
+                file_content, _ = monthly_report.process_monthly_report(
+                    "benchmark", "2025-11", f, chunksize, mode, archive=False
+                )
+            total = time.perf_counter() - started
+            # 流式模式返回工作簿文件路径
+            if isinstance(file_content, bytes):
+                output_bytes = len(file_content)
+            else:
+                output_bytes = os.path.getsize(file_content)
+        finally:
+            os.chdir(cwd)
+
+    timings["write"] = max(total - sum(timings.values()), 0.0)
+    memory["write"] = peak_memory_mb()
+
+    return {
+        "rows": sum(classified),
+        "mode": mode,
+        "chunksize": chunksize,
+        "output_bytes": output_bytes,
+        "seconds": {stage: round(timings[stage], 3) for stage in STAGES},
+        "total_seconds": round(total, 3),
+        "peak_memory_mb": memory,
+        "max_memory_mb": max(memory.values()),
+    }
+
+
+def run_case_subprocess(csv_path, mode, chunksize=None):
+    """在独立子进程中运行一次，避免前一次运行的内存峰值影响结果"""
+    command = [sys.executable, os.path.abspath(__file__), "--case", csv_path]
+    command += ["--mode", mode]
+    if chunksize:
+        command += ["--chunksize", str(chunksize)]
+    completed = subprocess.run(
+        command,
+        capture_output=True,
+        text=True,
+        cwd=PROJECT_ROOT,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"基准测试子进程失败: {completed.stderr.strip()}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare_results(results, baseline, threshold):
+    """
+    与基准结果对比
+
+    返回:
+        list: 退化项 (行数, 指标, 基准值, 当前值, 变化比例)
+    """
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get("results", {}).get(key)
+        if not base:
+            continue
+        pairs = [
+            (f"{stage} 耗时", base["seconds"].get(stage), result["seconds"][stage])
+            for stage in STAGES
+        ]
+        pairs.append(("总耗时", base.get("total_seconds"), result["total_seconds"]))
+        pairs.append(("内存峰值", base.get("max_memory_mb"), result["max_memory_mb"]))
+        for metric, old, new in pairs:
+            if not old:
+                continue
+            if metric.endswith("耗时") and new < MIN_SECONDS:
+                continue
+            change = new / old - 1
+            if change > threshold:
+                regressions.append((key, metric, old, new, change))
+    return regressions
+
+
+def print_results(results, baseline):
+    """打印各阶段耗时与内存，存在基准时附带变化比例"""
+    for key, result in results.items():
+        base = baseline.get("results", {}).get(key) if baseline else None
+        mode = result["mode"]
+        if result.get("chunksize"):
+            mode += f"，流式每块 {result['chunksize']} 行"
+        print(f"\n{result['rows']} 行 ({mode})，输出 {result['output_bytes']} 字节")
+        print(f"  {'阶段':<10}{'耗时(秒)':>10}{'内存峰值(MB)':>14}{'变化':>10}")
+        for stage in STAGES:
+            seconds = result["seconds"][stage]
+            change = ""
+            if base and base["seconds"].get(stage):
+                change = f"{seconds / base['seconds'][stage] - 1:+.0%}"
+            print(
+                f"  {stage:<10}{seconds:>10.3f}"
+                f"{result['peak_memory_mb'][stage]:>14.1f}{change:>10}"
+            )
+        change = ""
+        if base and base.get("total_seconds"):
+            change = f"{result['total_seconds'] / base['total_seconds'] - 1:+.0%}"
+        print(
+            f"  {'total':<10}{result['total_seconds']:>10.3f}"
+            f"{result['max_memory_mb']:>14.1f}{change:>10}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="月报分阶段性能基准测试")
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=DEFAULT_ROWS,
+        help="模拟付款报告行数，可指定多个，如 10000 1000000 5000000",
+    )
+    parser.add_argument("--seed", type=int, default=2025, help="随机种子")
+    parser.add_argument(
+        "--mode",
+        default="full",
+        choices=["full", "summary", "details"],
+        help="月报生成模式",
+    )
+    parser.add_argument(
+        "--chunksize", type=int, default=None, help="指定时使用流式模式，每块行数"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="每个行数运行次数，取最快一次"
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基准结果文件")
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="将本次结果保存为基准"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="判定退化的变化比例，默认 0.2"
+    )
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="模拟数据目录")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        # 子进程：运行单个用例并输出 JSON
+        result = run_case(args.case, args.mode, args.chunksize)
+        print(json.dumps(result, ensure_ascii=False))
+        return 0
+
+    results = {}
+    for rows in args.rows:
+        csv_path = ensure_payment_report(rows, args.seed, args.data_dir)
+        runs = [
+            run_case_subprocess(csv_path, args.mode, args.chunksize)
+            for _ in range(args.repeat)
+        ]
+        key = f"{rows}_{args.mode}"
+        if args.chunksize:
+            key += f"_stream{args.chunksize}"
+        results[key] = min(runs, key=lambda run: run["total_seconds"])
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        baseline = {
+            "machine": platform.platform(),
+            "python": platform.python_version(),
+            "seed": args.seed,
+            "results": {**baseline.get("results", {}), **results},
+        }
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"\n基准结果已保存: {args.baseline}")
+        return 0
+
+    if not baseline:
+        print("\n没有基准结果，使用 --save-baseline 保存本次结果作为基准")
+        return 0
+
+    regressions = compare_results(results, baseline, args.threshold)
+    if not regressions:
+        print(f"\n未发现退化（阈值 {args.threshold:.0%}）")
+        return 0
+    print(f"\n发现 {len(regressions)} 项退化（阈值 {args.threshold:.0%}）:")
+    for key, metric, old, new, change in regressions:
+        print(f"  {key} {metric}: {old} -> {new} ({change:+.0%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+付款报告（Custom Unified Transaction）模拟数据生成脚本
+按固定随机种子生成与真实报告格式一致的 CSV：前7行说明信息、全部字段加引号、
+金额带千分位分隔符，交易类型 / 描述的比例参照实际店铺月度数据，
+用于在没有客户文件的情况下测试和压测月报。
+
+用法:
+    python scripts/benchmark/generate_payment_report.py output.csv --rows 100000
+"""
+
+import argparse
+import csv
+import os
+
+import numpy as np
+
+PAYMENT_REPORT_COLUMNS = [
+    "date/time",
+    "settlement id",
+    "type",
+    "order id",
+    "sku",
+    "description",
+    "quantity",
+    "marketplace",
+    "account type",
+    "fulfillment",
+    "order city",
+    "order state",
+    "order postal",
+    "tax collection model",
+    "product sales",
+    "product sales tax",
+    "shipping credits",
+    "shipping credits tax",
+    "gift wrap credits",
+    "giftwrap credits tax",
+    "Regulatory Fee",
+    "Tax On Regulatory Fee",
+    "promotional rebates",
+    "promotional rebates tax",
+    "marketplace withheld tax",
+    "selling fees",
+    "fba fees",
+    "other transaction fees",
+    "other",
+    "total",
+]
+
+# (type, fulfillment, description, 权重)，description 为 None 时使用商品名称
+TRANSACTION_MIX = [
+    ("Order", "Amazon", None, 6200),
+    ("Order", "Seller", None, 500),
+    ("Refund", "Amazon", None, 450),
+    ("Refund", "Seller", None, 40),
+    ("Service Fee", "", "Cost of Advertising", 90),
+    ("Service Fee", "", "Subscription", 1),
+    ("Service Fee", "", "FBA Inbound Placement Service Fee", 60),
+    ("Service Fee", "", "FBA International Freight Shipping Charge", 8),
+    ("Service Fee", "", "FBA International Freight Duties and Taxes Charge", 8),
+    ("Service Fee", "", "Refund for Advertiser", 4),
+    ("Adjustment", "", "FBA Inventory Reimbursement - Customer Return", 60),
+    ("Adjustment", "", "FBA Inventory Reimbursement - Damaged:Warehouse", 20),
+    ("Adjustment", "", "FBA Inventory Reimbursement - General Adjustment", 15),
+    ("Adjustment", "", "Non-subscription Fee Adjustment", 5),
+    ("FBA Inventory Fee", "", "FBA Long-Term Storage Fee", 20),
+    ("FBA Inventory Fee", "", "FBA storage fee", 40),
+    ("FBA Inventory Fee", "", "FBA Removal Order: Disposal Fee", 10),
+    ("Amazon Fees", "", "Coupon Redemption Fee", 80),
+    ("Amazon Fees", "", "Coupon Performance Based Fee", 20),
+    ("Amazon Fees", "", "Cost of Advertising", 6),
+    ("Amazon Fees - Reversal", "", "Coupon Redemption Fee", 4),
+    ("Fee Adjustment", "", "Fee Adjustment - Weight and Dimension Change", 15),
+    ("Fee Adjustment", "", "FBA Inbound Placement Service Fee", 3),
+    ("Deal Fee", "", "Lightning Deal Fee", 10),
+    ("Debt", "", "Debt", 2),
+    ("FBA Transaction fees", "", "FBA Fulfillment Fee", 10),
+    ("Chargeback Refund", "Amazon", None, 5),
+    ("Liquidations", "", "Liquidations", 5),
+    ("FBA Customer Return Fee", "", "Apparel", 5),
+    ("", "", "Price Discount - 1234567890", 10),
+    ("", "", "Coupon Clip Fee", 3),
+    ("Transfer", "", "To account ending in: 123", 4),
+]
+
+# 带商品的交易类型，使用SKU和数量
+ITEM_TYPES = {"Order", "Refund", "Chargeback Refund", "Liquidations"}
+
+CITIES = [
+    ("NEW YORK", "NY", "10001"),
+    ("LOS ANGELES", "CA", "90001"),
+    ("HOUSTON", "TX", "77001"),
+    ("CHICAGO", "IL", "60601"),
+    ("MIAMI", "FL", "33101"),
+    ("SEATTLE", "WA", "98101"),
+]
+
+
+def format_amount(value):
+    """金额保留两位小数并加千分位分隔符，与亚马逊导出格式一致"""
+    return f"{value:,.2f}"
+
+
+def generate_rows(rows, seed=2025, sku_count=300, year=2025, month=11):
+    """
+    逐行生成交易记录
+
+    参数:
+        rows: 行数
+        seed: 随机种子，相同参数生成的文件完全一致
+        sku_count: SKU数量
+        year, month: 交易所在月份
+    """
+    rng = np.random.default_rng(seed)
+    weights = np.array([item[3] for item in TRANSACTION_MIX], dtype=float)
+    kinds = rng.choice(len(TRANSACTION_MIX), size=rows, p=weights / weights.sum())
+    skus = [f"BL-{i:04d}" for i in range(sku_count)]
+    # 商品单价与SKU绑定，销量按长尾分布集中在少数SKU
+    prices = np.round(rng.uniform(9.99, 89.99, sku_count), 2)
+    sku_index = (rng.zipf(1.3, rows) - 1) % sku_count
+    quantities = rng.choice([1, 1, 1, 1, 2, 2, 3], size=rows)
+    days = rng.integers(1, 29, rows)
+    seconds = rng.integers(0, 86400, rows)
+    fees = rng.uniform(0, 1, rows)
+    cities = rng.integers(0, len(CITIES), rows)
+    settlement_id = int(rng.integers(10**10, 10**11))
+    month_name = [
+        "Jan",
+        "Feb",
+        "Mar",
+        "Apr",
+        "May",
+        "Jun",
+        "Jul",
+        "Aug",
+        "Sep",
+        "Oct",
+        "Nov",
+        "Dec",
+    ][month - 1]
+
+    for i in range(rows):
+        kind, fulfillment, description, _ = TRANSACTION_MIX[kinds[i]]
+        second = int(seconds[i])
+        date_time = (
+            f"{month_name} {days[i]}, {year} "
+            f"{(second // 3600) % 12 or 12}:{second // 60 % 60:02d}:{second % 60:02d} "
+            f"{'AM' if second < 43200 else 'PM'} PST"
+        )
+        amounts = dict.fromkeys(PAYMENT_REPORT_COLUMNS[14:29], 0.0)
+        sku = ""
+        quantity = ""
+        order_id = ""
+        city = state = postal = tax_model = ""
+
+        if kind in ITEM_TYPES:
+            sku = skus[sku_index[i]]
+            quantity = int(quantities[i])
+            description = description or f"Believe Boy Product {sku[-4:]}"
+            order_id = f"11{i % 10}-{1000000 + i:07d}-{(i * 7919) % 10000000:07d}"
+            sales = round(prices[sku_index[i]] * quantity, 2)
+            sign = -1 if kind in ("Refund", "Chargeback Refund") else 1
+            amounts["product sales"] = sign * sales
+            amounts["product sales tax"] = round(sign * sales * 0.07, 2)
+            amounts["marketplace withheld tax"] = -amounts["product sales tax"]
+            if kind == "Liquidations":
+                amounts["other transaction fees"] = round(-sales * 0.15, 2)
+            else:
+                amounts["selling fees"] = round(-sign * sales * 0.15, 2)
+                if fulfillment == "Amazon":
+                    amounts["fba fees"] = round(
+                        -sign * (3.22 + fees[i] * 4) * quantity, 2
+                    )
+                if fees[i] < 0.1:
+                    amounts["promotional rebates"] = round(-sign * sales * 0.1, 2)
+                if fulfillment == "Seller":
+                    amounts["shipping credits"] = round(sign * 4.99, 2)
+                if kind == "Refund":
+                    amounts["other"] = round(-fees[i] * 2, 2)
+            city, state, postal = CITIES[cities[i]]
+            tax_model = "MarketplaceFacilitator"
+        else:
+            # 费用类交易金额集中在 total / other 列
+            scale = 500 if kind in ("Service Fee", "Transfer", "Debt") else 60
+            value = round(fees[i] * scale + 0.01, 2)
+            income = kind in (
+                "Adjustment",
+                "Fee Adjustment",
+                "Amazon Fees - Reversal",
+            ) and not (description.endswith("General Adjustment"))
+            amounts["other"] = value if income else -value
+
+        amounts["total"] = round(sum(amounts.values()), 2)
+        yield [
+            date_time,
+            settlement_id,
+            kind,
+            order_id,
+            sku,
+            description,
+            quantity,
+            "amazon.com",
+            "Standard Orders",
+            fulfillment,
+            city,
+            state,
+            postal,
+            tax_model,
+            *[format_amount(amounts[column]) for column in PAYMENT_REPORT_COLUMNS[14:]],
+        ]
+
+
+def generate_payment_report(path, rows, seed=2025, sku_count=300, year=2025, month=11):
+    """生成付款报告 CSV"""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write(
+            '"Includes Amazon Marketplace, Fulfillment by Amazon (FBA), and '
+            'Amazon Webstore transactions"\n'
+        )
+        f.write('"All amounts in USD, unless specified"\n')
+        for line in range(5):
+            f.write(f'"Definitions line {line + 1}"\n')
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(PAYMENT_REPORT_COLUMNS)
+        writer.writerows(generate_rows(rows, seed, sku_count, year, month))
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成模拟付款报告")
+    parser.add_argument("output", help="输出 CSV 路径")
+    parser.add_argument(
+        "--rows", type=int, default=10000, help="行数，如 10000 到 5000000"
+    )
+    parser.add_argument("--seed", type=int, default=2025, help="随机种子")
+    parser.add_argument("--skus", type=int, default=300, help="SKU数量")
+    parser.add_argument("--month", default="2025-11", help="交易月份，如 2025-11")
+    args = parser.parse_args()
+
+    year, month = (int(part) for part in args.month.split("-"))
+    generate_payment_report(args.output, args.rows, args.seed, args.skus, year, month)
+    print(f"已生成 {args.rows} 行付款报告: {args.output}")
@@ -581,7 +581,10 @@ class PageInitializers {
       e.preventDefault();
 
       const formData = new FormData(form);
-      const submitBtn = form.querySelector('button[type="submit"]');
+      // 按钮可以用 formaction 提交到其他地址（如月报的"下载明细sheet"）
+      const submitter = e.submitter;
+      const action = submitter && submitter.hasAttribute('formaction') ? submitter.formAction : form.action;
+      const submitBtn = submitter || form.querySelector('button[type="submit"]');
       const originalBtnText = submitBtn.innerHTML;
 
       if (submitBtn) {
@@ -590,7 +593,7 @@ class PageInitializers {
       }
 
       try {
-        const response = await fetch(form.action, {
+        const response = await fetch(action, {
           method: 'POST',
           body: formData
         });
@@ -627,11 +630,12 @@ class PageInitializers {
 
           notify.success(`${reportType}生成成功`);
 
-          if (this.app.components.fileUpload && typeof this.app.components.fileUpload.reset === 'function') {
+          // X-Form-Reset 为 false 时保留已上传的文件，可继续用同一份报告下载
+          const shouldResetForm = response.headers.get('X-Form-Reset');
+          if (shouldResetForm !== 'false' && this.app.components.fileUpload && typeof this.app.components.fileUpload.reset === 'function') {
             this.app.components.fileUpload.reset();
           }
 
-          const shouldResetForm = response.headers.get('X-Form-Reset');
           if (shouldResetForm === 'true') {
             this.resetFormFields(form);
             if (window.monthlyReportFormHandler && typeof window.monthlyReportFormHandler.resetForm === 'function') {
@@ -80,6 +80,12 @@ class MonthlyReportFormHandler {
         reportDateSelect.value = '';
       }
 
+      // 重置生成模式选择框
+      const reportModeSelect = document.getElementById('report_mode');
+      if (reportModeSelect) {
+        reportModeSelect.value = 'full';
+      }
+
       // 重置文件输入框
       const fileInput = this.form.querySelector('input[type="file"]');
       if (fileInput) {
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+测试列宽估算
+验证向量化估算与逐单元格、逐字符计算的结果一致
+"""
+
+import sys
+import os
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from apps.dataset.column_widths import estimate_column_widths
+
+
+def reference_widths(df):
+    """逐单元格、逐字符计算列宽"""
+    widths = []
+    for column in df.columns:
+        max_length = 0
+        for value in [column, *df[column].tolist()]:
+            if value is None or (isinstance(value, float) and np.isnan(value)):
+                continue
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)
+            length = sum(
+                2 if "\u4e00" <= char <= "\u9fff" else 1 for char in str(value)
+            )
+            max_length = max(max_length, length)
+        widths.append(max_length + 2)
+    return widths
+
+
+def test_estimate_column_widths():
+    """测试中文、整数值浮点数、空值与分类列"""
+    df = pd.DataFrame(
+        {
+            "SKU": ["A-1", "B-22", None],
+            "金额（USD）": [1200.0, -21.25, np.nan],
+            "说明": ["库存赔偿", "Widget", "混合 text"],
+            "数量": [1, 22, 333],
+            "type": pd.Categorical(["Order", "Refund", "Order"]),
+        }
+    )
+    assert estimate_column_widths(df) == reference_widths(df)
+    assert estimate_column_widths(df, min_width=8, max_width=9) == [
+        8,
+        9,
+        9,
+        8,
+        8,
+    ]
+
+
+def test_sampling():
+    """测试抽样估算"""
+    df = pd.DataFrame({"sku": [f"SKU-{i % 50:04d}" for i in range(10000)]})
+    assert estimate_column_widths(df, sample_rows=500) == reference_widths(df)
+
+
+if __name__ == "__main__":
+    test_estimate_column_widths()
+    test_sampling()
+    print("✓ 列宽估算测试通过")
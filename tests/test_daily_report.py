@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+测试日报生成
+验证路径与文件对象两种输入得到相同的日报，以及按模板版式写出的表头、样式与数据
+"""
+
+import sys
+import os
+import io
+import tempfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from openpyxl import load_workbook
+from apps.dataset.daily_report import DAILY_OVERVIEW_COLUMNS, process_daily_report
+from apps.dataset.report_template import REPORT_TEMPLATES, template_path
+
+
+def write_daily_sources(folder):
+    """写入订单、广告与FBA库存报告"""
+    sales = pd.DataFrame(
+        {
+            "order-status": ["Shipped", "Pending", "Cancelled", "Shipped"],
+            "sku": ["A", "A", "A", "B"],
+            "quantity": [1, 2, 5, 1],
+            "item-price": [10.0, 20.0, 50.0, 8.5],
+        }
+    )
+    ad = pd.DataFrame(
+        {
+            "广告SKU": ["A", "A", "C"],
+            "广告ASIN": ["B0A", "B0A", "B0C"],
+            "展示量": [100, 50, 30],
+            "点击量": [4, 2, 0],
+            "花费": [1.5, 1.0, 0.8],
+            "7天总销售量(#)": [1, 0, 0],
+        }
+    )
+    fba = pd.DataFrame({"sku": ["A", "D"], "available": [12, 3]})
+
+    paths = [os.path.join(folder, name) for name in ["sales.txt", "ad.xlsx", "fba.txt"]]
+    sales.to_csv(paths[0], sep="\t", index=False)
+    ad.to_excel(paths[1], index=False)
+    fba.to_csv(paths[2], sep="\t", index=False)
+    return paths
+
+
+def test_daily_report():
+    """测试日报内容与样式"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            paths = write_daily_sources(tmpdir)
+            content, filename = process_daily_report("项目", "2025-11-01", *paths)
+            files = [open(path, "rb") for path in paths]
+            try:
+                file_content, _ = process_daily_report("项目", "2025-11-01", *files)
+            finally:
+                for f in files:
+                    f.close()
+            assert os.path.exists(os.path.join("project", "项目", "日报", filename))
+            assert len(os.listdir(os.path.join("project", "项目", "tmp"))) >= 3
+        finally:
+            os.chdir(cwd)
+
+    assert filename == "项目_2025-11-01_日报.xlsx"
+    df = pd.read_excel(io.BytesIO(content))
+    pd.testing.assert_frame_equal(df, pd.read_excel(io.BytesIO(file_content)))
+    assert list(df.columns) == DAILY_OVERVIEW_COLUMNS
+    assert list(df["SKU"]) == ["A", "B", "C", "D"]
+    row = df.set_index("SKU").loc["A"]
+    assert row["订单量"] == 3 and row["销售额"] == 30.0
+    assert row["点击量"] == 6 and row["单次点击花费"] == 0.42
+    assert row["可售库存"] == 12
+    # 点击量为0时单次点击花费为空
+    assert pd.isna(df.set_index("SKU").loc["C", "单次点击花费"])
+
+    ws = load_workbook(io.BytesIO(content)).active
+    assert ws["A1"].font.b and not ws["B2"].font.b
+    # 表头沿用模板的边框与填充
+    template = load_workbook(template_path(REPORT_TEMPLATES["daily"])).active
+    for cell in ws[1]:
+        expected = template.cell(row=1, column=cell.column)
+        for side in ["left", "right", "top", "bottom"]:
+            assert getattr(cell.border, side).style == "thin"
+        assert cell.fill.fill_type == expected.fill.fill_type
+        if expected.fill.fill_type == "solid":
+            assert cell.fill.fgColor.rgb == expected.fill.fgColor.rgb
+    for cell in [ws["A1"], ws["E3"]]:
+        assert cell.alignment.horizontal == "center"
+        assert cell.alignment.vertical == "center"
+
+
+if __name__ == "__main__":
+    test_daily_report()
+    print("✓ 日报生成测试通过")
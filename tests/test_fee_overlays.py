@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+测试项目费用叠加
+验证按文件名关键字匹配项目、按SKU叠加费用的结果与逐行计算一致，
+以及费用表修改后重新读取
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from apps.dataset.fee_overlays import (
+    FEE_OVERLAY_FOLDER,
+    apply_fee_overlays,
+    find_fee_overlays,
+    load_fee_table,
+)
+
+
+def make_overview(skus):
+    return pd.DataFrame(
+        {
+            "SKU": skus,
+            "实际销售量": [i % 4 for i in range(len(skus))],
+            "总销售额": [100.0 + i for i in range(len(skus))],
+        }
+    )
+
+
+def test_builtin_fbm_overlay():
+    """测试宝勒FBM费用与逐行计算一致，其他项目不受影响"""
+    assert [fee_type for fee_type, _ in find_fee_overlays("宝勒1店")] == ["FBM"]
+    assert find_fee_overlays("铨富") == []
+
+    fbm = pd.read_csv(os.path.join(FEE_OVERLAY_FOLDER, "宝勒_FBM.csv"))
+    df = make_overview(list(fbm["SKU"]) + ["不在费用表"])
+    expected = df.copy()
+    mapping = dict(zip(fbm["SKU"], fbm["FBM"]))
+    for index, row in expected.iterrows():
+        expected.at[index, "总销售额"] = row["总销售额"] + row[
+            "实际销售量"
+        ] * mapping.get(row["SKU"], 0)
+
+    result = apply_fee_overlays(df.copy(), "宝勒2店")
+    pd.testing.assert_frame_equal(result, expected)
+    assert result["总销售额"].iloc[-1] == df["总销售额"].iloc[-1]
+    pd.testing.assert_frame_equal(apply_fee_overlays(df.copy(), "铨富"), df)
+
+
+def test_custom_overlay_reload():
+    """测试任意项目的费用表及修改后重新读取"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "玥涵_FBM.csv")
+        pd.DataFrame({"SKU": ["A", "B"], "FBM": [2.5, 1.0]}).to_csv(path, index=False)
+        df = make_overview(["A", "B", "C"])
+
+        result = apply_fee_overlays(df.copy(), "玥涵", tmpdir)
+        assert result["总销售额"].tolist() == [100.0, 102.0, 102.0]
+        assert load_fee_table(path, "FBM") is load_fee_table(path, "FBM")
+
+        pd.DataFrame({"SKU": ["A", "B"], "FBM": [2.5, 3.0]}).to_csv(path, index=False)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        result = apply_fee_overlays(df.copy(), "玥涵", tmpdir)
+        assert result["总销售额"].tolist() == [100.0, 104.0, 102.0]
+
+
+if __name__ == "__main__":
+    test_builtin_fbm_overlay()
+    test_custom_overlay_reload()
+    print("✓ 项目费用叠加测试通过")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+测试库存库龄
+验证库存详情按SKU合并本周销量、列顺序与汇总行，缺少库龄列时照常生成，
+以及同一份库存报告按内容缓存解析结果
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from apps.dataset.inventory_aging import (
+    INVENTORY_DETAIL_COLUMNS,
+    INVENTORY_SUMMARY_SKU,
+    build_inventory_detail,
+    load_inventory,
+)
+from apps.dataset.report_cache import get_cache_folder
+
+
+def write_inventory(path):
+    """写入FBA库存报告，包含不需要的列"""
+    pd.DataFrame(
+        {
+            "snapshot-date": "2025-11-01",
+            "sku": ["A", "B", "C"],
+            "asin": ["B0A", "B0B", "B0C"],
+            "available": [10, 0, 5],
+            "inv-age-0-to-90-days": [8, 0, 5],
+            "inv-age-91-to-180-days": [2, 0, 0],
+            "inv-age-181-to-270-days": [0, 1, 0],
+            "inv-age-271-to-365-days": 0,
+            "inv-age-365-plus-days": [0, 3, 0],
+            "recommended-action": ["No action", "Create removal order", "No action"],
+        }
+    ).to_csv(path, sep="\t", index=False)
+
+
+def test_inventory_detail():
+    """测试本周销量合并与汇总行"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "fba.txt")
+        write_inventory(path)
+        inventory = load_inventory(path)
+
+    sales = pd.DataFrame({"SKU": ["A", "C", "D"], "销量": [3, None, 7]})
+    detail = build_inventory_detail(inventory, sales, "销量")
+    assert list(detail.columns) == INVENTORY_DETAIL_COLUMNS
+    assert detail["SKU"].tolist() == ["A", "B", "C", INVENTORY_SUMMARY_SKU]
+    assert detail["本周销量"].tolist() == [3, 0, 0, 3]
+
+    summary = detail.iloc[-1]
+    assert summary["可售库存"] == 15 and summary["365+天"] == 3
+    assert summary["ASIN"] == "" and summary["库存建议"] == ""
+
+    # 缺少库龄列时只汇总已有的列
+    partial = inventory[["SKU", "可售库存"]]
+    detail = build_inventory_detail(partial, sales, "销量")
+    assert list(detail.columns) == ["SKU", "本周销量", "可售库存"]
+    assert detail.iloc[-1].tolist() == [INVENTORY_SUMMARY_SKU, 3, 15]
+
+
+def test_cached_by_content():
+    """测试同一份库存报告在同一项目下只解析一次"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            path = os.path.join(tmpdir, "fba.txt")
+            write_inventory(path)
+            first = load_inventory(path, "项目")
+            cache_files = os.listdir(get_cache_folder("项目"))
+            assert len(cache_files) == 1
+            assert cache_files[0].startswith("inventory_aging-")
+
+            # 内容相同的另一份文件直接读取缓存
+            copy_path = os.path.join(tmpdir, "fba_copy.txt")
+            shutil.copy(path, copy_path)
+            second = load_inventory(copy_path, "项目")
+            assert os.listdir(get_cache_folder("项目")) == cache_files
+            pd.testing.assert_frame_equal(first, second)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_inventory_detail()
+    test_cached_by_content()
+    print("✓ 库存库龄测试通过")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+测试多站点月报
+验证按 marketplace 拆分站点后，各站点的sheet与单独处理该站点交易的结果一致，
+流式模式与内存模式一致
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from apps.dataset.marketplaces import detect_marketplaces, assign_marketplaces
+from apps.dataset.monthly_report import (
+    read_payment_report,
+    prepare_transactions,
+    write_monthly_workbook,
+    stream_monthly_workbook,
+    REPORT_MODE_SUMMARY,
+)
+
+HEADER = (
+    '"date/time","type","order id","sku","description","quantity","marketplace",'
+    '"fulfillment","product sales","shipping credits","gift wrap credits",'
+    '"promotional rebates","selling fees","fba fees","other transaction fees",'
+    '"other","total"'
+)
+
+US_ROWS = [
+    '"Nov 1","Order","1","A","Widget","1","amazon.com","Amazon","100","0","0","0","-15","-5","0","0","80.00"',
+    '"Nov 1","Order","2","B","Widget","2","amazon.com","Seller","30","0","0","0","-4.5","0","0","0","25.50"',
+    '"Nov 2","Refund","1","A","Widget","1","amazon.com","Amazon","-20","0","0","0","3","0","0","-1","-18.00"',
+    '"Nov 2","Service Fee","","","Cost of Advertising","","amazon.com","","0","0","0","0","0","0","0","0","-30.00"',
+]
+# marketplace 为空的账户级交易归入主站点
+BLANK_ROWS = [
+    '"Nov 4","Debt","","","Debt","","","","0","0","0","0","0","0","0","0","-9.99"',
+]
+DE_ROWS = [
+    '"Nov 3","Order","3","A","Widget","3","amazon.de","Amazon","60","0","0","0","-9","-16.5","0","0","34.50"',
+    '"Nov 3","Order","4","C","Widget","1","amazon.de","Amazon","15","0","0","0","-2.25","-4","0","0","8.75"',
+    '"Nov 4","Service Fee","","","Cost of Advertising","","amazon.de","","0","0","0","0","0","0","0","0","-12.00"',
+]
+
+
+def write_rows(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(7):
+            f.write(f'"说明 {i}"\n')
+        f.write(HEADER + "\n")
+        f.write("\n".join(rows) + "\n")
+
+
+def test_detect_marketplaces():
+    """测试站点识别与交易归属"""
+    df = pd.DataFrame(
+        {"marketplace": ["amazon.de", "amazon.com", "amazon.com", 0, "Non-Amazon"]}
+    )
+    marketplaces = detect_marketplaces(df["marketplace"])
+    assert marketplaces == ["amazon.com", "amazon.de"]
+    assigned = assign_marketplaces(df, marketplaces)
+    assert list(assigned) == ["amazon.de"] + ["amazon.com"] * 4
+    assert detect_marketplaces(None) == ["amazon.com"]
+
+
+def test_sites_match_single_site_reports():
+    """测试各站点的sheet与单独处理该站点交易一致"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = {}
+        for name, rows in [
+            ("all", US_ROWS[:2] + DE_ROWS + US_ROWS[2:] + BLANK_ROWS),
+            ("us", US_ROWS + BLANK_ROWS),
+            ("de", DE_ROWS),
+        ]:
+            paths[name] = os.path.join(tmpdir, f"{name}.csv")
+            write_rows(paths[name], rows)
+
+        sheets = {}
+        for name, path in paths.items():
+            workbook_path = os.path.join(tmpdir, f"{name}.xlsx")
+            aggregates = write_monthly_workbook(
+                prepare_transactions(read_payment_report(path)), workbook_path
+            )
+            sheets[name] = pd.read_excel(workbook_path, sheet_name=None)
+        assert list(aggregates) == ["amazon.de"]
+        assert "In金额（EUR）" in sheets["de"]["报表核算"].columns
+
+        combined = sheets["all"]
+        assert list(combined)[0] == "站点汇总"
+        for site, name in [("美国站", "us"), ("德国站", "de")]:
+            for sheet_name, df in sheets[name].items():
+                pd.testing.assert_frame_equal(
+                    combined[f"{site}-{sheet_name}"].reset_index(drop=True), df
+                )
+
+        summary = combined["站点汇总"]
+        assert list(summary["marketplace"]) == ["amazon.com", "amazon.de"]
+        assert list(summary["币种"]) == ["USD", "EUR"]
+        assert list(summary["交易行数"]) == [5, 3]
+        assert summary.loc[1, "亚马逊回款金额"] == round(
+            sheets["de"]["总览草稿"].loc[0, "亚马逊回款金额"], 2
+        )
+
+
+def test_streaming_multi_marketplace():
+    """测试多站点流式模式与内存模式一致"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = os.path.join(tmpdir, "payment.csv")
+        write_rows(csv_path, US_ROWS + DE_ROWS + BLANK_ROWS)
+        PRR = prepare_transactions(read_payment_report(csv_path))
+
+        for mode in ["full", REPORT_MODE_SUMMARY]:
+            memory_path = os.path.join(tmpdir, f"memory_{mode}.xlsx")
+            stream_path = os.path.join(tmpdir, f"stream_{mode}.xlsx")
+            aggregates = write_monthly_workbook(PRR.copy(), memory_path, mode)
+            with open(csv_path, "rb") as f:
+                s_aggregates = stream_monthly_workbook(
+                    f, stream_path, chunksize=2, tmpdir=tmpdir, mode=mode
+                )
+            assert list(aggregates) == list(s_aggregates)
+            for marketplace in aggregates:
+                pd.testing.assert_frame_equal(
+                    aggregates[marketplace][0], s_aggregates[marketplace][0]
+                )
+
+            memory_sheets = pd.read_excel(memory_path, sheet_name=None)
+            stream_sheets = pd.read_excel(stream_path, sheet_name=None)
+            assert list(memory_sheets) == list(stream_sheets)
+            for sheet_name in ["站点汇总", "德国站-报表核算", "美国站-销售SKU明细"]:
+                pd.testing.assert_frame_equal(
+                    memory_sheets[sheet_name], stream_sheets[sheet_name]
+                )
+
+
+if __name__ == "__main__":
+    test_detect_marketplaces()
+    test_sites_match_single_site_reports()
+    test_streaming_multi_marketplace()
+    print("✓ 多站点月报测试通过")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+测试产品基础信息缓存
+验证按项目取出的基础信息与读取整张表后过滤一致，返回副本互不影响，
+以及基础信息表修改后重新读取
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from apps.dataset.master_data import BASIC_INFO_PATH, get_project_products
+
+
+def test_project_products():
+    """测试按项目取出的基础信息与过滤整张表一致"""
+    df = pd.read_csv(BASIC_INFO_PATH, encoding="utf-8")
+    for project_name in df["project_name"].unique():
+        expected = df[df["project_name"] == project_name].reset_index(drop=True)
+        pd.testing.assert_frame_equal(get_project_products(project_name), expected)
+
+    products = get_project_products(df["project_name"].iloc[0])
+    products["头程单价"] = -1
+    assert (get_project_products(df["project_name"].iloc[0])["头程单价"] != -1).all()
+
+    missing = get_project_products("不存在的项目")
+    assert missing.empty and list(missing.columns) == list(df.columns)
+
+
+def test_reload_after_change():
+    """测试基础信息表修改后重新读取"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "basic_info.csv")
+        columns = ["project_name", "SKU", "ASIN", "头程单价", "FOB单价"]
+        pd.DataFrame([["玥涵", "A", "B0A", 1.5, 3.0]], columns=columns).to_csv(
+            path, index=False
+        )
+        assert get_project_products("玥涵", path)["SKU"].tolist() == ["A"]
+
+        pd.DataFrame(
+            [["玥涵", "A", "B0A", 1.5, 3.0], ["玥涵", "B", "B0B", 2.0, 4.0]],
+            columns=columns,
+        ).to_csv(path, index=False)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert get_project_products("玥涵", path)["SKU"].tolist() == ["A", "B"]
+
+
+if __name__ == "__main__":
+    test_project_products()
+    test_reload_after_change()
+    print("✓ 产品基础信息缓存测试通过")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+测试月报批量生成
+验证进程池生成的工作簿、失败任务记录与 zip 清单
+"""
+
+import sys
+import os
+import tempfile
+import zipfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from apps.dataset.monthly_batch import (
+    MANIFEST_NAME,
+    run_monthly_batch,
+    write_batch_archive,
+)
+from test_monthly_streaming import write_payment_csv
+
+
+def test_monthly_batch():
+    """测试批量生成与清单"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            csv_path = os.path.join(tmpdir, "payment.csv")
+            write_payment_csv(csv_path)
+            bad_path = os.path.join(tmpdir, "bad.csv")
+            with open(bad_path, "w", encoding="utf-8") as f:
+                f.write("")
+
+            jobs = [
+                {
+                    "project_name": "项目A",
+                    "report_date": "2025-11",
+                    "payment_report_path": csv_path,
+                    "mode": "summary",
+                },
+                {
+                    "project_name": "项目B",
+                    "report_date": "2025-11",
+                    "payment_report_path": bad_path,
+                },
+                {
+                    "project_name": "项目C",
+                    "report_date": "2025-11",
+                    "payment_report_path": csv_path,
+                },
+            ]
+            output_folder = os.path.join(tmpdir, "output")
+            manifest = run_monthly_batch(jobs, output_folder, max_workers=2)
+
+            assert list(manifest["项目名称"]) == ["项目A", "项目B", "项目C"]
+            assert list(manifest["状态"]) == ["success", "failed", "success"]
+            assert manifest["错误"].iloc[1]
+
+            archive = os.path.join(tmpdir, "batch.zip")
+            write_batch_archive(manifest, output_folder, archive)
+            with zipfile.ZipFile(archive) as zf:
+                names = zf.namelist()
+            assert names == [
+                "001_月度财务报表_项目A_美国站_2025-11_汇总.xlsx",
+                "003_月度财务报表_项目C_美国站_2025-11.xlsx",
+                MANIFEST_NAME,
+            ]
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_monthly_batch()
+    print("✓ 月报批量生成测试通过")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+测试季度 / 年度汇总
+验证合并已保存的月份汇总与直接处理全部交易的结果一致
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from apps.dataset.monthly_report import process_monthly_report, build_summary_sheets
+from apps.dataset.monthly_rollup import build_rollup_sheets
+from apps.dataset.monthly_store import load_month_aggregates, period_months
+from test_monthly_streaming import HEADER, ROWS
+
+
+def write_rows(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(7):
+            f.write(f'"说明 {i}"\n')
+        f.write(HEADER + "\n")
+        f.write("\n".join(rows) + "\n")
+
+
+def test_period_months():
+    """测试汇总周期解析"""
+    assert period_months("2025-Q4") == ["2025-10", "2025-11", "2025-12"]
+    assert len(period_months("2025")) == 12
+    assert period_months("2025-11") == ["2025-11"]
+
+
+def test_rollup_matches_full_report():
+    """测试季度汇总与一次处理全部交易一致"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            paths = {}
+            for name, rows in [
+                ("2025-10", ROWS[:4]),
+                ("2025-11", ROWS[4:]),
+                ("all", ROWS),
+            ]:
+                paths[name] = os.path.join(tmpdir, f"{name}.csv")
+                write_rows(paths[name], rows)
+                with open(paths[name], "rb") as f:
+                    process_monthly_report(
+                        "项目", name, f, mode="summary", archive=False
+                    )
+
+            sheets = build_rollup_sheets("项目", "2025-Q4")
+            expected = build_summary_sheets(*load_month_aggregates("项目", "all"))
+            for sheet_name in ["总览草稿", "报表核算"]:
+                pd.testing.assert_frame_equal(sheets[sheet_name], expected[sheet_name])
+            for sheet_name in ["销售SKU明细", "退款SKU明细"]:
+                pd.testing.assert_frame_equal(
+                    sheets[sheet_name].sort_values("sku").reset_index(drop=True),
+                    expected[sheet_name].sort_values("sku").reset_index(drop=True),
+                )
+            assert list(sheets["各月汇总"]["状态"]) == ["已汇总", "已汇总", "未生成"]
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_period_months()
+    test_rollup_matches_full_report()
+    print("✓ 季度 / 年度汇总测试通过")
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+测试月报流式模式与生成模式
+验证按块读取得到的合计、SKU汇总与工作簿内容与内存模式一致，
+仅汇总 / 仅明细模式的sheet与完整报表一致，明细超过 Excel 行数上限时报错，
+流式模式的工作簿写入文件并移动到月报目录，以及只有完整月报通知前端重置表单
+"""
+
+import sys
+import os
+import io
+import tempfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from flask import Flask
+from apps.dataset import monthly_report
+from apps.dataset.monthly_report import (
+    monthly_report_bp,
+    process_monthly_report,
+    read_payment_report,
+    prepare_transactions,
+    write_monthly_workbook,
+    stream_monthly_workbook,
+    report_sheet_order,
+    REPORT_MODE_SUMMARY,
+    REPORT_MODE_DETAILS,
+    REPORT_MODE_FULL,
+)
+
+HEADER = (
+    '"date/time","type","order id","sku","description","quantity","fulfillment",'
+    '"product sales","shipping credits","gift wrap credits","promotional rebates",'
+    '"selling fees","fba fees","other transaction fees","other","total"'
+)
+
+ROWS = [
+    '"Nov 1","Order","1","A","Widget","1","Amazon","1,200.50","5","0","-1","-180","-5.5","0","0","1,019.00"',
+    '"Nov 1","Order","2","B","Widget","2","Seller","30","0","0","0","-4.5","0","0","0","25.50"',
+    '"Nov 2","Refund","1","A","Widget","1","Amazon","-20","0","0","0","3","0","0","-1.25","-18.25"',
+    '"Nov 2","Service Fee","","","Cost of Advertising","","","0","0","0","0","0","0","0","0","-30.00"',
+    '"Nov 3","Adjustment","","A","FBA Inventory Reimbursement - Customer Return","1","","0","0","0","0","0","0","0","12","12.00"',
+    '"Nov 3","Order","3","A","Widget","3","Amazon","60","0","0","0","-9","-16.5","0","0","34.50"',
+    '"Nov 4","","","","Price Discount - 1","","","0","0","0","0","0","0","0","0","-2.00"',
+    '"Nov 4","Debt","","","Debt","","","0","0","0","0","0","0","0","0","-9.99"',
+    '"Nov 5","Order","4","C","Widget","1","Amazon","15","0","0","0","-2.25","-4","0","0","8.75"',
+]
+
+
+def write_payment_csv(path):
+    """写入带7行说明信息的付款报告"""
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(7):
+            f.write(f'"说明 {i}"\n')
+        f.write(HEADER + "\n")
+        f.write("\n".join(ROWS) + "\n")
+
+
+def test_streaming_matches_in_memory():
+    """测试流式模式与内存模式结果一致"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = os.path.join(tmpdir, "payment.csv")
+        write_payment_csv(csv_path)
+
+        memory_path = os.path.join(tmpdir, "memory.xlsx")
+        stream_path = os.path.join(tmpdir, "stream.xlsx")
+        PRR = prepare_transactions(read_payment_report(csv_path))
+        aggregates = write_monthly_workbook(PRR, memory_path)
+        s_aggregates = stream_monthly_workbook(
+            csv_path, stream_path, chunksize=2, tmpdir=tmpdir
+        )
+        assert list(aggregates) == list(s_aggregates) == ["amazon.com"]
+        totals, order_skus, refund_skus = aggregates["amazon.com"]
+        s_totals, s_order_skus, s_refund_skus = s_aggregates["amazon.com"]
+
+        pd.testing.assert_frame_equal(totals, s_totals)
+        pd.testing.assert_frame_equal(order_skus, s_order_skus)
+        pd.testing.assert_frame_equal(refund_skus, s_refund_skus)
+
+        memory_sheets = pd.read_excel(memory_path, sheet_name=None)
+        stream_sheets = pd.read_excel(stream_path, sheet_name=None)
+        assert list(memory_sheets) == list(stream_sheets)
+        for sheet_name in ["总览草稿", "报表核算", "销售SKU明细", "所有订单"]:
+            pd.testing.assert_frame_equal(
+                memory_sheets[sheet_name], stream_sheets[sheet_name]
+            )
+
+
+def test_summary_and_details_modes():
+    """测试仅汇总与仅明细模式"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = os.path.join(tmpdir, "payment.csv")
+        write_payment_csv(csv_path)
+        PRR = prepare_transactions(read_payment_report(csv_path))
+
+        full_path = os.path.join(tmpdir, "full.xlsx")
+        write_monthly_workbook(PRR.copy(), full_path)
+        full_sheets = pd.read_excel(full_path, sheet_name=None)
+
+        for mode in [REPORT_MODE_SUMMARY, REPORT_MODE_DETAILS]:
+            for chunksize in [None, 2]:
+                path = os.path.join(tmpdir, f"{mode}_{chunksize}.xlsx")
+                if chunksize:
+                    stream_monthly_workbook(
+                        csv_path, path, chunksize=chunksize, tmpdir=tmpdir, mode=mode
+                    )
+                else:
+                    write_monthly_workbook(PRR.copy(), path, mode)
+                sheets = pd.read_excel(path, sheet_name=None)
+                assert list(sheets) == report_sheet_order(mode)
+                for sheet_name, df in sheets.items():
+                    pd.testing.assert_frame_equal(df, full_sheets[sheet_name])
+
+
+def test_sheet_row_limit():
+    """测试明细超过 Excel 行数上限时报错，仅汇总模式不受影响"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = os.path.join(tmpdir, "payment.csv")
+        with open(csv_path, "w", encoding="utf-8") as f:
+            for i in range(7):
+                f.write(f'"说明 {i}"\n')
+            f.write(HEADER + "\n")
+            f.write("\n".join(ROWS * 20) + "\n")
+        # 上限高于汇总sheet的行数，低于交易一览的行数
+        max_rows = monthly_report.EXCEL_MAX_ROWS
+        monthly_report.EXCEL_MAX_ROWS = len(ROWS) * 10
+        try:
+            path = os.path.join(tmpdir, "full.xlsx")
+            try:
+                stream_monthly_workbook(csv_path, path, chunksize=2, tmpdir=tmpdir)
+                assert False, "超过行数上限应报错"
+            except ValueError as e:
+                assert "交易一览" in str(e)
+
+            path = os.path.join(tmpdir, "summary.xlsx")
+            stream_monthly_workbook(
+                csv_path, path, chunksize=2, tmpdir=tmpdir, mode=REPORT_MODE_SUMMARY
+            )
+            assert list(pd.read_excel(path, sheet_name=None)) == report_sheet_order(
+                REPORT_MODE_SUMMARY
+            )
+        finally:
+            monthly_report.EXCEL_MAX_ROWS = max_rows
+
+
+def test_streaming_report_file():
+    """测试流式模式返回已归档的工作簿文件，内容与内存模式一致"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            csv_path = os.path.join(tmpdir, "payment.csv")
+            write_payment_csv(csv_path)
+            with open(csv_path, "rb") as f:
+                content, filename = process_monthly_report(
+                    "项目", "2025-11", f, archive=False
+                )
+            with open(csv_path, "rb") as f:
+                path, s_filename = process_monthly_report("项目", "2025-11", f, 2)
+            assert s_filename == filename
+            assert os.path.dirname(path) == os.path.join(
+                tmpdir, "project", "项目", "月报"
+            )
+            tmp_folder = os.path.join(tmpdir, "project", "项目", "tmp")
+            assert not [name for name in os.listdir(tmp_folder) if ".xlsx" in name]
+
+            expected = pd.read_excel(io.BytesIO(content), sheet_name=None)
+            sheets = pd.read_excel(path, sheet_name=None)
+            assert list(sheets) == list(expected)
+            for sheet_name in ["总览草稿", "报表核算", "交易一览"]:
+                pd.testing.assert_frame_equal(sheets[sheet_name], expected[sheet_name])
+
+            # 生成失败时不留下未完成的工作簿
+            max_rows = monthly_report.EXCEL_MAX_ROWS
+            monthly_report.EXCEL_MAX_ROWS = 2
+            try:
+                with open(csv_path, "rb") as f:
+                    process_monthly_report("项目", "2025-11", f, 2)
+                assert False, "超过行数上限应报错"
+            except ValueError:
+                pass
+            finally:
+                monthly_report.EXCEL_MAX_ROWS = max_rows
+            assert not [name for name in os.listdir(tmp_folder) if ".xlsx" in name]
+        finally:
+            os.chdir(cwd)
+
+
+def test_form_reset_by_mode():
+    """测试仅汇总 / 仅明细下载后保留付款报告，完整月报下载后重置表单"""
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(monthly_report_bp)
+    client = app.test_client()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            csv_path = os.path.join(tmpdir, "payment.csv")
+            write_payment_csv(csv_path)
+            form = {
+                "project_name": "项目",
+                "report_date": "2025-11",
+                "payment_report_path": csv_path,
+            }
+            # (地址, 附加表单字段, 生成模式, X-Form-Reset)
+            cases = [
+                (
+                    "/monthly-report",
+                    {"report_mode": REPORT_MODE_SUMMARY},
+                    REPORT_MODE_SUMMARY,
+                    "false",
+                ),
+                ("/monthly-report/details", {}, REPORT_MODE_DETAILS, "false"),
+                ("/monthly-report", {}, REPORT_MODE_FULL, "true"),
+            ]
+            for url, extra, mode, reset in cases:
+                response = client.post(url, data={**form, **extra})
+                assert response.status_code == 200
+                assert response.headers["X-Form-Reset"] == reset
+                sheets = pd.read_excel(io.BytesIO(response.data), sheet_name=None)
+                assert list(sheets) == report_sheet_order(mode)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_streaming_matches_in_memory()
+    test_summary_and_details_modes()
+    test_sheet_row_limit()
+    test_streaming_report_file()
+    test_form_reset_by_mode()
+    print("✓ 月报流式模式测试通过")
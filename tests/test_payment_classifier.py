@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+测试付款报告交易分类
+验证分桶结果与原来按 type / fulfillment / description 逐层筛选的结果一致
+"""
+
+import sys
+import os
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from apps.dataset.payment_classifier import (
+    ORDER_BUCKETS,
+    classify_transactions,
+    bucket_totals,
+    bucket_positions,
+    select_buckets,
+    sum_buckets,
+)
+
+
+def make_transactions():
+    """构造覆盖各类交易的小样本"""
+    rows = [
+        ("Order", "Amazon", "Widget", 10.5),
+        ("Order", "Seller", "Widget", 20.25),
+        ("Refund", "Amazon", "Widget", -3.0),
+        ("Adjustment", 0, "FBA Inventory Reimbursement - Customer Return", 4.0),
+        ("Adjustment", 0, "FBA Inventory Reimbursement - General Adjustment", -1.0),
+        ("Service Fee", 0, "Cost of Advertising", -7.5),
+        ("Service Fee", 0, "FBA International Freight Shipping Charge", -2.0),
+        ("Service Fee", 0, "Subscription", -39.99),
+        ("Amazon Fees", 0, "Coupon Redemption Fee", -0.6),
+        (0, 0, "Price Discount - 123", -1.1),
+        (0, 0, 0, -5.0),
+        ("Transfer", 0, "To account", 100.0),
+    ]
+    df = pd.DataFrame(rows, columns=["type", "fulfillment", "description", "total"])
+    df["quantity"] = 1
+    return df
+
+
+def test_classify_transactions():
+    """测试分桶标签"""
+    df = make_transactions()
+    bucket = classify_transactions(df)
+
+    assert list(bucket) == [
+        "order_fba",
+        "order_fbm",
+        "refund_fba",
+        "adjustment_income",
+        "adjustment_expense",
+        "service_advertising",
+        "service_agl",
+        "service_other",
+        "amazon_fees",
+        "blank_price_discount",
+        "blank_other",
+        "other",
+    ]
+
+
+def test_bucket_totals_and_details():
+    """测试分桶合计与明细行与原筛选方式一致"""
+    df = make_transactions()
+    bucket = classify_transactions(df)
+    totals = bucket_totals(df, bucket, ["quantity", "total"])
+    positions = bucket_positions(bucket)
+
+    order = df.loc[df["type"].isin(["Order"])]
+    pd.testing.assert_frame_equal(select_buckets(df, positions, ORDER_BUCKETS), order)
+    assert sum_buckets(totals, "total", ORDER_BUCKETS) == round(order["total"].sum(), 2)
+    # 空分桶合计为 0，明细为空表
+    assert sum_buckets(totals, "total", ["debt"]) == 0
+    assert select_buckets(df, positions, ["debt"]).empty
+
+
+if __name__ == "__main__":
+    test_classify_transactions()
+    test_bucket_totals_and_details()
+    print("✓ 付款报告交易分类测试通过")
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+测试付款报告读取模式
+验证紧凑类型读取的取值与默认类型读取一致
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from apps.dataset.payment_schema import (
+    SKU_ANALYSIS_COLUMNS,
+    read_payment_report,
+    fill_missing,
+)
+from test_monthly_streaming import write_payment_csv
+
+
+def test_compact_matches_default():
+    """测试紧凑类型与默认类型填充空值后取值一致"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = os.path.join(tmpdir, "payment.csv")
+        write_payment_csv(csv_path)
+
+        default = read_payment_report(csv_path, compact=False).fillna(0)
+        compact = fill_missing(read_payment_report(csv_path))
+
+        assert isinstance(compact["type"].dtype, pd.CategoricalDtype)
+        assert compact["product sales"].iloc[0] == 1200.5
+        pd.testing.assert_frame_equal(
+            default, compact.astype(object), check_dtype=False
+        )
+
+        # 只读取需要的列，报告中不存在的列被忽略
+        pruned = read_payment_report(
+            csv_path, usecols=SKU_ANALYSIS_COLUMNS + ["不存在的列"]
+        )
+        assert list(pruned.columns) == [
+            column for column in default.columns if column in SKU_ANALYSIS_COLUMNS
+        ]
+
+
+if __name__ == "__main__":
+    test_compact_matches_default()
+    print("✓ 付款报告读取模式测试通过")
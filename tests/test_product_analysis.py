@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+测试产品分析报表写出
+验证按模板写出的表头样式、百分比与金额列格式、汇总行加粗，库存详情sheet，
+以及生成报表时保存的文件与返回内容一致、库存详情的本周销量取自产品分析数据
+"""
+
+import sys
+import os
+import io
+import tempfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from openpyxl import load_workbook
+from apps.dataset.master_data import get_project_products
+from apps.dataset.product_analysis import (
+    process_product_analysis,
+    write_product_analysis,
+)
+from apps.dataset.report_template import get_template_layout
+
+PROJECT_NAME = "玥涵"
+
+
+def make_overview(rows=3):
+    """按模板列构造产品分析数据，最后一行为汇总行"""
+    columns = get_template_layout("product_analysis")["columns"]
+    df = pd.DataFrame(
+        {column: [float(i) + 0.125 for i in range(rows)] for column in columns}
+    )
+    df["日期"] = "20251101-1107"
+    df["SKU"] = [f"SKU-{i}" for i in range(rows - 1)] + ["汇总"]
+    df["ASIN"] = [f"B0{i}" for i in range(rows - 1)] + ["汇总"]
+    return df
+
+
+def test_product_analysis_sheet():
+    """测试产品分析sheet的表头样式与列格式"""
+    df = make_overview()
+    output = io.BytesIO()
+    write_product_analysis(df, None, output)
+
+    wb = load_workbook(output)
+    assert wb.sheetnames == ["产品分析"]
+    ws = wb["产品分析"]
+    assert [cell.value for cell in ws[1]] == list(df.columns)
+
+    # 表头沿用模板的字体与填充，主题颜色换算为 RGB
+    assert ws["A1"].font.b and ws["A1"].fill.fill_type is None
+    assert ws["E1"].fill.fgColor.rgb == "FF95B3D7"
+    assert ws["AK1"].fill.fgColor.rgb == "FF0070C0"
+    assert ws["AK1"].font.color.rgb == "FFFFFFFF"
+
+    columns = list(df.columns)
+    row = ws[2]
+    assert row[columns.index("ACOS")].number_format == "0.00%"
+    assert row[columns.index("利润")].number_format == "0.00"
+    assert row[columns.index("总销量")].number_format == "General"
+    assert row[columns.index("利润")].value == 0.125
+    for cell in [ws["A1"], ws["B2"]]:
+        assert cell.alignment.horizontal == "center"
+        assert cell.border.left.style == "thin"
+
+    # 只有汇总行加粗
+    assert not any(cell.font.b for cell in ws[2])
+    assert all(cell.font.b for cell in ws[ws.max_row])
+    assert ws.cell(row=ws.max_row, column=2).value == "汇总"
+
+
+def test_inventory_sheet():
+    """测试库存详情sheet与产品分析sheet一次写出"""
+    inv_df = pd.DataFrame(
+        {
+            "SKU": ["SKU-0", "SKU-9", "汇总行"],
+            "本周销量": [1.0, 0.0, 1.0],
+            "可售库存": [5, 3, 8],
+            "库存建议": ["No action", "Create removal order", ""],
+        }
+    )
+    output = io.BytesIO()
+    write_product_analysis(make_overview(), inv_df, output)
+
+    ws = load_workbook(output)["库存详情"]
+    assert [cell.value for cell in ws[1]] == list(inv_df.columns)
+    assert [cell.value for cell in ws["A"]][1:] == list(inv_df["SKU"])
+    assert ws["A1"].font.b and not ws["A2"].font.b and ws["A4"].font.b
+    assert ws.column_dimensions["D"].width > ws.column_dimensions["C"].width
+
+
+def write_product_sources(folder, project_name=PROJECT_NAME):
+    """写入项目的业务报告、付款报告、广告产品报告与FBA库存报告"""
+    products = get_project_products(project_name)
+    skus, asins = list(products["SKU"]), list(products["ASIN"])
+    business = pd.DataFrame(
+        {
+            "（子）ASIN": asins,
+            "页面浏览量 - 总计 ": [f"{1000 + i * 10:,}" for i in range(len(asins))],
+            "已订购商品数量": [i % 5 for i in range(len(asins))],
+            "会话数 - 总计": [f"{500 + i:,}" for i in range(len(asins))],
+            "已订购商品销售额": [f"US${1200.5 + i:,.2f}" for i in range(len(asins))],
+        }
+    )
+    payment = pd.DataFrame(
+        {
+            "date/time": "Nov 1, 2025",
+            "type": ["Order", "Order", "Refund", "Service Fee"],
+            "sku": [skus[0], skus[1], skus[0], ""],
+            "quantity": [2, 1, 1, 0],
+            "product sales": [40.0, 25.5, -20.0, 0],
+            "shipping credits": 0,
+            "promotional rebates": [-2.0, 0, 0, 0],
+            "selling fees": [-6.0, -3.8, 3.0, 0],
+            "fba fees": [-8.5, -4.2, 0, 0],
+            "other": [0, 0, -1.0, -39.99],
+        }
+    )
+    ad = pd.DataFrame(
+        {
+            "广告SKU": [skus[0], skus[0], skus[1]],
+            "广告ASIN": [asins[0], asins[0], asins[1]],
+            "展示量": [1000, 500, 300],
+            "点击量": [20, 10, 0],
+            "花费": [12.5, 6.0, 0.0],
+            "7天总销售额": [40.0, 0.0, 0.0],
+            "7天总销售量(#)": [2, 0, 0],
+        }
+    )
+    fba = pd.DataFrame(
+        {
+            "sku": skus[:3] + ["不在基础信息"],
+            "asin": asins[:3] + ["B0X"],
+            "available": [10, 0, 5, 7],
+            "inv-age-0-to-90-days": [8, 0, 5, 7],
+            "inv-age-91-to-180-days": [2, 0, 0, 0],
+            "inv-age-181-to-270-days": 0,
+            "inv-age-271-to-365-days": 0,
+            "inv-age-365-plus-days": 0,
+            "recommended-action": "No action",
+        }
+    )
+
+    paths = [
+        os.path.join(folder, name)
+        for name in ["business.csv", "payment.csv", "ad.xlsx", "fba.txt"]
+    ]
+    business.to_csv(paths[0], index=False)
+    with open(paths[1], "w", encoding="utf-8", newline="") as f:
+        f.write("".join(f'"说明 {i}"\n' for i in range(7)))
+        payment.to_csv(f, index=False)
+    ad.to_excel(paths[2], index=False)
+    fba.to_csv(paths[3], sep="\t", index=False)
+    return paths
+
+
+def test_process_product_analysis():
+    """测试生成报表时一次写出两个sheet"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            paths = write_product_sources(tmpdir)
+            content, filename = process_product_analysis(
+                PROJECT_NAME, "2025-11-01", "2025-11-07", *paths
+            )
+            saved_path = os.path.join(
+                "project",
+                PROJECT_NAME,
+                "产品数据分析",
+                f"{PROJECT_NAME}_ProductAnalysis_20251101-1107.xlsx",
+            )
+            with open(saved_path, "rb") as f:
+                assert f.read() == content
+        finally:
+            os.chdir(cwd)
+
+    assert filename == f"{PROJECT_NAME}_product_analysis_20251101-1107.xlsx"
+    sheets = pd.read_excel(io.BytesIO(content), sheet_name=None)
+    assert list(sheets) == ["产品分析", "库存详情"]
+    overview, inventory = sheets["产品分析"], sheets["库存详情"]
+    assert overview["SKU"].iloc[-1] == "汇总"
+
+    sales = overview.set_index("SKU")["总销量"]
+    detail = inventory.iloc[:-1].set_index("SKU")
+    for sku in detail.index[:3]:
+        assert detail.loc[sku, "本周销量"] == sales[sku]
+    assert detail.loc["不在基础信息", "本周销量"] == 0
+    assert inventory["SKU"].iloc[-1] == "汇总行"
+    assert inventory["可售库存"].iloc[-1] == 22
+
+
+if __name__ == "__main__":
+    test_product_analysis_sheet()
+    test_inventory_sheet()
+    test_process_product_analysis()
+    print("✓ 产品分析报表写出测试通过")
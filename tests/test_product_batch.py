@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+测试产品分析批量生成
+验证按命名约定配对报告、跳过临时副本目录、zip 输入、缺少报告的项目记录为失败，
+输出 zip 中的工作簿、跨项目汇总表与清单，以及不接受服务器的 project 目录
+"""
+
+import sys
+import os
+import io
+import shutil
+import tempfile
+import zipfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from openpyxl import load_workbook
+from apps.dataset.product_batch import (
+    MANIFEST_NAME,
+    SUMMARY_SHEET,
+    SUMMARY_TOTAL_NAME,
+    find_report_sets,
+    generate_product_batch,
+)
+from test_product_analysis import PROJECT_NAME, write_product_sources
+
+REPORT_NAMES = [
+    "_Business_Report_20251201_0900.csv",
+    "_Payment_Report_20251201_0900.csv",
+    "_AD_Product_20251201_0900.xlsx",
+    "_Inventory_Report_20251201_0900.txt",
+]
+
+
+def write_report_folder(folder):
+    """写入一个完整项目、一个缺少广告报告的项目与无关文件"""
+    sources = os.path.join(folder, "sources")
+    os.makedirs(sources)
+    paths = write_product_sources(sources)
+
+    reports = os.path.join(folder, "reports")
+    os.makedirs(os.path.join(reports, "旧报告"))
+    for path, name in zip(paths, REPORT_NAMES):
+        shutil.copy(path, os.path.join(reports, PROJECT_NAME + name))
+    # 同类型的旧报告按文件名排序不会被选中
+    shutil.copy(
+        paths[0],
+        os.path.join(reports, "旧报告", f"{PROJECT_NAME}_Business_Report_20251101.csv"),
+    )
+    shutil.copy(paths[0], os.path.join(reports, "项目B" + REPORT_NAMES[0]))
+    shutil.copy(paths[1], os.path.join(reports, "项目B" + REPORT_NAMES[1]))
+    with open(os.path.join(reports, "说明.txt"), "w", encoding="utf-8") as f:
+        f.write("无关文件")
+    return reports
+
+
+def test_find_report_sets():
+    """测试按文件名配对报告"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reports = write_report_folder(tmpdir)
+        report_sets = find_report_sets(reports)
+
+    assert list(report_sets) == [PROJECT_NAME, "项目B"]
+    assert len(report_sets[PROJECT_NAME]) == 4
+    assert os.path.basename(report_sets[PROJECT_NAME]["business_report_path"]) == (
+        PROJECT_NAME + REPORT_NAMES[0]
+    )
+    assert sorted(report_sets["项目B"]) == [
+        "business_report_path",
+        "payment_report_path",
+    ]
+
+    # 产品分析的临时副本与输出目录中同名的文件不参与配对
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reports = write_report_folder(tmpdir)
+        for folder, name in [
+            ("tmp", f"{PROJECT_NAME}_Payment_Report_20251202-1208_0900.csv"),
+            ("产品数据分析", f"{PROJECT_NAME}_Business_Report_20251231.csv"),
+        ]:
+            os.makedirs(os.path.join(reports, folder))
+            shutil.copy(
+                os.path.join(reports, PROJECT_NAME + REPORT_NAMES[0]),
+                os.path.join(reports, folder, name),
+            )
+        report_sets = find_report_sets(reports)
+
+    for field, name in zip(
+        ["business_report_path", "payment_report_path"], REPORT_NAMES
+    ):
+        path = report_sets[PROJECT_NAME][field]
+        assert os.path.basename(path) == PROJECT_NAME + name
+
+
+def test_product_batch():
+    """测试 zip 输入的批量生成与输出 zip"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            reports = write_report_folder(tmpdir)
+            source = io.BytesIO()
+            with zipfile.ZipFile(source, "w") as zf:
+                for name in os.listdir(reports):
+                    path = os.path.join(reports, name)
+                    if os.path.isfile(path):
+                        zf.write(path, name)
+            source.seek(0)
+
+            archive = io.BytesIO()
+            manifest = generate_product_batch(
+                source, "2025-12-01", "2025-12-07", archive, max_workers=2
+            )
+            assert list(manifest["项目名称"]) == [PROJECT_NAME, "项目B"]
+            assert list(manifest["状态"]) == ["success", "failed"]
+            assert "广告产品报告" in manifest["错误"].iloc[1]
+
+            with zipfile.ZipFile(archive) as zf:
+                names = zf.namelist()
+                assert names == [
+                    manifest["文件"].iloc[0],
+                    "产品分析汇总_20251201-1207.xlsx",
+                    MANIFEST_NAME,
+                ]
+                saved = pd.read_csv(io.BytesIO(zf.read(MANIFEST_NAME)))
+                summary_content = zf.read(names[1])
+            assert list(saved["状态"]) == ["success", "failed"]
+
+            ws = load_workbook(io.BytesIO(summary_content))[SUMMARY_SHEET]
+            rows = list(ws.values)
+            header = list(rows[0])
+            assert [row[0] for row in rows[1:]] == [PROJECT_NAME, SUMMARY_TOTAL_NAME]
+            project, total = dict(zip(header, rows[1])), dict(zip(header, rows[2]))
+            assert total["总销量"] == project["总销量"]
+            assert total["广告花费"] == 18.5
+            assert ws.cell(row=3, column=1).font.b
+
+            # 服务器的 project 目录中有同名的月报付款报告和临时副本，不能作为报告目录
+            project_folder = os.path.join(tmpdir, "project", PROJECT_NAME)
+            shutil.copytree(reports, os.path.join(project_folder, "uploaded_files"))
+            try:
+                generate_product_batch(
+                    project_folder, "2025-12-01", "2025-12-07", io.BytesIO()
+                )
+                assert False, "project 目录应报错"
+            except ValueError as e:
+                assert "project" in str(e)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_find_report_sets()
+    test_product_batch()
+    print("✓ 产品分析批量生成测试通过")
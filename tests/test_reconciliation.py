@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+测试月报核算规则
+验证规则表求值结果与报表核算 / 总览草稿的生成
+"""
+
+import sys
+import os
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from apps.dataset.payment_classifier import (
+    AMOUNT_COLUMNS,
+    classify_transactions,
+    bucket_totals,
+)
+from apps.dataset.reconciliation import (
+    evaluate_rules,
+    build_report_sheet,
+    build_overview_sheet,
+)
+
+
+def make_totals():
+    """构造分桶合计矩阵"""
+    rows = [
+        {
+            "type": "Order",
+            "fulfillment": "Amazon",
+            "description": "A",
+            "product sales": 100.0,
+            "selling fees": -15.0,
+            "fba fees": -5.5,
+        },
+        {
+            "type": "Order",
+            "fulfillment": "Seller",
+            "description": "A",
+            "product sales": 50.0,
+            "selling fees": -7.5,
+        },
+        {
+            "type": "Refund",
+            "fulfillment": "Amazon",
+            "description": "A",
+            "product sales": -20.0,
+            "other": -1.25,
+            "fba fees": 2.0,
+        },
+        {
+            "type": "Service Fee",
+            "fulfillment": 0,
+            "description": "Cost of Advertising",
+            "total": -30.0,
+        },
+        {"type": "Debt", "fulfillment": 0, "description": "Debt", "total": -9.99},
+    ]
+    df = pd.DataFrame(rows).reindex(
+        columns=["type", "fulfillment", "description"] + AMOUNT_COLUMNS
+    )
+    df = df.fillna(0)
+    return bucket_totals(df, classify_transactions(df))
+
+
+def test_evaluate_rules():
+    """测试行项目与合计"""
+    values = evaluate_rules(make_totals())
+
+    assert values["fba_product_sales"] == 100.0
+    assert values["product_sales_non_fba"] == 50.0
+    assert values["fba_product_sale_refunds"] == -21.25
+    assert values["income_total"] == 128.75
+    assert values["cost_of_advertising"] == -30.0
+    assert values["expense_total"] == round(-15.0 - 7.5 - 5.5 + 2.0 - 30.0, 2)
+    assert values["amz_card"] == -9.99
+
+
+def test_build_sheets():
+    """测试报表核算与总览草稿"""
+    values = evaluate_rules(make_totals())
+    pt3 = build_report_sheet(values)
+    pt4, amazon_pay_back = build_overview_sheet(values)
+
+    assert len(pt3) == 22
+    assert pt3["Income"].iloc[-1] == "Total_Income"
+    assert pt3["Ex金额（USD）"].iloc[-1] == values["expense_total"]
+    assert pt4["亚马逊回款金额"].iloc[0] == amazon_pay_back
+    assert round(amazon_pay_back, 2) == round(
+        values["income_total"] + values["expense_total"], 2
+    )
+    assert pt4["信用卡扣款-支出"].iloc[0] == -9.99
+
+
+if __name__ == "__main__":
+    test_evaluate_rules()
+    test_build_sheets()
+    print("✓ 月报核算规则测试通过")
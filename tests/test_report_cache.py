@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+测试报表解析缓存
+验证按文件内容命中缓存以及按最近使用时间淘汰
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from apps.dataset.report_cache import load_cached_report, evict_cache, get_cache_folder
+
+
+def test_cache_hit_and_eviction():
+    """测试缓存命中与淘汰"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            csv_path = os.path.join(tmpdir, "report.csv")
+            with open(csv_path, "w", encoding="utf-8") as f:
+                f.write("sku,quantity\nA,1\nB,2\n")
+
+            calls = []
+
+            def parser(path):
+                calls.append(path)
+                return pd.read_csv(path)
+
+            first = load_cached_report("测试项目", csv_path, parser, kind="test")
+            second = load_cached_report("测试项目", csv_path, parser, kind="test")
+            assert len(calls) == 1
+            pd.testing.assert_frame_equal(first, second)
+
+            # 文件内容变化后重新解析
+            with open(csv_path, "a", encoding="utf-8") as f:
+                f.write("C,3\n")
+            third = load_cached_report("测试项目", csv_path, parser, kind="test")
+            assert len(calls) == 2
+            assert len(third) == 3
+
+            cache_folder = get_cache_folder("测试项目")
+            assert len(os.listdir(cache_folder)) == 2
+            evict_cache(cache_folder, max_bytes=0)
+            assert os.listdir(cache_folder) == []
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_cache_hit_and_eviction()
+    print("✓ 报表解析缓存测试通过")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+测试报表模板缓存
+验证登记模板只解析一次、每次返回互不影响的副本，模板文件修改后自动重新解析
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import load_workbook
+from apps.dataset import report_template
+from apps.dataset.report_template import (
+    REPORT_TEMPLATES,
+    get_template_layout,
+    get_template_workbook,
+    preload_templates,
+    template_path,
+)
+
+
+def test_registered_templates():
+    """测试登记模板的版式"""
+    preload_templates()
+    assert set(report_template._templates) == set(REPORT_TEMPLATES)
+
+    layout = get_template_layout("product_analysis")
+    assert layout["columns"][:3] == ["日期", "SKU", "ASIN"]
+    assert layout["number_formats"][layout["columns"].index("ACOS")] == "0.00%"
+    # 表头样式中的主题颜色按明暗度换算为 RGB
+    header_formats = dict(zip(layout["columns"], layout["header_formats"]))
+    assert header_formats["总销售额"]["bg_color"] == "#95B3D7"
+    assert header_formats["退款率"]["font_color"] == "#FFFFFF"
+    assert (
+        header_formats["日期"]["left"] == 1 and "bg_color" not in header_formats["日期"]
+    )
+    # 模板中 B:K 共用一个列宽设置
+    widths = get_template_layout("daily")["widths"]
+    assert widths == {0: 12.25, **{col: 11.0 for col in range(1, 11)}}
+    assert get_template_layout("weekly")["columns"][0] == "日期范围(US)"
+
+
+def test_copies_and_reload():
+    """测试副本互不影响及模板修改后重新解析"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "template.xlsx")
+        shutil.copy(template_path(REPORT_TEMPLATES["daily"]), path)
+        REPORT_TEMPLATES["test"] = path
+        try:
+            workbook = get_template_workbook("test")
+            workbook.active["A1"] = "已修改"
+            workbook.save(os.path.join(tmpdir, "copy.xlsx"))
+            get_template_layout("test")["columns"].append("额外列")
+            assert get_template_workbook("test").active["A1"].value == "日期(US)"
+            assert get_template_layout("test")["columns"][0] == "日期(US)"
+            assert len(get_template_layout("test")["columns"]) == 11
+
+            # 修改模板文件并更新修改时间
+            template = load_workbook(path)
+            template.active["A1"] = "日期"
+            template.save(path)
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            assert get_template_layout("test")["columns"][0] == "日期"
+            assert get_template_workbook("test").active["A1"].value == "日期"
+        finally:
+            del REPORT_TEMPLATES["test"]
+            report_template._templates.pop("test", None)
+
+
+if __name__ == "__main__":
+    test_registered_templates()
+    test_copies_and_reload()
+    print("✓ 报表模板缓存测试通过")
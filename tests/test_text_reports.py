@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+测试文本报告读取模式
+验证订单、FBA库存报告只读取用到的列，分块过滤行的结果与整份读取后过滤一致，
+以及缺少必需列时的报错
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from apps.dataset import text_reports
+from apps.dataset.text_reports import (
+    FBA_INVENTORY_REPORT,
+    ORDERS_REPORT,
+    read_text_report,
+)
+
+
+def write_orders(path, rows=25):
+    """写入订单报告，包含不需要的列"""
+    statuses = ["Shipped", "Pending", "Cancelled", "Unshipped", "Shipped"]
+    pd.DataFrame(
+        {
+            "amazon-order-id": [f"111-{i:07d}" for i in range(rows)],
+            "order-status": [statuses[i % 5] for i in range(rows)],
+            "product-name": "Widget",
+            "sku": [f"SKU-{i % 4}" for i in range(rows)],
+            "quantity": [i % 3 + 1 for i in range(rows)],
+            "item-price": [None if i % 5 == 1 else i * 1.5 for i in range(rows)],
+        }
+    ).to_csv(path, sep="\t", index=False)
+
+
+def test_orders_report():
+    """测试只读取用到的列及分块过滤行"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "orders.txt")
+        write_orders(path)
+        full = pd.read_csv(path, sep="\t")
+
+        df = read_text_report(path, ORDERS_REPORT)
+        assert list(df.columns) == ["order-status", "sku", "quantity", "item-price"]
+        assert isinstance(df["order-status"].dtype, pd.CategoricalDtype)
+        pd.testing.assert_frame_equal(
+            df.astype({"order-status": object}), full[list(df.columns)]
+        )
+
+        # 分块过滤与整份读取后过滤一致
+        statuses = ["Pending", "Shipped"]
+        chunk_rows = text_reports.TEXT_REPORT_CHUNK_ROWS
+        text_reports.TEXT_REPORT_CHUNK_ROWS = 4
+        try:
+            filtered = read_text_report(
+                path,
+                ORDERS_REPORT,
+                row_filter=lambda chunk: chunk["order-status"].isin(statuses),
+            )
+        finally:
+            text_reports.TEXT_REPORT_CHUNK_ROWS = chunk_rows
+        expected = df.loc[df["order-status"].isin(statuses)].reset_index(drop=True)
+        assert set(filtered["order-status"].cat.categories) == set(statuses)
+        pd.testing.assert_frame_equal(
+            filtered.astype({"order-status": object}),
+            expected.astype({"order-status": object}),
+        )
+
+
+def test_fba_inventory_report():
+    """测试库存报告缺少的可选列被忽略，指定的列必须存在"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "fba.txt")
+        pd.DataFrame(
+            {
+                "snapshot-date": "2025-11-01",
+                "sku": ["A", "B"],
+                "available": [3, 0],
+                "recommended-action": ["No action", "Create removal order"],
+            }
+        ).to_csv(path, sep="\t", index=False)
+
+        df = read_text_report(path, FBA_INVENTORY_REPORT)
+        assert list(df.columns) == ["sku", "available", "recommended-action"]
+        assert df["available"].tolist() == [3, 0]
+
+        try:
+            read_text_report(path, FBA_INVENTORY_REPORT, ["sku", "asin"])
+            assert False, "缺少指定的列应报错"
+        except ValueError as e:
+            assert "asin" in str(e)
+
+
+if __name__ == "__main__":
+    test_orders_report()
+    test_fba_inventory_report()
+    print("✓ 文本报告读取模式测试通过")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+测试周报生成
+验证日报生成时保存每日SKU数据，周报合并已保存日期的数据，以及没有已生成日报时的提示
+"""
+
+import sys
+import os
+import io
+import tempfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from apps.dataset.daily_report import process_daily_report
+from apps.dataset.daily_store import stored_days, week_dates
+from apps.dataset.weekly_report import process_weekly_report
+from test_daily_report import write_daily_sources
+
+
+def test_weekly_report():
+    """测试周报合并每日数据"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            paths = write_daily_sources(tmpdir)
+            process_daily_report("项目", "2025-11-03", *paths)
+            # 第二天 SKU A 库存减少，D 不再有库存记录
+            pd.DataFrame({"sku": ["A"], "available": [9]}).to_csv(
+                paths[2], sep="\t", index=False
+            )
+            process_daily_report("项目", "2025-11-05", *paths)
+            assert stored_days("项目") == ["2025-11-03", "2025-11-05"]
+
+            content, filename = process_weekly_report("项目", "2025-11-03")
+            assert os.path.exists(os.path.join("project", "项目", "周报", filename))
+
+            try:
+                process_weekly_report("项目", "2025-11-10")
+                assert False, "没有已生成日报的周应报错"
+            except ValueError as e:
+                assert "2025-11-03、2025-11-05" in str(e)
+        finally:
+            os.chdir(cwd)
+
+    assert filename == "项目_2025-11-03_2025-11-09_周报.xlsx"
+    sheets = pd.read_excel(io.BytesIO(content), sheet_name=None)
+    df = list(sheets.values())[0].set_index("SKU")
+    assert list(df.index) == ["A", "B", "C", "D"]
+    assert set(df["日期范围(US)"]) == {"2025-11-03 ~ 2025-11-09"}
+    assert df.loc["A", "订单量"] == 6 and df.loc["A", "销售额"] == 60.0
+    assert df.loc["A", "点击量"] == 12 and df.loc["A", "单次点击花费"] == 0.42
+    assert df.loc["A", "ASIN"] == "B0A"
+    assert df.loc["A", "可售库存"] == 9 and df.loc["D", "可售库存"] == 0
+    assert pd.isna(df.loc["C", "单次点击花费"])
+
+    summary = sheets["每日汇总"]
+    assert list(summary["日期"]) == week_dates("2025-11-03")
+    assert list(summary["状态"])[:3] == ["已汇总", "未生成", "已汇总"]
+    assert summary.loc[0, "订单量"] == 4
+
+
+if __name__ == "__main__":
+    test_weekly_report()
+    print("✓ 周报生成测试通过")
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+测试 XLSX 流式读取
+验证只读取指定列的结果与 pd.read_excel 一致，覆盖共享字符串、行内字符串、
+逐元素解析三种情况，公式单元格取缓存值、带命名空间前缀的工作表改用逐元素解析，
+以及缺少必需列时的报错
+"""
+
+import sys
+import os
+import tempfile
+import zipfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from apps.dataset import xlsx_reader
+from apps.dataset.xlsx_reader import read_xlsx_columns
+
+AD_COLUMNS = ["广告SKU", "广告ASIN", "展示量", "点击量", "花费", "7天总销售量(#)"]
+
+MAIN_NAMESPACE = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+RELATIONSHIPS_NAMESPACE = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+)
+
+# 表头为行内字符串；B列为公式（含共享公式），C列为文本结果的公式
+SHEET_ROWS = [
+    '<row r="1">'
+    '<c r="A1" t="inlineStr"><is><t>SKU</t></is></c>'
+    '<c r="B1" t="inlineStr"><is><t>数量</t></is></c>'
+    '<c r="C1" t="inlineStr"><is><t>名称</t></is></c>'
+    "</row>",
+    '<row r="2">'
+    '<c r="A2" t="inlineStr"><is><t>A</t></is></c>'
+    '<c r="B2"><f>3*4</f><v>12</v></c>'
+    '<c r="C2" t="str"><f>A2&amp;"x"</f><v>Ax</v></c>'
+    "</row>",
+    '<row r="3">'
+    '<c r="A3" t="inlineStr"><is><t>B</t></is></c>'
+    '<c r="B3"><f t="shared" ref="B3:B4" si="0">B2/2</f><v>6.5</v></c>'
+    '<c r="C3" t="str"><f t="shared" si="1"/><v>Bx</v></c>'
+    "</row>",
+]
+
+
+def make_ad_report(rows=500):
+    """生成广告产品报告，包含不需要的列、空值和需要转义的文本"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "日期": "2025-11-01",
+            "广告活动名称": [f"Campaign & {i % 7}" for i in range(rows)],
+            "广告SKU": [f"SKU-<{i % 40}>" for i in range(rows)],
+            "广告ASIN": [f"B0{i % 40:08d}" for i in range(rows)],
+            "展示量": rng.integers(0, 5000, rows),
+            "点击量": rng.integers(0, 50, rows),
+            "点击率(CTR)": rng.random(rows),
+            "花费": np.round(rng.random(rows) * 30, 2),
+            "7天总销售量(#)": rng.integers(0, 6, rows),
+        }
+    )
+    df.loc[3, "花费"] = np.nan
+    df.loc[5, "广告ASIN"] = None
+    return df
+
+
+def test_matches_read_excel():
+    """测试不同写法的工作簿读取结果与 pd.read_excel 一致"""
+    df = make_ad_report()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = {
+            "openpyxl": os.path.join(tmpdir, "openpyxl.xlsx"),
+            "xlsxwriter": os.path.join(tmpdir, "xlsxwriter.xlsx"),
+            "inline": os.path.join(tmpdir, "inline.xlsx"),
+        }
+        df.to_excel(paths["openpyxl"], index=False, engine="openpyxl")
+        df.to_excel(paths["xlsxwriter"], index=False, engine="xlsxwriter")
+        # constant_memory 模式按行写出行内字符串
+        workbook = xlsxwriter.Workbook(paths["inline"], {"constant_memory": True})
+        ws = workbook.add_worksheet()
+        ws.write_row(0, 0, list(df.columns))
+        for row_index, row in enumerate(df.itertuples(index=False), 1):
+            ws.write_row(row_index, 0, [None if pd.isna(v) else v for v in row])
+        workbook.close()
+
+        for path in paths.values():
+            expected = pd.read_excel(path, engine="openpyxl")
+            result = read_xlsx_columns(path, AD_COLUMNS)
+            pd.testing.assert_frame_equal(result, expected[AD_COLUMNS])
+            assert result["展示量"].dtype == np.int64
+            pd.testing.assert_frame_equal(read_xlsx_columns(path), expected)
+            with open(path, "rb") as f:
+                pd.testing.assert_frame_equal(read_xlsx_columns(f, AD_COLUMNS), result)
+
+        # 不规范写法的工作表逐元素解析，结果相同
+        is_regular = xlsx_reader._is_regular
+        xlsx_reader._is_regular = lambda chunk: False
+        try:
+            for path in paths.values():
+                pd.testing.assert_frame_equal(
+                    read_xlsx_columns(path, AD_COLUMNS),
+                    pd.read_excel(path, engine="openpyxl")[AD_COLUMNS],
+                )
+        finally:
+            xlsx_reader._is_regular = is_regular
+
+
+def write_sheet_xml(path, rows, prefix=""):
+    """手写只有一个sheet的 xlsx，prefix 为工作表元素的命名空间前缀"""
+    if prefix:
+        rows = [
+            row.replace("<", f"<{prefix}:").replace(f"<{prefix}:/", f"</{prefix}:")
+            for row in rows
+        ]
+        namespace = f'xmlns:{prefix}="{MAIN_NAMESPACE}"'
+        tag = f"{prefix}:"
+    else:
+        namespace = f'xmlns="{MAIN_NAMESPACE}"'
+        tag = ""
+    sheet = (
+        f"<{tag}worksheet {namespace}><{tag}sheetData>"
+        + "".join(rows)
+        + f"</{tag}sheetData></{tag}worksheet>"
+    )
+    workbook = (
+        f'<workbook xmlns="{MAIN_NAMESPACE}" xmlns:r="{RELATIONSHIPS_NAMESPACE}">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    )
+    relationships = (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+        'relationships"><Relationship Id="rId1" Target="worksheets/sheet1.xml"/>'
+        "</Relationships>"
+    )
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("xl/workbook.xml", workbook)
+        zf.writestr("xl/_rels/workbook.xml.rels", relationships)
+        zf.writestr("xl/worksheets/sheet1.xml", sheet)
+
+
+def test_formula_and_prefixed_cells():
+    """测试公式单元格取缓存值，带命名空间前缀的工作表改用逐元素解析"""
+    expected = pd.DataFrame(
+        {"SKU": ["A", "B"], "数量": [12.0, 6.5], "名称": ["Ax", "Bx"]}
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for prefix in ["", "x"]:
+            path = os.path.join(tmpdir, f"sheet_{prefix}.xlsx")
+            write_sheet_xml(path, SHEET_ROWS, prefix)
+            with zipfile.ZipFile(path) as zf:
+                sheet = zf.read("xl/worksheets/sheet1.xml")
+            # 不带前缀时按正则扫描，带前缀时改用逐元素解析
+            assert xlsx_reader._is_regular(sheet) == (not prefix)
+            pd.testing.assert_frame_equal(read_xlsx_columns(path), expected)
+            pd.testing.assert_frame_equal(
+                read_xlsx_columns(path, ["名称", "数量"]), expected[["名称", "数量"]]
+            )
+
+
+def test_missing_columns():
+    """测试缺少必需列时报错"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "ad.xlsx")
+        make_ad_report(5).drop(columns=["花费"]).to_excel(path, index=False)
+        try:
+            read_xlsx_columns(path, AD_COLUMNS)
+            assert False, "缺少必需列应报错"
+        except ValueError as e:
+            assert "花费" in str(e)
+
+
+if __name__ == "__main__":
+    test_matches_read_excel()
+    test_formula_and_prefixed_cells()
+    test_missing_columns()
+    print("✓ XLSX 流式读取测试通过")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+测试优麦云分析
+验证逐行写出的数据、汇总行与广告占比、共享样式，库存详情sheet，
+以及提交表单后下载生成的报表
+"""
+
+import sys
+import os
+import io
+import tempfile
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from flask import Flask
+from openpyxl import load_workbook
+from apps.dataset.yumai_analysis import (
+    YUMAI_OUTPUT_COLUMNS,
+    process_yumai_data,
+    yumai_analysis_bp,
+)
+from test_inventory_aging import write_inventory
+
+
+def write_yumai_report(path):
+    """写入优麦云报表，包含不需要的列和空单元格"""
+    pd.DataFrame(
+        {
+            "图片": "x",
+            "SKU": ["A", "B", "C"],
+            "ASIN": ["B0A", "B0B", "B0C"],
+            "店铺": "s",
+            "币种": "USD",
+            "销量": [3, None, 5],
+            "销售额": [30.5, 0.0, 50.0],
+            "可售": [10, 0, 5],
+            "广告花费": [4.0, 1.0, 3.05],
+            "广告曝光量": [500, 80, 0],
+            "广告点击量": [12, 1, 0],
+            "ACoAS": ["13.11%", "", "6.10%"],
+        }
+    ).to_excel(path, index=False)
+
+
+def test_yumai_analysis():
+    """测试优麦云分析sheet与库存详情sheet"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yumai_path = os.path.join(tmpdir, "yumai.xlsx")
+        fba_path = os.path.join(tmpdir, "fba.txt")
+        write_yumai_report(yumai_path)
+        write_inventory(fba_path)
+        content = process_yumai_data(yumai_path, fba_path)
+        assert load_workbook(io.BytesIO(process_yumai_data(yumai_path))).sheetnames == [
+            "优麦云分析"
+        ]
+
+    wb = load_workbook(io.BytesIO(content))
+    assert wb.sheetnames == ["优麦云分析", "库存详情"]
+    ws = wb["优麦云分析"]
+    rows = [[cell.value for cell in row] for row in ws.iter_rows()]
+    assert rows[0] == YUMAI_OUTPUT_COLUMNS
+    assert rows[1] == ["A", "B0A", "USD", 3, 30.5, 10, 4, 500, 12, "13.11%"]
+    assert rows[2][3] is None
+    # 汇总行：空单元格不计入，广告占比为广告花费 / 销售额
+    assert rows[-1] == ["汇总", None, None, 8, 80.5, 15, 8.05, 580, 13, "10.0%"]
+
+    assert ws["A1"].font.b and ws["A1"].fill.fgColor.rgb == "FF7A6AFF"
+    assert not ws["A2"].font.b and ws["A4"].border.left.style == "thin"
+    assert ws["A5"].font.b and ws["A5"].alignment.horizontal == "center"
+
+    inventory = pd.read_excel(io.BytesIO(content), sheet_name="库存详情")
+    assert inventory["SKU"].tolist() == ["A", "B", "C", "汇总行"]
+    assert inventory["本周销量"].tolist() == [3, 0, 5, 8]
+    assert wb["库存详情"]["A1"].fill.fgColor.rgb == "FF7A6AFF"
+
+
+def test_submit_yumai_analysis():
+    """测试提交表单后直接下载报表"""
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(yumai_analysis_bp)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            yumai_path = os.path.join(tmpdir, "yumai.xlsx")
+            fba_path = os.path.join(tmpdir, "fba.txt")
+            write_yumai_report(yumai_path)
+            write_inventory(fba_path)
+            response = app.test_client().post(
+                "/yumai-analysis/submit",
+                data={
+                    "project_name": "项目",
+                    "report_start_date": "2025-12-01",
+                    "report_end_date": "2025-12-07",
+                    "yumai_report_path": yumai_path,
+                    "fba_report_path": fba_path,
+                },
+            )
+        finally:
+            os.chdir(cwd)
+
+    assert response.status_code == 200
+    assert "YumaiAnalysis_20251201-1207.xlsx" in response.headers["Content-Disposition"]
+    wb = load_workbook(io.BytesIO(response.data))
+    assert wb.sheetnames == ["优麦云分析", "库存详情"]
+
+
+if __name__ == "__main__":
+    test_yumai_analysis()
+    test_submit_yumai_analysis()
+    print("✓ 优麦云分析测试通过")